@@ -1,16 +1,21 @@
 # app.py  (UPDATED: adds Admin endpoints for user registration + editing ONLY)
+import logging
 import os
+import tempfile
+import threading
 from contextlib import contextmanager
 
-from flask import Flask, jsonify, request
+import click
+
+from flask import Flask, g, has_request_context, jsonify, request, send_file, send_from_directory
 from flask_smorest import Api, Blueprint
 from flask_cors import CORS
-from sqlalchemy import create_engine, func, cast, Float, Text, select
+from sqlalchemy import func, cast, Float, Text, select
 from sqlalchemy.orm import scoped_session, sessionmaker, Session
 from sqlalchemy.exc import IntegrityError
-import pandas as pd
+from marshmallow import ValidationError
 
-from config import db_uri
+from config import Settings, db_read_uri, db_uri
 from models import (
     Base,
     Country,
@@ -31,6 +36,8 @@ from models import (
     Cashbook,
     Account,
     AccessLevelEnum,
+    PeriodBalance,
+    QUARTER_CLOSED,
 )
 from schemas import *
 from services.reporting import (
@@ -39,17 +46,52 @@ from services.reporting import (
     build_bank_recon,
     build_hrh_report,
     build_reallocation_report,
+    build_period_totals,
+    build_report_bundle,
+    REPORT_BUILDERS,
+)
+from services.fiscal_calendar import GRAINS, ensure_calendar_dates, ensure_fiscal_calendar, fill_fiscal_calendar
+from services.period_close import close_quarter, ledger_balances, lock_close_accounts, period_is_closed, reopen_quarter
+from services.partitions import (
+    PARTITIONED_TABLES,
+    convert_to_partitioned,
+    convert_to_plain,
+    detach_partition,
+    ensure_partitions,
+)
+from services.database import PrimaryStickiness, RoutingSession, begin_write, make_engine, pool_stats
+from services.instrumentation import init_instrumentation
+from services.logs import init_logging
+from services.metrics import JobMetrics, init_metrics
+from services.profiler import FILES as PROFILE_FILES, RequestProfiler, list_profiles, profile_mode
+from services.serializers import RowSerializer
+from services.refcache import RefDataCache
+from services.json_provider import JSON_PROVIDERS
+from services.compression import compress_response
+from services.export_xlsx import XLSX_MIMETYPE, workbook_filename, write_quarter_workbook
+from services.export_bundle import BundleJobs, write_bundle_zip
+from services.report_jobs import REPORTS as REPORT_JOB_TYPES, ReportJobs
+from services.export_parquet import DATASETS as ANALYTICS_DATASETS, export_analytics, read_manifest
+from services.export_csv import (
+    bank_recon_csv_response,
+    period_totals_csv_response,
+    report_csv_response,
+    rows_csv_response,
+    wants_csv,
 )
 from auth import blp_auth, init_jwt
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from werkzeug.exceptions import BadRequest, HTTPException, NotFound, Forbidden
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, verify_jwt_in_request
+from werkzeug.exceptions import BadRequest, Conflict, HTTPException, NotFound, Forbidden
 from import_excel import (get_or_create_country, get_or_create_province, get_or_create_district,
                           get_or_create_hospital, get_or_create_facility, create_users_for_all_facilities)
 
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False))
+SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession))
 
 UPLOAD_ALLOWED_EXTENSIONS = {"xlsx"}
 
+log = logging.getLogger("finreports.api")
+access_log = logging.getLogger("finreports.access")
+
 
 @contextmanager
 def get_session():
@@ -94,6 +136,25 @@ def _apply_facility_scope(query, model):
     return query
 
 
+def _ensure_period_open(db: Session, facility_id, year, quarter):
+    """Refuse (409) an edit dated in a closed quarter, or before one, of the facility."""
+    if facility_id and period_is_closed(db, int(facility_id), int(year), int(quarter)):
+        raise Conflict(description=f"FY{year} Q{quarter} is closed for this facility; reopen it first.")
+
+
+def _ensure_cashbook_open(db: Session, cb: Cashbook):
+    _ensure_period_open(db, cb.facility_id, cb.fiscal_year, int(cb.quarter.value[1]))
+
+
+def _flush_deletes(db: Session, what: str):
+    """Flush pending deletes, refusing (409) while other rows still reference them."""
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise Conflict(description=f"{what} still referenced by other records; remove or reassign those first.")
+
+
 def require_name_and_code(data: dict, entity: str = "Location"):
     name = (data.get("name") or "").strip()
     code = (data.get("code") or "").strip()
@@ -248,6 +309,9 @@ def _user_to_dict(u: User):
 
 def create_app():
     app = Flask(__name__)
+    app.json = JSON_PROVIDERS[Settings.JSON_PROVIDER](app)
+    # first, so the request id is bound before any other hook logs
+    init_logging(app, Settings)
 
     # --- KEYS before init_jwt ---
     app.config.setdefault("SECRET_KEY", os.environ.get("SECRET_KEY", "dev-secret-change-me"))
@@ -275,18 +339,57 @@ def create_app():
     CORS(
         app,
         resources={r"/*": {"origins": ["http://localhost:5173", "http://127.0.0.1:5173"]}},
-        allow_headers=["Content-Type", "Authorization"],
-        expose_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Authorization", "X-Profile", "X-Request-ID"],
+        expose_headers=[
+            "Content-Type", "Authorization", "ETag", "Content-Disposition", "Server-Timing", "X-Profile-Id",
+            "X-Request-ID",
+        ],
         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     )
 
     api = Api(app)
 
     # DB
-    engine = create_engine(db_uri(), future=True)
-    SessionLocal.configure(bind=engine)
-    Base.metadata.create_all(engine)
+    engine = make_engine(db_uri(), Settings)
+    read_engine = make_engine(db_read_uri(), Settings) if db_read_uri() else None
+    sticky = PrimaryStickiness(Settings.READ_STICKY_DIR, Settings.READ_STICKY_SECONDS)
+
+    def _request_identity():
+        try:
+            return get_jwt_identity()
+        except RuntimeError:  # no JWT verified for this request
+            return None
+
+    def use_replica() -> bool:
+        # GET/HEAD only, and not for a user still inside their post-write window
+        if not has_request_context() or request.method not in ("GET", "HEAD"):
+            return False
+        if "use_replica" not in g:
+            identity = _request_identity()
+            if identity is None:
+                # no verified JWT (yet): an anonymous read; decided again once one is
+                return True
+            g.use_replica = not sticky.active(identity)
+        return g.use_replica
+
+    SessionLocal.configure(bind=engine, info={"read_engine": read_engine, "use_replica": use_replica})
+    init_instrumentation(app, (engine, read_engine), Settings)
+    # schema is created by `flask db_init` / alembic, not on every worker boot
     app.session_factory = SessionLocal
+    # for reads that must not lag behind a write (the token blocklist)
+    app.primary_session_factory = sessionmaker(bind=engine)
+
+    # Reference-data cache (countries/provinces/districts/hospitals/facilities/budget-lines/activities)
+    refdata = RefDataCache(Settings.REFDATA_VERSION_FILE, enabled=Settings.REFDATA_CACHE)
+    app.refdata_cache = refdata
+    init_metrics(app, Settings, {"primary": engine, "replica": read_engine}, refdata)
+
+    bundle_jobs = BundleJobs(Settings.EXPORT_DIR)
+    # report jobs only read, so they run on the replica when there is one
+    report_jobs = ReportJobs(Settings.REPORT_JOB_DIR, sessionmaker(bind=read_engine or engine),
+                             Settings.REPORT_JOB_WORKERS, Settings.REPORT_JOB_KEEP_HOURS)
+    # report bundle threads share this worker's connection pool with requests: never more than its steady size
+    bundle_workers = min(Settings.REPORT_BUNDLE_WORKERS, Settings.DB_POOL_SIZE)
 
     # JWT
     init_jwt(app)
@@ -295,8 +398,58 @@ def create_app():
     @app.cli.command("db_init")
     def db_init():
         Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            ensure_partitions(conn)
+            ensure_fiscal_calendar(conn)
         print("Database initialized.")
 
+    @app.cli.command("fiscal_calendar")
+    @click.option("--from-year", type=int, default=None, help="First fiscal year to generate.")
+    @click.option("--to-year", type=int, default=None, help="Last fiscal year to generate.")
+    @click.option("--years-ahead", default=1, show_default=True, help="Future fiscal years to pre-fill.")
+    def fiscal_calendar_command(from_year, to_year, years_ahead):
+        """
+        Fill missing fiscal_calendar days. Without --from-year/--to-year it
+        covers every ledger date plus the coming fiscal years; safe to re-run.
+        """
+        with engine.begin() as conn:
+            if from_year is None and to_year is None:
+                added = ensure_fiscal_calendar(conn, years_ahead)
+            else:
+                first = from_year if from_year is not None else to_year
+                added = fill_fiscal_calendar(conn, first, to_year if to_year is not None else first)
+        print(f"Added {added} day(s) to fiscal_calendar." if added else "fiscal_calendar is up to date.")
+
+    @app.cli.command("partition_ledgers")
+    @click.option("--years-ahead", default=1, show_default=True, help="Future fiscal years to pre-create.")
+    @click.option("--plain", is_flag=True, help="Convert partitioned tables back to ordinary ones.")
+    def partition_ledgers(years_ahead, plain):
+        """Rebuild cashbook and cashbook_entry as fiscal-year partitioned tables (Postgres only)."""
+        with engine.begin() as conn:
+            for table in PARTITIONED_TABLES:
+                if plain:
+                    print(f"{table}: rebuilt as a plain table" if convert_to_plain(conn, table) else f"{table}: unchanged")
+                    continue
+                created = convert_to_partitioned(conn, table, years_ahead)
+                print(f"{table}: {len(created)} partition(s) created" if created else f"{table}: unchanged")
+
+    @app.cli.command("ensure_partitions")
+    @click.option("--years-ahead", default=1, show_default=True, help="Future fiscal years to pre-create.")
+    def ensure_partitions_command(years_ahead):
+        """Create missing fiscal-year partitions; run from cron before each October."""
+        with engine.begin() as conn:
+            created = ensure_partitions(conn, years_ahead)
+        print(f"Created: {', '.join(created)}" if created else "All partitions present.")
+
+    @app.cli.command("detach_partition")
+    @click.argument("table", type=click.Choice(sorted(PARTITIONED_TABLES)))
+    @click.argument("fiscal_year", type=int)
+    def detach_partition_command(table, fiscal_year):
+        """Detach one fiscal year so it can be archived (pg_dump) or dropped."""
+        with engine.begin() as conn:
+            name = detach_partition(conn, table, fiscal_year)
+        print(f"Detached {name}; it is now a standalone table.")
+
     @app.cli.command("create_admin")
     def create_admin():
         """
@@ -316,10 +469,74 @@ def create_app():
             else:
                 print(f"User '{username}' already exists.")
 
+    @app.cli.command("export_analytics")
+    @click.option("--out", "out_dir", default=None, help="Output directory (default: ANALYTICS_DIR).")
+    @click.option("--dataset", "datasets", multiple=True, type=click.Choice(sorted(ANALYTICS_DATASETS)),
+                  help="Dataset to export; repeat for several (default: all).")
+    def export_analytics_command(out_dir, datasets):
+        """
+        Write partitioned Parquet files of cashbook, budgets, obligations and
+        the facility hierarchy for offline analysis.
+        """
+        out_dir = out_dir or Settings.ANALYTICS_DIR
+        manifest = export_analytics(SessionLocal, out_dir, datasets or None)
+        for name, info in manifest["datasets"].items():
+            print(f"{name}: {info['rows']} rows in {info['files']} file(s)")
+        print(f"Analytics extract written to {out_dir}.")
+
     @app.errorhandler(HTTPException)
     def handle_http_exception(e):
         return jsonify({"error": e.name, "message": e.description, "status": e.code}), e.code
 
+    if read_engine is not None:
+        @app.after_request
+        def mark_primary_sticky(response):
+            if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+                identity = _request_identity()
+                if identity is not None:
+                    sticky.mark(identity)
+            return response
+
+    if Settings.COMPRESS:
+        @app.after_request
+        def compress(response):
+            return compress_response(
+                response,
+                request.accept_encodings,
+                min_size=Settings.COMPRESS_MIN_SIZE,
+                level=Settings.COMPRESS_LEVEL,
+            )
+
+    if Settings.PROFILING:
+        @app.before_request
+        def profile_request():
+            """
+            COUNTRY admins can profile any request with ?_profile=1|sample|cprofile
+            or an X-Profile header; the profile id comes back in X-Profile-Id.
+            """
+            mode = profile_mode(request.args.get("_profile") or request.headers.get("X-Profile"))
+            if mode is None:
+                return None
+            verify_jwt_in_request()
+            _require_country_admin()
+            g.request_profiler = RequestProfiler(
+                mode, Settings.PROFILE_DIR, Settings.PROFILE_SAMPLE_MS, Settings.PROFILE_KEEP
+            ).start()
+
+        # registered after compress so it runs first and excludes it
+        @app.after_request
+        def finish_profile(response):
+            profiler = g.pop("request_profiler", None)
+            if profiler is not None:
+                response.headers["X-Profile-Id"] = profiler.stop({
+                    "method": request.method,
+                    "path": request.full_path.rstrip("?"),
+                    "route": request.url_rule.rule if request.url_rule else None,
+                    "status": response.status_code,
+                    "user": _request_identity(),
+                })
+            return response
+
     # ---- Blueprints ----
     blp_geo = Blueprint("geo", __name__, url_prefix="/")
     blp_budget = Blueprint("budget", __name__, url_prefix="/")
@@ -334,18 +551,38 @@ def create_app():
     create_schema = CashbookCreateSchema()
     update_schema = CashbookUpdateSchema()
     read_schema = CashbookReadSchema()
-    read_many_schema = CashbookReadSchema(many=True)
     read_account_schema = AccountReadSchema()
     create_account_schema = AccountCreateSchema()
     update_account_schema = AccountUpdateSchema()
 
+    # Column-projected list serializers (same output as the schemas above)
+    budget_rows = RowSerializer(BudgetSchema, Budget)
+    cashbook_rows = RowSerializer(CashbookReadSchema, Cashbook)
+    obligation_rows = RowSerializer(ObligationSchema, Obligation)
+    cashbook_entry_rows = RowSerializer(CashbookEntrySchema, CashbookEntry)
+    account_rows = RowSerializer(AccountReadSchema, Account, extra={"current_balance": _balance_subq()})
+    facility_rows = RowSerializer(
+        FacilitySchema,
+        Facility,
+        extra={
+            "province": Province.name,
+            "district": District.name,
+            "referral_hospital": Hospital.name,
+        },
+        joins=(
+            (Province, Facility.province_id == Province.id),
+            (District, Facility.district_id == District.id),
+            (Hospital, Facility.referral_hospital_id == Hospital.id),
+        ),
+    )
+
     def apply_access_filter(query, model):
         """
         Restrict query results based on user's access level
         """
         claims = get_jwt()
         level = claims.get("access_level")
-        print(claims.values(), level, claims["facility_id"], hasattr(model, "facility_id"))
+        access_log.debug("access filter", extra={"access_level": level, "model": model.__name__})
         if level == "COUNTRY":
             return query
 
@@ -363,6 +600,24 @@ def create_app():
 
         return query.filter(False)  # deny by default
 
+    def cached_reference(table, build):
+        """
+        Serve a reference-data GET from the process-local cache.
+        The key covers the caller's access scope and the query args; the response
+        carries a strong ETag so unchanged data revalidates with 304.
+        """
+        claims = get_jwt()
+        scope = tuple(
+            claims.get(k)
+            for k in ("access_level", "country_id", "province_id", "district_id", "hospital_id", "facility_id")
+        )
+        key = (table, scope, tuple(sorted(request.args.items(multi=True))))
+        etag, body = refdata.get_or_build(key, lambda: app.json.dumps(build()))
+        resp = app.response_class(body, mimetype="application/json")
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp.make_conditional(request)
+
     def validate_create_access(data):
         """
         Prevent creating data outside user's scope
@@ -519,6 +774,7 @@ def create_app():
             if not u:
                 raise NotFound(description="Not found")
             sess.delete(u)
+            _flush_deletes(sess, "This user is")
             return jsonify({"ok": True})
 
     # ---------- Geo ----------
@@ -532,10 +788,13 @@ def create_app():
                 obj = Country(**data)
                 db.add(obj)
                 db.commit()
+                refdata.bump()
                 db.refresh(obj)
                 return CountrySchema().dump(obj), 201
-            items = db.query(Country).order_by(Country.name.asc()).all()
-            return CountrySchema(many=True).dump(items)
+            return cached_reference(
+                "country",
+                lambda: CountrySchema(many=True).dump(db.query(Country).order_by(Country.name.asc()).all()),
+            )
 
     @blp_geo.route("/provinces", methods=["GET", "POST"])
     @jwt_required()
@@ -547,6 +806,7 @@ def create_app():
                 obj = Province(**data)
                 db.add(obj)
                 db.commit()
+                refdata.bump()
                 db.refresh(obj)
                 return ProvinceSchema().dump(obj), 201
             q = db.query(Province)
@@ -554,7 +814,9 @@ def create_app():
             country_id = request.args.get("country_id", type=int)
             if country_id:
                 q = q.filter(Province.country_id == country_id)
-            return ProvinceSchema(many=True).dump(q.order_by(Province.name.asc()).all())
+            return cached_reference(
+                "province", lambda: ProvinceSchema(many=True).dump(q.order_by(Province.name.asc()).all())
+            )
 
     @blp_geo.route("/districts", methods=["GET", "POST"])
     @jwt_required()
@@ -566,6 +828,7 @@ def create_app():
                 obj = District(**data)
                 db.add(obj)
                 db.commit()
+                refdata.bump()
                 db.refresh(obj)
                 return DistrictSchema().dump(obj), 201
             q = db.query(District)
@@ -573,7 +836,9 @@ def create_app():
             province_id = request.args.get("province_id", type=int)
             if province_id:
                 q = q.filter(District.province_id == province_id)
-            return DistrictSchema(many=True).dump(q.order_by(District.name.asc()).all())
+            return cached_reference(
+                "district", lambda: DistrictSchema(many=True).dump(q.order_by(District.name.asc()).all())
+            )
 
     @blp_geo.route("/hospitals", methods=["GET", "POST"])
     @jwt_required()
@@ -585,6 +850,7 @@ def create_app():
                 obj = Hospital(**data)
                 db.add(obj)
                 db.commit()
+                refdata.bump()
                 db.refresh(obj)
                 return HospitalSchema().dump(obj), 201
             q = db.query(Hospital)
@@ -595,7 +861,9 @@ def create_app():
                 q = q.filter(Hospital.province_id == province_id)
             if district_id:
                 q = q.filter(Hospital.district_id == district_id)
-            return HospitalSchema(many=True).dump(q.order_by(Hospital.name.asc()).all())
+            return cached_reference(
+                "hospital", lambda: HospitalSchema(many=True).dump(q.order_by(Hospital.name.asc()).all())
+            )
 
     @blp_geo.route("/facilities", methods=["GET", "POST"])
     @jwt_required()
@@ -607,16 +875,19 @@ def create_app():
                 obj = Facility(**data)
                 db.add(obj)
                 db.commit()
-                db.refresh(obj)
-                return FacilitySchema().dump(obj), 201
-            q = db.query(Facility)
+                refdata.bump()
+                row = db.execute(facility_rows.select().where(Facility.id == obj.id)).one()
+                return facility_rows.dump_rows([row])[0], 201
+            q = facility_rows.select()
             q = apply_access_filter(q, Facility)
-            print(q)
             country_id = request.args.get("country_id", type=int)
             province_id = request.args.get("province_id", type=int)
             district_id = request.args.get("district_id", type=int)
             ref_id = request.args.get("referral_hospital_id", type=int)
-            print (country_id, province_id, district_id, ref_id)
+            log.debug("facility filters", extra={
+                "country_id": country_id, "province_id": province_id,
+                "district_id": district_id, "referral_hospital_id": ref_id,
+            })
             if country_id:
                 q = q.filter(Facility.country_id == country_id)
             if province_id:
@@ -625,7 +896,9 @@ def create_app():
                 q = q.filter(Facility.district_id == district_id)
             if ref_id:
                 q = q.filter(Facility.referral_hospital_id == ref_id)
-            return FacilitySchema(many=True).dump(q.order_by(Facility.name.asc()).all())
+            return cached_reference(
+                "facility", lambda: facility_rows.dump_rows(db.execute(q.order_by(Facility.name.asc())))
+            )
 
     # ---------- BudgetLine ----------
     @blp_budget.route("/budget-lines", methods=["GET", "POST"])
@@ -637,6 +910,7 @@ def create_app():
                 obj = BudgetLine(**payload)
                 db.add(obj)
                 db.commit()
+                refdata.bump()
                 db.refresh(obj)
                 return BudgetLineSchema().dump(obj), 201
 
@@ -644,7 +918,9 @@ def create_app():
             search = request.args.get("q")
             if search:
                 q = q.filter(BudgetLine.name.ilike(f"%{search}%") | BudgetLine.code.ilike(f"%{search}%"))
-            return BudgetLineSchema(many=True).dump(q.order_by(BudgetLine.code.asc()).all())
+            return cached_reference(
+                "budget_lines", lambda: BudgetLineSchema(many=True).dump(q.order_by(BudgetLine.code.asc()).all())
+            )
 
     # ---------- Activity ----------
     @blp_budget.route("/activities", methods=["GET", "POST"])
@@ -659,6 +935,7 @@ def create_app():
                 obj = Activity(**payload)
                 db.add(obj)
                 db.commit()
+                refdata.bump()
                 db.refresh(obj)
                 return ActivitySchema().dump(obj), 201
 
@@ -669,7 +946,9 @@ def create_app():
                 q = q.filter(Activity.budget_line_id == budget_line_id)
             if search:
                 q = q.filter(Activity.name.ilike(f"%{search}%") | Activity.code.ilike(f"%{search}%"))
-            return ActivitySchema(many=True).dump(q.order_by(Activity.code.asc()).all())
+            return cached_reference(
+                "activities", lambda: ActivitySchema(many=True).dump(q.order_by(Activity.code.asc()).all())
+            )
 
     # ---------- Budget ----------
     @blp_budget.route("/budgets", methods=["GET", "POST"])
@@ -679,7 +958,7 @@ def create_app():
 
         with app.session_factory() as db:
             if request.method == "POST":
-                print(request.json)
+                log.debug("budget create", extra={"fields": sorted(request.json or {})})
                 payload = BudgetSchema().load(request.json)
 
                 bl = db.query(BudgetLine).get(payload["budget_line_id"])
@@ -707,7 +986,7 @@ def create_app():
                 db.refresh(obj)
                 return BudgetSchema().dump(obj), 201
 
-            q = db.query(Budget)
+            q = budget_rows.select()
             q = _apply_facility_scope(q, Budget)
 
             for key in ("hospital_id", "facility_id", "budget_line_id", "activity_id", "level"):
@@ -750,13 +1029,18 @@ def create_app():
             else:
                 q = q.order_by(Budget.id.desc())
 
+            if wants_csv(request):
+                return rows_csv_response(app.session_factory, budget_rows, q, "budgets.csv")
+
             page = max(int(request.args.get("page", 0)), 0)
             page_size = min(max(int(request.args.get("page_size", 25)), 1), 200)
 
-            total = q.count()
-            items = q.offset(page * page_size).limit(page_size).all()
+            total = db.scalar(select(func.count()).select_from(q.order_by(None).subquery()))
+            items = db.execute(q.offset(page * page_size).limit(page_size))
 
-            return {"items": BudgetSchema(many=True).dump(items), "total": total}, 200
+            if request.args.get("format") == "columnar":
+                return {**budget_rows.dump_columnar(items), "total": total}, 200
+            return {"items": budget_rows.dump_rows(items), "total": total}, 200
 
     @blp_budget.route("/budgets/<int:bid>", methods=["PUT"])
     @jwt_required()
@@ -809,9 +1093,130 @@ def create_app():
                     return {"message": "forbidden for this facility"}, 403
 
             db.delete(obj)
+            _flush_deletes(db, "This budget is")
             db.commit()
             return {"ok": True}, 200
 
+    @blp_budget.route("/budgets/batch", methods=["PATCH"])
+    @jwt_required()
+    def budgets_batch():
+        """
+        Apply many budget creates/updates/deletes in one transaction.
+        Body: {"create": [{...}], "update": [{"id": .., ...}], "delete": [id, ...]}
+        """
+        # every item's shape is checked before anything is read or written
+        try:
+            body = BudgetBatchSchema().load(request.get_json(silent=True) or {})
+        except ValidationError as e:
+            return {"message": "Invalid payload", "errors": e.messages}, 400
+        creates = body.get("create") or []
+        updates = [(item.pop("id"), item) for item in body.get("update") or []]
+        delete_ids = body.get("delete") or []
+
+        # Facility scope is resolved once for the whole batch
+        claims = get_jwt()
+        scoped_fid = None
+        if claims.get("access_level") == AccessLevelEnum.FACILITY.value:
+            fid = claims.get("facility_id")
+            if not fid:
+                return {"message": "No facility assigned to user"}, 403
+            scoped_fid = int(fid)
+            for payload in creates:
+                payload["facility_id"] = scoped_fid
+            for _, payload in updates:
+                if "facility_id" in payload:
+                    payload["facility_id"] = scoped_fid
+
+        with app.session_factory() as db:
+            existing_ids = {bid for bid, _ in updates} | set(delete_ids)
+            existing = {}
+            if existing_ids:
+                existing = {
+                    b.id: b for b in db.scalars(select(Budget).where(Budget.id.in_(existing_ids)))
+                }
+            missing = sorted(existing_ids - existing.keys())
+            if missing:
+                return {"message": "Not found", "ids": missing}, 404
+            if scoped_fid is not None and any(b.facility_id != scoped_fid for b in existing.values()):
+                return {"message": "forbidden for this facility"}, 403
+
+            # One lookup for every BudgetLine/Activity pair referenced by the batch
+            pairs = [(p["budget_line_id"], p["activity_id"]) for p in creates]
+            for bid, payload in updates:
+                if "budget_line_id" in payload or "activity_id" in payload:
+                    obj = existing[bid]
+                    pairs.append((
+                        payload.get("budget_line_id", obj.budget_line_id),
+                        payload.get("activity_id", obj.activity_id),
+                    ))
+            activity_line = {}
+            if pairs:
+                activity_line = dict(
+                    db.execute(
+                        select(Activity.id, Activity.budget_line_id).where(
+                            Activity.id.in_({act_id for _, act_id in pairs})
+                        )
+                    ).all()
+                )
+            for bl_id, act_id in pairs:
+                if activity_line.get(act_id) != bl_id:
+                    return {
+                        "message": "Activity must belong to the given Budget Line",
+                        "budget_line_id": bl_id,
+                        "activity_id": act_id,
+                    }, 400
+
+            # Resolve hospital_id from facilities in one query as well
+            needs_hospital = [
+                p for p in creates + [p for _, p in updates]
+                if p.get("hospital_id") is None and p.get("facility_id") is not None
+            ]
+            if needs_hospital:
+                fac_hospital = dict(
+                    db.execute(
+                        select(Facility.id, Facility.referral_hospital_id).where(
+                            Facility.id.in_({p["facility_id"] for p in needs_hospital})
+                        )
+                    ).all()
+                )
+                for p in needs_hospital:
+                    hid = fac_hospital.get(p["facility_id"])
+                    if not hid:
+                        return {"message": "Hospital must not be null", "facility_id": p["facility_id"]}, 400
+                    p["hospital_id"] = hid
+
+            created = []
+            for payload in creates:
+                obj = Budget(**payload)
+                Budget.prepare_for_insert(obj)
+                created.append(obj)
+            db.add_all(created)
+
+            for bid, payload in updates:
+                obj = existing[bid]
+                for k, v in payload.items():
+                    setattr(obj, k, v)
+                if "start_date" in payload or "end_date" in payload:
+                    Budget.prepare_for_insert(obj)
+
+            db.flush()
+            for bid in delete_ids:
+                db.delete(existing[bid])
+            _flush_deletes(db, "A deleted budget is")
+
+            touched = [o.id for o in created] + [bid for bid, _ in updates]
+            db.commit()
+
+            # Reload every touched row with a single SELECT instead of one refresh per row
+            if touched:
+                db.scalars(select(Budget).where(Budget.id.in_(touched))).all()
+
+            return {
+                "created": BudgetSchema(many=True).dump(created),
+                "updated": BudgetSchema(many=True).dump([existing[bid] for bid, _ in updates]),
+                "deleted": delete_ids,
+            }, 200
+
     @blp_budget.route("/budgets/aggregate", methods=["GET", "OPTIONS"])
     @jwt_required()
     def budgets_aggregate():
@@ -862,13 +1267,15 @@ def create_app():
                         return {"message": "No facility assigned to user"}, 403
                     data["facility_id"] = int(fid)
 
+                _ensure_period_open(db, data["facility_id"], data["year"], data["quarter"])
+                ensure_calendar_dates(db, data["txn_date"])
                 e = CashbookEntry(**data)
                 db.add(e)
                 db.commit()
                 db.refresh(e)
                 return CashbookEntrySchema().dump(e), 201
 
-            q = db.query(CashbookEntry)
+            q = cashbook_entry_rows.select()
             q = _apply_facility_scope(q, CashbookEntry)
 
             facility_id = request.args.get("facility_id", type=int)
@@ -880,7 +1287,10 @@ def create_app():
                 q = q.filter(CashbookEntry.year == year)
             if quarter:
                 q = q.filter(CashbookEntry.quarter == quarter)
-            return CashbookEntrySchema(many=True).dump(q.order_by(CashbookEntry.txn_date.asc()).all())
+            q = q.order_by(CashbookEntry.txn_date.asc())
+            if wants_csv(request):
+                return rows_csv_response(SessionLocal, cashbook_entry_rows, q, "cashbook.csv")
+            return cashbook_entry_rows.dump_rows(db.execute(q))
 
     @blp_exec.route("/obligations", methods=["GET", "POST"])
     @jwt_required()
@@ -896,13 +1306,14 @@ def create_app():
                         return {"message": "No facility assigned to user"}, 403
                     data["facility_id"] = int(fid)
 
+                _ensure_period_open(db, data["facility_id"], data["year"], data["quarter"])
                 o = Obligation(**data)
                 db.add(o)
                 db.commit()
                 db.refresh(o)
                 return ObligationSchema().dump(o), 201
 
-            q = db.query(Obligation)
+            q = obligation_rows.select()
             q = _apply_facility_scope(q, Obligation)
 
             facility_id = request.args.get("facility_id", type=int)
@@ -914,7 +1325,9 @@ def create_app():
                 q = q.filter(Obligation.year == year)
             if quarter:
                 q = q.filter(Obligation.quarter == quarter)
-            return ObligationSchema(many=True).dump(q.all())
+            if wants_csv(request):
+                return rows_csv_response(SessionLocal, obligation_rows, q.order_by(Obligation.id.asc()), "obligations.csv")
+            return obligation_rows.dump_rows(db.execute(q))
 
     @blp_exec.route("/reallocations", methods=["GET", "POST"])
     @jwt_required()
@@ -986,6 +1399,8 @@ def create_app():
                         return {"message": "No facility assigned to user"}, 403
                     data["facility_id"] = int(fid)
 
+                if data.get("status") == QUARTER_CLOSED:
+                    return {"message": "Close a quarter with POST /quarters/<id>/close"}, 400
                 qobj = Quarter(**data)
                 db.add(qobj)
                 db.commit()
@@ -1012,6 +1427,9 @@ def create_app():
         with SessionLocal() as db:
             if request.method == "POST":
                 data = QuarterLineSchema().load(request.json)
+                parent = db.get(Quarter, data["quarter_id"])
+                if parent is not None:
+                    _ensure_period_open(db, parent.facility_id, parent.year, parent.quarter)
                 l = QuarterLine(**data)
                 db.add(l)
                 db.commit()
@@ -1023,6 +1441,90 @@ def create_app():
                 q = q.filter(QuarterLine.quarter_id == quarter_id)
             return QuarterLineSchema(many=True).dump(q.all())
 
+    def _quarter_for_update(db, quarter_id: int):
+        """The quarter row locked FOR UPDATE, or None when missing or outside the caller's facility scope."""
+        q = _apply_facility_scope(db.query(Quarter), Quarter)
+        return q.filter(Quarter.id == quarter_id).with_for_update().populate_existing().one_or_none()
+
+    def _period_balance_dump(row: PeriodBalance) -> dict:
+        return {
+            "account_id": row.account_id,
+            "opening_balance": float(row.opening_balance),
+            "inflow": float(row.inflow),
+            "outflow": float(row.outflow),
+            "closing_balance": float(row.closing_balance),
+            "entries": row.entries,
+        }
+
+    @blp_exec.route("/quarters/<int:quarter_id>/close", methods=["POST"])
+    @jwt_required()
+    def close_quarter_route(quarter_id: int):
+        """
+        Freeze the quarter's closing balances (facility cashbook ledger and each
+        account) in period_balance and lock its ledgers against edits.
+        """
+        with get_session() as db:
+            begin_write(db)
+            period = _apply_facility_scope(
+                db.query(Quarter.facility_id, Quarter.year, Quarter.quarter), Quarter
+            ).filter(Quarter.id == quarter_id).one_or_none()
+            if period is None:
+                return {"message": "Not found"}, 404
+            # accounts first, then the quarter row: the order cashbook writes use
+            accounts = lock_close_accounts(db, *period)
+            qobj = _quarter_for_update(db, quarter_id)
+            if qobj is None:
+                return {"message": "Not found"}, 404
+            if qobj.status == QUARTER_CLOSED:
+                return {"message": "Quarter is already closed"}, 409
+            rows = close_quarter(db, qobj, accounts)
+            return {**QuarterSchema().dump(qobj), "balances": [_period_balance_dump(r) for r in rows]}, 200
+
+    @blp_exec.route("/quarters/<int:quarter_id>/reopen", methods=["POST"])
+    @jwt_required()
+    def reopen_quarter_route(quarter_id: int):
+        """Drop the frozen balances and allow edits again (COUNTRY admins; later quarters must be open)."""
+        _require_country_admin()
+        with get_session() as db:
+            qobj = _quarter_for_update(db, quarter_id)
+            if qobj is None:
+                return {"message": "Not found"}, 404
+            if qobj.status != QUARTER_CLOSED:
+                return {"message": "Quarter is not closed"}, 409
+            later_closed = db.scalar(
+                select(func.count(Quarter.id)).where(
+                    Quarter.facility_id == qobj.facility_id,
+                    Quarter.status == QUARTER_CLOSED,
+                    (Quarter.year * 4 + Quarter.quarter) > (qobj.year * 4 + qobj.quarter),
+                )
+            )
+            if later_closed:
+                return {"message": "Reopen the later closed quarters first"}, 409
+            reopen_quarter(db, qobj)
+            return QuarterSchema().dump(qobj), 200
+
+    @blp_exec.route("/quarters/<int:quarter_id>/balances", methods=["GET"])
+    @jwt_required()
+    def quarter_balances(quarter_id: int):
+        """Opening/closing balance per ledger: frozen rows once closed, computed while open."""
+        with SessionLocal() as db:
+            qobj = _apply_facility_scope(db.query(Quarter), Quarter).filter(Quarter.id == quarter_id).one_or_none()
+            if qobj is None:
+                return {"message": "Not found"}, 404
+            if qobj.status == QUARTER_CLOSED:
+                rows = db.scalars(select(PeriodBalance).where(PeriodBalance.quarter_id == qobj.id)
+                                  .order_by(PeriodBalance.account_id.is_not(None), PeriodBalance.account_id))
+                balances = [_period_balance_dump(r) for r in rows]
+            else:
+                accounts = db.scalars(select(Account.id).where(Account.facility_id == qobj.facility_id)
+                                      .order_by(Account.id))
+                balances = []
+                for account_id in [None, *accounts]:
+                    opening, closing = ledger_balances(db, qobj.facility_id, qobj.year, qobj.quarter, account_id)
+                    balances.append({"account_id": account_id, "opening_balance": float(opening),
+                                     "closing_balance": float(closing)})
+            return {**QuarterSchema().dump(qobj), "balances": balances}, 200
+
     # ---------- Reports ----------
     def _enforce_facility_param(args):
         """
@@ -1043,66 +1545,302 @@ def create_app():
             return int(facility_id_arg)
         return None
 
+    def _report_period(args):
+        """(fiscal year, quarter) from ?fiscal_year= (or its older name ?year=) and ?quarter=."""
+        return int(args.get("fiscal_year") or args["year"]), int(args["quarter"])
+
     @blp_report.route("/summary", methods=["GET"])
     @jwt_required()
     def report_summary():
         args = request.args
+        year, quarter = _report_period(args)
         with SessionLocal() as db:
             try:
                 facility_id = _enforce_facility_param(args)
             except PermissionError as e:
                 return {"message": str(e)}, 403
-            data = build_summary_report(db, facility_id, int(args["year"]), int(args["quarter"]))
+            data = build_summary_report(db, facility_id, year, quarter)
+            if wants_csv(request):
+                return report_csv_response("summary", data, year, quarter)
             return jsonify(data)
 
     @blp_report.route("/statement", methods=["GET"])
     @jwt_required()
     def report_statement():
         args = request.args
+        year, quarter = _report_period(args)
         with SessionLocal() as db:
             try:
                 facility_id = _enforce_facility_param(args)
             except PermissionError as e:
                 return {"message": str(e)}, 403
-            data = build_statement_report(db, facility_id, int(args["year"]), int(args["quarter"]))
+            data = build_statement_report(db, facility_id, year, quarter)
+            if wants_csv(request):
+                return report_csv_response("statement", data, year, quarter)
             return jsonify(data)
 
     @blp_report.route("/bank-recon", methods=["GET"])
     @jwt_required()
     def report_bank():
         args = request.args
+        year, quarter = _report_period(args)
         with SessionLocal() as db:
             try:
                 facility_id = _enforce_facility_param(args)
             except PermissionError as e:
                 return {"message": str(e)}, 403
-            data = build_bank_recon(db, facility_id, int(args["year"]), int(args["quarter"]))
+            if wants_csv(request):
+                # movements are streamed from a server-side cursor, not built in memory
+                return bank_recon_csv_response(SessionLocal, facility_id, year, quarter)
+            data = build_bank_recon(db, facility_id, year, quarter)
             return jsonify(data)
 
     @blp_report.route("/hrh", methods=["GET"])
     @jwt_required()
     def report_hrh():
         args = request.args
+        year, quarter = _report_period(args)
         with SessionLocal() as db:
             try:
                 facility_id = _enforce_facility_param(args)
             except PermissionError as e:
                 return {"message": str(e)}, 403
-            data = build_hrh_report(db, facility_id, int(args["year"]), int(args["quarter"]))
+            data = build_hrh_report(db, facility_id, year, quarter)
+            if wants_csv(request):
+                return report_csv_response("hrh", data, year, quarter)
             return jsonify(data)
 
     @blp_report.route("/reallocation", methods=["GET"])
     @jwt_required()
     def report_reallocation():
         args = request.args
+        year, quarter = _report_period(args)
+        with SessionLocal() as db:
+            try:
+                facility_id = _enforce_facility_param(args)
+            except PermissionError as e:
+                return {"message": str(e)}, 403
+            data = build_reallocation_report(db, facility_id, year, quarter)
+            if wants_csv(request):
+                return report_csv_response("reallocation", data, year, quarter)
+            return jsonify(data)
+
+    @blp_report.route("/bundle", methods=["GET"])
+    @jwt_required()
+    def report_bundle():
+        """
+        Several facility-quarter reports in one call (?include=summary,statement,...,
+        default all) with one scope check and one header; the reports are built
+        concurrently on REPORT_BUNDLE_WORKERS threads (at most DB_POOL_SIZE).
+        """
+        args = request.args
+        include = [name for name in (args.get("include") or ",".join(REPORT_BUILDERS)).split(",") if name]
+        unknown = set(include) - set(REPORT_BUILDERS)
+        if unknown or not include:
+            return {"message": f"include must list some of: {', '.join(REPORT_BUILDERS)}"}, 400
+        year, quarter = _report_period(args)
+        with SessionLocal() as db:
+            try:
+                facility_id = _enforce_facility_param(args)
+            except PermissionError as e:
+                return {"message": str(e)}, 403
+            if not facility_id:
+                return {"message": "facility_id is required"}, 400
+            # the extra sessions read from the same engine (primary or replica) this request uses
+            bind = db.get_bind()
+            data = build_report_bundle(db, facility_id, year, quarter, list(dict.fromkeys(include)),
+                                       lambda: Session(bind), bundle_workers)
+            return jsonify(data)
+
+    @blp_report.route("/periods", methods=["GET"])
+    @jwt_required()
+    def report_periods():
+        """Cashbook totals per fiscal year, quarter, month or week (?grain=, default month)."""
+        args = request.args
+        grain = args.get("grain", "month")
+        if grain not in GRAINS:
+            return {"message": f"grain must be one of: {', '.join(GRAINS)}"}, 400
+        year = args.get("fiscal_year") or args.get("year")
         with SessionLocal() as db:
             try:
                 facility_id = _enforce_facility_param(args)
             except PermissionError as e:
                 return {"message": str(e)}, 403
-            data = build_reallocation_report(db, facility_id, int(args["year"]), int(args["quarter"]))
+            if not facility_id:
+                return {"message": "facility_id is required"}, 400
+            data = build_period_totals(db, facility_id, int(year) if year else None, grain)
+            if wants_csv(request):
+                return period_totals_csv_response(data)
             return jsonify(data)
 
+    @blp_report.route("/export.xlsx", methods=["GET"])
+    @jwt_required()
+    def report_export_xlsx():
+        """
+        Full quarterly workbook (Summary, Statement, Bank reconciliation, HRH,
+        Reallocation, Cashbook, Obligations). Built in write_only mode on a temp
+        file and streamed back in chunks.
+        """
+        args = request.args
+        with SessionLocal() as db:
+            try:
+                facility_id = _enforce_facility_param(args)
+            except PermissionError as e:
+                return {"message": str(e)}, 403
+            if not facility_id:
+                return {"message": "facility_id is required"}, 400
+            year, quarter = _report_period(args)
+
+            out = tempfile.TemporaryFile()
+            write_quarter_workbook(db, facility_id, year, quarter, out)
+            out.seek(0)
+            return send_file(
+                out,
+                mimetype=XLSX_MIMETYPE,
+                as_attachment=True,
+                download_name=workbook_filename(db, facility_id, year, quarter),
+            )
+
+    @blp_report.route("/export-bundle", methods=["GET"])
+    @jwt_required()
+    def report_export_bundle():
+        """
+        Zip of quarterly workbooks for every facility in a district or province.
+        Workbooks are built on a process pool into a temporary zip that is sent
+        once all of them succeeded; scopes above EXPORT_BUNDLE_SYNC_MAX
+        facilities (or ?async=1) return a job.
+        """
+        args = request.args
+        district_id = args.get("district_id", type=int)
+        province_id = args.get("province_id", type=int)
+        if not district_id and not province_id:
+            return {"message": "district_id or province_id is required"}, 400
+        year, quarter = _report_period(args)
+
+        with SessionLocal() as db:
+            q = select(Facility.id)
+            q = apply_access_filter(q, Facility)
+            if district_id:
+                q = q.where(Facility.district_id == district_id)
+            if province_id:
+                q = q.where(Facility.province_id == province_id)
+            facility_ids = list(db.scalars(q.order_by(Facility.name.asc())))
+        if not facility_ids:
+            return {"message": "No facilities in scope"}, 404
+
+        scope = f"district-{district_id}" if district_id else f"province-{province_id}"
+        if args.get("async") == "1" or len(facility_ids) > Settings.EXPORT_BUNDLE_SYNC_MAX:
+            job_id = bundle_jobs.start(
+                get_jwt_identity(), db_uri(), facility_ids, year, quarter, Settings.EXPORT_WORKERS
+            )
+            return {"job_id": job_id, "status": "running", "total": len(facility_ids)}, 202
+
+        # built completely before the response starts, so a failed workbook is a 500, not a truncated zip
+        out = tempfile.TemporaryFile(prefix="bundle-", suffix=".zip")
+        try:
+            write_bundle_zip(out, db_uri(), facility_ids, year, quarter, Settings.EXPORT_WORKERS)
+        except Exception as e:
+            out.close()
+            log.exception("export bundle failed", extra={"scope": scope, "facilities": len(facility_ids)})
+            return {"message": f"Bundle export failed: {e}"}, 500
+        out.seek(0)
+        return send_file(
+            out,
+            mimetype="application/zip",
+            as_attachment=True,
+            download_name=f"{scope}_FY{year}_Q{quarter}.zip",
+        )
+
+    @blp_report.route("/export-bundle/<job_id>", methods=["GET"])
+    @jwt_required()
+    def report_export_bundle_job(job_id: str):
+        status = bundle_jobs.status(job_id)
+        if not status or status.get("owner") != get_jwt_identity():
+            return {"message": "Not found"}, 404
+        if status["status"] == "done":
+            return send_file(
+                bundle_jobs.zip_path(job_id),
+                mimetype="application/zip",
+                as_attachment=True,
+                download_name=f"bundle-{job_id}.zip",
+            )
+        return {k: v for k, v in status.items() if k not in ("owner", "pid")}, 200
+
+    MAX_COMPARISON_PERIODS = 20
+
+    def _report_job_params(report, body):
+        """Validate and resolve the scope of a report job; raises ValueError (400) or PermissionError (403)."""
+        try:
+            if report == "comparison":
+                periods = [(int(y), int(q)) for y, q in body.get("periods") or ()]
+            elif report == "periods":
+                year = body.get("fiscal_year") or body.get("year")
+                params = {"year": int(year) if year else None, "grain": body.get("grain", "month")}
+            else:
+                year, quarter = _report_period(body)
+                params = {"year": year, "quarter": quarter}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("invalid or missing fiscal_year/quarter/periods")
+
+        if report == "rollup":
+            # district, province or (no scope) every facility the caller can see
+            with SessionLocal() as db:
+                q = apply_access_filter(select(Facility.id), Facility)
+                if body.get("district_id"):
+                    q = q.where(Facility.district_id == int(body["district_id"]))
+                if body.get("province_id"):
+                    q = q.where(Facility.province_id == int(body["province_id"]))
+                facility_ids = list(db.scalars(q.order_by(Facility.id)))
+            if not facility_ids:
+                raise ValueError("No facilities in scope")
+            return {**params, "facility_ids": facility_ids}
+
+        facility_id = _enforce_facility_param(body)
+        if not facility_id:
+            raise ValueError("facility_id is required")
+        if report == "comparison":
+            if not periods or len(periods) > MAX_COMPARISON_PERIODS:
+                raise ValueError(f"periods must list 1 to {MAX_COMPARISON_PERIODS} [year, quarter] pairs")
+            return {"facility_id": facility_id, "periods": periods}
+        if report == "periods" and params["grain"] not in GRAINS:
+            raise ValueError(f"grain must be one of: {', '.join(GRAINS)}")
+        return {**params, "facility_id": facility_id}
+
+    @blp_report.route("/jobs", methods=["POST"])
+    @jwt_required()
+    def report_job_submit():
+        """
+        Queue a report on the background pool and return its job id (202).
+        Body: {"report": <type>, "fiscal_year", "quarter", scope...}; "rollup"
+        takes district_id / province_id (or neither for national), "comparison"
+        takes facility_id and "periods": [[year, quarter], ...].
+        """
+        body = request.get_json(silent=True) or {}
+        report = body.get("report")
+        if report not in REPORT_JOB_TYPES:
+            return {"message": f"report must be one of: {', '.join(REPORT_JOB_TYPES)}"}, 400
+        try:
+            params = _report_job_params(report, body)
+        except PermissionError as e:
+            return {"message": str(e)}, 403
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        job_id = report_jobs.submit(get_jwt_identity(), report, params)
+        return {"job_id": job_id, "status": "queued", "report": report}, 202
+
+    @blp_report.route("/jobs/<job_id>", methods=["GET"])
+    @jwt_required()
+    def report_job_status(job_id: str):
+        """Job status; once done it also carries the stored snapshot under "result"."""
+        status = report_jobs.status(job_id)
+        if not status or status.get("owner") != get_jwt_identity():
+            return {"message": "Not found"}, 404
+        data = {k: v for k, v in status.items() if k not in ("owner", "pid")}
+        data["params"].pop("facility_ids", None)
+        if status["status"] == "done":
+            data["result"] = report_jobs.result(job_id)
+        return jsonify(data)
+
     # ---- Accounts ----
     @blp_cashbook.route("/accounts", methods=["GET"])
     @jwt_required()
@@ -1114,9 +1852,7 @@ def create_app():
         page_size = request.args.get("page_size", default=1000, type=int)
 
         with get_session() as sess:
-            bal = _balance_subq()
-            query = sess.query(Account, bal.label("current_balance"))
-
+            query = account_rows.select()
             query = _apply_facility_scope(query, Account)
 
             if q:
@@ -1126,21 +1862,16 @@ def create_app():
             if facility_id:
                 query = query.filter(Account.facility_id == facility_id)
 
-            total = query.count()
-            items = (
+            total = sess.scalar(select(func.count()).select_from(query.subquery()))
+            items = sess.execute(
                 query.order_by(Account.name.asc())
                 .offset(page * page_size)
                 .limit(page_size)
-                .all()
             )
 
-            payload = []
-            for acc, balance in items:
-                data = read_account_schema.dump(acc)
-                data["current_balance"] = str(balance or 0)
-                payload.append(data)
-
-            return jsonify({"items": payload, "total": total})
+            if request.args.get("format") == "columnar":
+                return jsonify({**account_rows.dump_columnar(items), "total": total})
+            return jsonify({"items": account_rows.dump_rows(items), "total": total})
 
     @blp_cashbook.route("/accounts/<int:account_id>", methods=["GET", "OPTIONS"])
     @jwt_required()
@@ -1225,6 +1956,7 @@ def create_app():
                     return jsonify({"message": "forbidden for this facility"}), 403
 
             sess.delete(acc)
+            _flush_deletes(sess, "This account is")
             return jsonify({"message": "Deleted"})
 
     # ---- Cashbook CRUD (new Cashbook table) ----
@@ -1243,9 +1975,11 @@ def create_app():
 
         with SessionLocal() as sess:
             cb = Cashbook(**data)
+            Cashbook.lock_accounts(sess, cb.account_id)
             Cashbook.prepare_for_insert(sess, cb)
-            sess.add(cb)
-            sess.flush()
+            _ensure_cashbook_open(sess, cb)
+            ensure_calendar_dates(sess, cb.transaction_date)
+            Cashbook.insert(sess, cb)
             Cashbook.recalc_account_balances(sess, cb.account_id)
             sess.commit()
             sess.refresh(cb)
@@ -1256,7 +1990,7 @@ def create_app():
     def list_cashbooks():
         q = request.args
         with SessionLocal() as sess:
-            stmt = select(Cashbook)
+            stmt = cashbook_rows.select()
 
             claims = get_jwt()
             if claims.get("access_level") == AccessLevelEnum.FACILITY.value:
@@ -1270,6 +2004,8 @@ def create_app():
                 stmt = stmt.where(Cashbook.facility_id == int(q["facility_id"]))
             if "hospital_id" in q:
                 stmt = stmt.where(Cashbook.hospital_id == int(q["hospital_id"]))
+            if "fiscal_year" in q:
+                stmt = stmt.where(Cashbook.fiscal_year == int(q["fiscal_year"]))
             if "quarter" in q:
                 stmt = stmt.where(Cashbook.quarter == q["quarter"])
             if "date_from" in q:
@@ -1278,8 +2014,11 @@ def create_app():
                 stmt = stmt.where(Cashbook.transaction_date <= q.get("date_to"))
 
             stmt = stmt.order_by(Cashbook.transaction_date.desc(), Cashbook.id.desc())
-            rows = list(sess.scalars(stmt))
-            return read_many_schema.dump(rows), 200
+            if wants_csv(request):
+                return rows_csv_response(SessionLocal, cashbook_rows, stmt, "cashbooks.csv")
+            if q.get("format") == "columnar":
+                return cashbook_rows.dump_columnar(sess.execute(stmt)), 200
+            return cashbook_rows.dump_rows(sess.execute(stmt)), 200
 
     @blp_cashbook.route("/cashbooks/<int:cb_id>", methods=["GET"])
     @jwt_required()
@@ -1304,6 +2043,8 @@ def create_app():
         data = update_schema.load(payload, partial=True)
 
         with SessionLocal() as sess:
+            # the entry is read before lock_accounts, so on SQLite take the write lock now
+            begin_write(sess)
             cb: Cashbook | None = sess.get(Cashbook, cb_id)
             if not cb:
                 return {"message": "Not found"}, 404
@@ -1315,12 +2056,16 @@ def create_app():
                     return {"message": "forbidden for this facility"}, 403
 
             old_account_id = cb.account_id
+            Cashbook.lock_accounts(sess, old_account_id, data.get("account_id"))
+            _ensure_cashbook_open(sess, cb)
 
             for k, v in data.items():
                 setattr(cb, k, v)
 
             if "transaction_date" in data:
                 Cashbook.set_quarter(cb)
+                ensure_calendar_dates(sess, cb.transaction_date)
+            _ensure_cashbook_open(sess, cb)
 
             sess.flush()
 
@@ -1339,6 +2084,8 @@ def create_app():
     @jwt_required()
     def delete_cashbook(cb_id: int):
         with SessionLocal() as sess:
+            # the entry is read before lock_accounts, so on SQLite take the write lock now
+            begin_write(sess)
             cb: Cashbook | None = sess.get(Cashbook, cb_id)
             if not cb:
                 return {"message": "Not found"}, 404
@@ -1350,6 +2097,8 @@ def create_app():
                     return {"message": "forbidden for this facility"}, 403
 
             account_id = cb.account_id
+            Cashbook.lock_accounts(sess, account_id)
+            _ensure_cashbook_open(sess, cb)
             sess.delete(cb)
             sess.flush()
             Cashbook.recalc_account_balances(sess, account_id)
@@ -1400,6 +2149,8 @@ def create_app():
         if not allowed_file(file.filename):
             return jsonify({"error": "Invalid file type"}), 400
 
+        import pandas as pd  # heavy; only the import endpoint needs it
+
         try:
             df = pd.read_excel(file, dtype=str).fillna("")
         except Exception as e:
@@ -1416,7 +2167,7 @@ def create_app():
         }
 
         try:
-            for _, row in df.iterrows():
+            for _, row in JobMetrics("hierarchy_import").iterate(df.iterrows()):
 
                 # country = get_or_create_country(
                 #     sess,
@@ -1463,6 +2214,7 @@ def create_app():
                         referral_hospital_id=hospital.id if hospital else None,
                     )
             sess.commit()
+            refdata.bump()
 
         except IntegrityError as e:
             sess.rollback()
@@ -1477,6 +2229,69 @@ def create_app():
 
         return jsonify({"status": "success", "message": "Hierarchy imported successfully"})
 
+    @app.route("/admin/pool-stats", methods=["GET"])
+    @jwt_required()
+    def admin_pool_stats():
+        """Connection pool occupancy and checkout wait times for this worker process."""
+        _require_country_admin()
+        stats = {"pid": os.getpid(), **pool_stats(engine)}
+        if read_engine is not None:
+            stats["replica"] = pool_stats(read_engine)
+        return stats, 200
+
+    @app.route("/admin/profiles", methods=["GET"])
+    @jwt_required()
+    def admin_profiles():
+        """Stored request profiles, newest first."""
+        _require_country_admin()
+        return jsonify(list_profiles(Settings.PROFILE_DIR))
+
+    @app.route("/admin/profiles/<profile_id>/<name>", methods=["GET"])
+    @jwt_required()
+    def admin_profile_file(profile_id, name):
+        """Download summary.json, sql.json, profile.folded or profile.pstats of one profile."""
+        _require_country_admin()
+        if name not in PROFILE_FILES:
+            return {"message": f"file must be one of: {', '.join(PROFILE_FILES)}"}, 400
+        return send_from_directory(os.path.abspath(Settings.PROFILE_DIR), os.path.join(profile_id, name),
+                                   as_attachment=name != "summary.json")
+
+    analytics_lock = threading.Lock()
+
+    @app.route("/admin/analytics-export", methods=["GET", "POST"])
+    @jwt_required()
+    def analytics_export():
+        """
+        POST starts a Parquet extract into ANALYTICS_DIR in the background
+        (optional body: {"datasets": [...]}); GET returns the last manifest.
+        """
+        _require_country_admin()
+        if request.method == "GET":
+            manifest = read_manifest(Settings.ANALYTICS_DIR)
+            if manifest is None:
+                return {"message": "No analytics extract yet"}, 404
+            return manifest, 200
+
+        datasets = (request.get_json(silent=True) or {}).get("datasets") or None
+        unknown = set(datasets or ()) - set(ANALYTICS_DATASETS)
+        if unknown:
+            return {"message": f"Unknown dataset(s): {', '.join(sorted(unknown))}"}, 400
+        if not analytics_lock.acquire(blocking=False):
+            return {"message": "An analytics export is already running"}, 409
+
+        def run():
+            try:
+                with JobMetrics("analytics_export") as job:
+                    manifest = export_analytics(app.session_factory, Settings.ANALYTICS_DIR, datasets)
+                    job.item(sum(info["rows"] for info in manifest["datasets"].values()))
+            except Exception:
+                log.exception("analytics export failed")
+            finally:
+                analytics_lock.release()
+
+        threading.Thread(target=run, name="analytics-export", daemon=True).start()
+        return {"status": "running", "datasets": datasets or sorted(ANALYTICS_DATASETS)}, 202
+
     @app.route("/admin/create-facility-users", methods=["POST"])
     def create_facility_users():
         sess = SessionLocal()
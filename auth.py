@@ -29,7 +29,8 @@ def init_jwt(app):
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        session_factory = app.session_factory
+        # always the primary: a logout must take effect before a replica catches up
+        session_factory = app.primary_session_factory
         jti = jwt_payload.get("jti")
         if not jti:
             return True
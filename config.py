@@ -23,6 +23,76 @@ class Settings:
     FLASK_RUN_FROM_VENV = (os.environ.get("FLASK_RUN_FROM_VENV") or "").strip() in ("1", "true", "True")
     LOCAL_PGHOST = (os.environ.get("LOCAL_PGHOST") or "localhost").strip()  # override if needed
 
+    # --- Optional read replica for GET traffic ---
+    DATABASE_READ_URL = os.environ.get("DATABASE_READ_URL", "").strip()
+    # after a write, that user's reads stay on the primary for this many seconds
+    READ_STICKY_SECONDS = float(os.environ.get("READ_STICKY_SECONDS") or 5)
+    READ_STICKY_DIR = (os.environ.get("READ_STICKY_DIR") or "instance/primary-sticky").strip()
+
+    # --- Connection pool (per worker process; workers x (size + overflow) must fit max_connections) ---
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE") or 5)
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW") or 10)
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT") or 30)  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE") or 1800)  # seconds; -1 disables
+    DB_POOL_PRE_PING = (os.environ.get("DB_POOL_PRE_PING") or "1").strip() in ("1", "true", "True")
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS") or 0)  # Postgres only; 0 = no limit
+
+    # --- SQLite profile (applied on connect when the database is SQLite) ---
+    SQLITE_PRAGMAS = (os.environ.get("SQLITE_PRAGMAS") or "1").strip() in ("1", "true", "True")
+    SQLITE_JOURNAL_MODE = (os.environ.get("SQLITE_JOURNAL_MODE") or "WAL").strip()
+    SQLITE_SYNCHRONOUS = (os.environ.get("SQLITE_SYNCHRONOUS") or "NORMAL").strip()
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB") or 65536)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS") or 15000)
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE") or 268435456)  # bytes; 0 disables
+    SQLITE_FOREIGN_KEYS = (os.environ.get("SQLITE_FOREIGN_KEYS") or "1").strip() in ("1", "true", "True")
+
+    # --- JSON encoding: "fast" (orjson when installed, stdlib otherwise) or "flask" (built-in provider) ---
+    JSON_PROVIDER = (os.environ.get("JSON_PROVIDER") or "fast").strip().lower()
+
+    # --- Response compression (gzip/deflate) for JSON/CSV bodies above COMPRESS_MIN_SIZE bytes ---
+    COMPRESS = (os.environ.get("COMPRESS") or "1").strip() in ("1", "true", "True")
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE") or 1024)
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL") or 6)
+
+    # --- Workbook exports ---
+    EXPORT_DIR = (os.environ.get("EXPORT_DIR") or "instance/exports").strip()
+    EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS") or min(4, os.cpu_count() or 1))
+    # bundles covering more facilities than this run as background jobs
+    EXPORT_BUNDLE_SYNC_MAX = int(os.environ.get("EXPORT_BUNDLE_SYNC_MAX") or 25)
+    # background report jobs (POST /reports/jobs): pool threads per worker, snapshots kept for REPORT_JOB_KEEP_HOURS
+    REPORT_JOB_DIR = (os.environ.get("REPORT_JOB_DIR") or "instance/report-jobs").strip()
+    REPORT_JOB_WORKERS = int(os.environ.get("REPORT_JOB_WORKERS") or 2)
+    REPORT_JOB_KEEP_HOURS = float(os.environ.get("REPORT_JOB_KEEP_HOURS") or 24)
+    # /reports/bundle builds its reports concurrently on this many threads per worker (1 = in turn)
+    REPORT_BUNDLE_WORKERS = int(os.environ.get("REPORT_BUNDLE_WORKERS") or 4)
+    # partitioned Parquet extract (flask export_analytics / POST /admin/analytics-export)
+    ANALYTICS_DIR = (os.environ.get("ANALYTICS_DIR") or "instance/analytics").strip()
+
+    # --- Logging: JSON (or "text") lines written by a background thread; LOG_LEVELS="logger=LEVEL,..." ---
+    LOG_LEVEL = (os.environ.get("LOG_LEVEL") or "INFO").strip()
+    LOG_LEVELS = (os.environ.get("LOG_LEVELS") or "").strip()
+    LOG_FORMAT = (os.environ.get("LOG_FORMAT") or "json").strip().lower()
+
+    # --- SQL instrumentation: per-request query stats in Server-Timing + slow-query log ---
+    SQL_INSTRUMENTATION = (os.environ.get("SQL_INSTRUMENTATION") or "1").strip() in ("1", "true", "True")
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS") or 250)
+
+    # --- On-demand request profiler (COUNTRY admins: ?_profile=1|sample|cprofile or X-Profile header) ---
+    PROFILING = (os.environ.get("PROFILING") or "1").strip() in ("1", "true", "True")
+    PROFILE_DIR = (os.environ.get("PROFILE_DIR") or "instance/profiles").strip()
+    PROFILE_SAMPLE_MS = float(os.environ.get("PROFILE_SAMPLE_MS") or 2)
+    PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP") or 50)
+
+    # --- Prometheus /metrics, merged across workers through per-process files in METRICS_DIR ---
+    METRICS = (os.environ.get("METRICS") or "1").strip() in ("1", "true", "True")
+    METRICS_DIR = (os.environ.get("METRICS_DIR") or "instance/metrics").strip()
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "").strip()  # optional bearer token for scrapers
+
+    # --- Reference-data cache (geo + budget catalogue GETs) ---
+    REFDATA_CACHE = (os.environ.get("REFDATA_CACHE") or "1").strip() in ("1", "true", "True")
+    # shared version stamp so every worker sees writes made by the others
+    REFDATA_VERSION_FILE = (os.environ.get("REFDATA_VERSION_FILE") or "instance/refdata.version").strip()
+
 
 def _is_running_in_docker() -> bool:
     # Common reliable heuristic
@@ -97,6 +167,13 @@ def _build_pg_url() -> str | None:
     return url
 
 
+def db_read_uri() -> str | None:
+    """Replica URL for read-only requests, or None when reads go to the primary."""
+    if Settings.DATABASE_READ_URL:
+        return _maybe_fix_host_for_local(Settings.DATABASE_READ_URL)
+    return None
+
+
 def db_uri() -> str:
     # 1) Full URL takes precedence (but fix docker host when running locally)
     if Settings.DATABASE_URL:
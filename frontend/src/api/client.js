@@ -63,6 +63,18 @@ async function request(path, { method = 'GET', body, headers = {} } = {}) {
   return data;
 }
 
+// Expand a `format=columnar` payload ({ columns, data: [[...]] }) back into row objects
+export function fromColumnar(payload) {
+  if (!payload || !Array.isArray(payload.columns)) return payload;
+  const { columns, data = [], ...rest } = payload;
+  const items = data.map((row) => {
+    const obj = {};
+    for (let i = 0; i < columns.length; i += 1) obj[columns[i]] = row[i];
+    return obj;
+  });
+  return { ...rest, items };
+}
+
 // ---- Auth helpers ----
 export async function login(username, password) {
   const data = await request('/auth/login', { method: 'POST', body: { username, password } });
@@ -158,10 +170,13 @@ export const budgeting = {
   createBudget: (b) => request('/budgets', { method: 'POST', body: b }),
   updateBudget: (id, b) => request(`/budgets/${id}`, { method: 'PUT', body: b }),
   deleteBudget: (id) => request(`/budgets/${id}`, { method: 'DELETE' }),
+  // Many creates/updates/deletes in one transaction: { create: [], update: [{id, ...}], delete: [ids] }
+  batchBudgets: (b) => request('/budgets/batch', { method: 'PATCH', body: b }),
 };
 
 budgeting.listBudgetsPaged = ({ page=0, pageSize=25, sortBy, sortDir, filters={} } = {}) => {
   const q = new URLSearchParams();
+  q.set('format', 'columnar');
   q.set('page', page);
   q.set('page_size', pageSize);
   if (sortBy) q.set('sort_by', sortBy);
@@ -169,7 +184,7 @@ budgeting.listBudgetsPaged = ({ page=0, pageSize=25, sortBy, sortDir, filters={}
   ['hospital_id','facility_id','budget_line_id','activity_id','level','q'].forEach(k=>{
     if (filters[k] !== undefined && filters[k] !== '' && filters[k] !== null) q.set(k, filters[k]);
   });
-  return request(`/budgets?${q.toString()}`);
+  return request(`/budgets?${q.toString()}`).then(fromColumnar);
 };
 
 budgeting.aggregateBudgets = (filters = {}) => {
@@ -189,8 +204,10 @@ export const cashbook = {
     if (sortDir) q.set('sortDir', sortDir);
     q.set('page', page);
     q.set('pageSize', pageSize);
-    const data = await request(`/cashbooks?${q.toString()}`);
-    return Array.isArray(data) ? { items: data, total: data.length } : data;
+    q.set('format', 'columnar');
+    const data = fromColumnar(await request(`/cashbooks?${q.toString()}`));
+    if (Array.isArray(data)) return { items: data, total: data.length };
+    return data.total === undefined ? { ...data, total: data.items.length } : data;
   },
 
   create(payload) {
@@ -208,7 +225,8 @@ export const cashbook = {
   // Accounts
   listAccounts() {
     // Always return an array so UI can safely .map()
-    return request('/accounts').then((data) => {
+    return request('/accounts?format=columnar').then((raw) => {
+      const data = fromColumnar(raw);
       if (Array.isArray(data)) return data;
       if (data && Array.isArray(data.items)) return data.items;
       return [];
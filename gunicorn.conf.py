@@ -0,0 +1,10 @@
+"""
+Gunicorn hooks; gunicorn loads ./gunicorn.conf.py automatically.
+"""
+
+
+def child_exit(server, worker):
+    # live gauges (pool occupancy, running jobs) stop counting an exited worker
+    from services.metrics import mark_worker_dead
+
+    mark_worker_dead(worker.pid)
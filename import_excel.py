@@ -1,8 +1,9 @@
-import sys, pandas as pd, re
+import sys, re
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from dateutil import parser as dtparser
-from config import db_uri
+from config import Settings, db_uri
+from services.refcache import RefDataCache
 from models import Base, Country, Province, District, Hospital, Facility, BudgetLine, Quarter, QuarterLine, FacilityLevelEnum, AccessLevelEnum, User
 from sqlalchemy.orm import Session
 from sqlalchemy import select
@@ -203,10 +204,12 @@ def first_non_empty(values):
     return None
 
 def load_workbook(path:str):
+    import pandas as pd
     xls = pd.ExcelFile(path)
     return xls
 
 def infer_header(xls, sheet_name):
+    import pandas as pd
     df = pd.read_excel(xls, sheet_name=sheet_name, header=None)
     # find first row that looks like a header (contains 'Subawardee' or 'SITE' etc.) for metadata
     meta = {}
@@ -241,6 +244,7 @@ def import_basic_geo(session, meta):
     return prov, dist, fac
 
 def import_budget_lines(session, xls, fac_id:int):
+    import pandas as pd
     # Try to read "Y1 BUDGET FRW" if present
     if "Y1 BUDGET FRW" not in xls.sheet_names and "Y1_CS Budget_Frw" not in xls.sheet_names:
         return
@@ -307,6 +311,7 @@ def main(xlsx_path:str):
         import_budget_lines(session, xls, fac.id)
         import_quarter(session, fac.id, xls, year=2024, quarter=1)
         session.commit()
+        RefDataCache(Settings.REFDATA_VERSION_FILE).bump()
         print(f"Imported facility '{fac.name}' in {prov.name} / {dist.name}.")
 
 def username_from_facility(name: str, code: str) -> str:
@@ -4,6 +4,7 @@ from alembic import context
 
 from config import db_uri
 from models import Base
+from services.partitions import schema_drift_filter
 
 config = context.config
 fileConfig(config.config_file_name)
@@ -31,11 +32,18 @@ def run_migrations_online():
         poolclass=pool.NullPool,
     )
 
+    # on its own connection: a query on the migration connection would leave
+    # alembic inside a transaction it does not commit
+    with connectable.connect() as connection:
+        # partitioned ledgers differ from the models on purpose
+        include_object = schema_drift_filter(connection)
+
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,34 @@
+"""quarter line budget line
+
+Revision ID: 5c2e8a41d9b3
+Revises: 207f63773212
+Create Date: 2026-10-19 09:12:04.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8a41d9b3'
+down_revision: Union[str, Sequence[str], None] = '207f63773212'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('quarter_line') as batch_op:
+        batch_op.add_column(sa.Column('budget_line_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_quarter_line_budget_line_id', 'budget_lines', ['budget_line_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_quarter_line_budget_line_id'), ['budget_line_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('quarter_line') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_quarter_line_budget_line_id'))
+        batch_op.drop_constraint('fk_quarter_line_budget_line_id', type_='foreignkey')
+        batch_op.drop_column('budget_line_id')
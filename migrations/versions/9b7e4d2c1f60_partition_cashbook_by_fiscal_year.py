@@ -0,0 +1,28 @@
+"""partition cashbook by fiscal year
+
+Revision ID: 9b7e4d2c1f60
+Revises: 5c2e8a41d9b3
+Create Date: 2026-10-19 11:40:27.503118
+
+Intentionally empty. Partitioning cashbook and cashbook_entry by fiscal year
+(services/partitions.py) is an explicit operation, `flask partition_ledgers`
+(`--plain` reverts it), so this revision means the same schema everywhere.
+The revision is kept so the chain stays intact for databases already stamped
+with it.
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b7e4d2c1f60'
+down_revision: Union[str, Sequence[str], None] = '5c2e8a41d9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
@@ -0,0 +1,52 @@
+"""cashbook_entry txn_date not null
+
+Revision ID: a7c5e1d93b48
+Revises: f3b9c2d7e614
+Create Date: 2026-10-19 18:20:12.640215
+
+cashbook_entry.txn_date becomes NOT NULL; it is the partition key of the
+table once `flask partition_ledgers` has run. Rows without a date get the
+first day of their fiscal quarter (year, quarter), the period they are
+already reported in.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models import fiscal_quarter_bounds
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c5e1d93b48'
+down_revision: Union[str, Sequence[str], None] = 'f3b9c2d7e614'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    entry = sa.table(
+        'cashbook_entry',
+        sa.column('year', sa.Integer()), sa.column('quarter', sa.Integer()), sa.column('txn_date', sa.Date()),
+    )
+    bind = op.get_bind()
+    periods = bind.execute(
+        sa.select(entry.c.year, entry.c.quarter).where(entry.c.txn_date.is_(None)).distinct()
+    ).all()
+    for year, quarter in periods:
+        start, _ = fiscal_quarter_bounds(year, quarter)
+        op.execute(
+            entry.update()
+            .where(entry.c.txn_date.is_(None), entry.c.year == year, entry.c.quarter == quarter)
+            .values(txn_date=start)
+        )
+
+    with op.batch_alter_table('cashbook_entry') as batch_op:
+        batch_op.alter_column('txn_date', existing_type=sa.Date(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cashbook_entry') as batch_op:
+        batch_op.alter_column('txn_date', existing_type=sa.Date(), nullable=True)
@@ -0,0 +1,41 @@
+"""cashbook fiscal year
+
+Revision ID: c3a1f9e84b2d
+Revises: 9b7e4d2c1f60
+Create Date: 2026-10-19 13:05:51.271940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a1f9e84b2d'
+down_revision: Union[str, Sequence[str], None] = '9b7e4d2c1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('cashbook') as batch_op:
+        batch_op.add_column(sa.Column('fiscal_year', sa.Integer(), nullable=True))
+
+    # fiscal year Y runs Oct Y .. Sep Y+1
+    cashbook = sa.table('cashbook', sa.column('transaction_date', sa.Date()), sa.column('fiscal_year', sa.Integer()))
+    year = sa.extract('year', cashbook.c.transaction_date)
+    month = sa.extract('month', cashbook.c.transaction_date)
+    op.execute(cashbook.update().values(fiscal_year=sa.case((month >= 10, year), else_=year - 1)))
+
+    with op.batch_alter_table('cashbook') as batch_op:
+        batch_op.alter_column('fiscal_year', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_cashbook_period', ['facility_id', 'fiscal_year', 'quarter', 'transaction_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cashbook') as batch_op:
+        batch_op.drop_index('ix_cashbook_period')
+        batch_op.drop_column('fiscal_year')
@@ -0,0 +1,45 @@
+"""fiscal calendar
+
+Revision ID: e8d42b7a9c15
+Revises: c3a1f9e84b2d
+Create Date: 2026-10-19 14:22:08.614305
+
+Creates the fiscal_calendar date dimension and fills it for every ledger
+date plus the next fiscal year (see services/fiscal_calendar.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from services.fiscal_calendar import ensure_fiscal_calendar
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8d42b7a9c15'
+down_revision: Union[str, Sequence[str], None] = 'c3a1f9e84b2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'fiscal_calendar',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('fiscal_year', sa.Integer(), nullable=False),
+        sa.Column('quarter', sa.Integer(), nullable=False),
+        sa.Column('fiscal_month', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('week', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('date'),
+    )
+    op.create_index('ix_fiscal_calendar_period', 'fiscal_calendar',
+                    ['fiscal_year', 'quarter', 'fiscal_month', 'week', 'date'], unique=False)
+    ensure_fiscal_calendar(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_fiscal_calendar_period', table_name='fiscal_calendar')
+    op.drop_table('fiscal_calendar')
@@ -0,0 +1,60 @@
+"""period balance
+
+Revision ID: f3b9c2d7e614
+Revises: e8d42b7a9c15
+Create Date: 2026-10-19 16:05:41.207719
+
+Creates period_balance, the closing balances frozen by POST
+/quarters/<id>/close (see services/period_close.py), and
+quarter.status_before_close, restored when a quarter is reopened. Existing
+quarters stay open; close them through the API to freeze their balances.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9c2d7e614'
+down_revision: Union[str, Sequence[str], None] = 'e8d42b7a9c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('quarter') as batch_op:
+        batch_op.add_column(sa.Column('status_before_close', sa.String(length=50), nullable=True))
+    op.create_table(
+        'period_balance',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('quarter_id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('quarter', sa.Integer(), nullable=False),
+        sa.Column('opening_balance', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('inflow', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('outflow', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('closing_balance', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('entries', sa.Integer(), nullable=False),
+        sa.Column('closed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['account_id'], ['account.id'], ),
+        sa.ForeignKeyConstraint(['facility_id'], ['facility.id'], ),
+        sa.ForeignKeyConstraint(['quarter_id'], ['quarter.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_period_balance_quarter_id'), 'period_balance', ['quarter_id'], unique=False)
+    op.create_index('ix_period_balance_facility', 'period_balance', ['facility_id', 'year', 'quarter'], unique=False)
+    op.create_index('ix_period_balance_account', 'period_balance', ['account_id', 'year', 'quarter'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_period_balance_account', table_name='period_balance')
+    op.drop_index('ix_period_balance_facility', table_name='period_balance')
+    op.drop_index(op.f('ix_period_balance_quarter_id'), table_name='period_balance')
+    op.drop_table('period_balance')
+    with op.batch_alter_table('quarter') as batch_op:
+        batch_op.drop_column('status_before_close')
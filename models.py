@@ -17,13 +17,16 @@ from sqlalchemy import (
     select,
     and_,
     CheckConstraint,
-    Boolean
+    Boolean,
 )
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, Session
 import enum
 from typing import Optional
 import re
 
+from services.database import begin_write
+
 
 class Base(DeclarativeBase):
     pass
@@ -244,29 +247,66 @@ class Quarter(Base):
     quarter: Mapped[int] = mapped_column(Integer, nullable=False)  # 1..4
     reporting_period: Mapped[str | None] = mapped_column(String(120))
     status: Mapped[str | None] = mapped_column(String(50))
+    # status the quarter had when it was closed, restored by a reopen
+    status_before_close: Mapped[str | None] = mapped_column(String(50))
 
     facility = relationship("Facility")
 
 
+# Quarter.status of a closed quarter: its ledgers are frozen in period_balance and no longer editable
+QUARTER_CLOSED = "CLOSED"
+
+
+class PeriodBalance(Base):
+    """
+    Balances frozen by closing a quarter (POST /quarters/<id>/close): one row
+    for the facility's cashbook_entry ledger (account_id NULL, used by the bank
+    reconciliation) and one per cashbook account. The next quarter's opening
+    balance is the closing_balance of this row.
+    """
+    __tablename__ = "period_balance"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    quarter_id: Mapped[int] = mapped_column(ForeignKey("quarter.id"), nullable=False, index=True)
+    facility_id: Mapped[int] = mapped_column(ForeignKey("facility.id"), nullable=False)
+    account_id: Mapped[int | None] = mapped_column(ForeignKey("account.id"), nullable=True)
+    year: Mapped[int] = mapped_column(Integer, nullable=False)
+    quarter: Mapped[int] = mapped_column(Integer, nullable=False)  # 1..4
+    opening_balance: Mapped[Decimal] = mapped_column(Numeric(16, 2), nullable=False)
+    inflow: Mapped[Decimal] = mapped_column(Numeric(16, 2), nullable=False)
+    outflow: Mapped[Decimal] = mapped_column(Numeric(16, 2), nullable=False)
+    closing_balance: Mapped[Decimal] = mapped_column(Numeric(16, 2), nullable=False)
+    entries: Mapped[int] = mapped_column(Integer, nullable=False)
+    closed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_period_balance_facility", "facility_id", "year", "quarter"),
+        Index("ix_period_balance_account", "account_id", "year", "quarter"),
+    )
+
+
 class QuarterLine(Base):
     __tablename__ = "quarter_line"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     quarter_id: Mapped[int] = mapped_column(ForeignKey("quarter.id"), nullable=False)
+    budget_line_id: Mapped[int | None] = mapped_column(ForeignKey("budget_lines.id"), nullable=True, index=True)
     planned: Mapped[float | None] = mapped_column(Numeric(16, 2))
     actual: Mapped[float | None] = mapped_column(Numeric(16, 2))
     variance: Mapped[float | None] = mapped_column(Numeric(16, 2))
     comments: Mapped[str | None] = mapped_column(Text)
 
     quarter = relationship("Quarter")
+    budget_line = relationship("BudgetLine")
 
 
 class CashbookEntry(Base):
     __tablename__ = "cashbook_entry"
+    # partitioned by txn_date after `flask partition_ledgers`: the database
+    # primary key is then (id, txn_date), see services/partitions.py
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     facility_id: Mapped[int] = mapped_column(ForeignKey("facility.id"), nullable=False)
     year: Mapped[int] = mapped_column(Integer, nullable=False)
     quarter: Mapped[int] = mapped_column(Integer, nullable=False)
-    txn_date: Mapped[Date] = mapped_column(Date)
+    txn_date: Mapped[date] = mapped_column(Date, nullable=False)
     reference: Mapped[str | None] = mapped_column(String(120))
     description: Mapped[str | None] = mapped_column(String(400))
     inflow: Mapped[float | None] = mapped_column(Numeric(16, 2))
@@ -354,6 +394,26 @@ def quarter_from_date(d: date) -> QuarterEnum:
     return QuarterEnum.Q4  # (7, 8, 9)
 
 
+def fiscal_year_from_date(d: date) -> int:
+    # fiscal year Y runs Oct Y .. Sep Y+1
+    return d.year if d.month >= 10 else d.year - 1
+
+
+def fiscal_quarter_bounds(year: int, quarter: int) -> tuple[date, date]:
+    """
+    First and last day of fiscal quarter 1..4 of fiscal year `year`
+    (fiscal year `year` runs Oct `year` .. Sep `year + 1`).
+    """
+    if quarter not in (1, 2, 3, 4):
+        raise ValueError("quarter must be 1..4")
+    start_month = (10, 1, 4, 7)[quarter - 1]
+    start_year = year if quarter == 1 else year + 1
+    start = date(start_year, start_month, 1)
+    end_month = start_month + 2
+    end = date(start_year, end_month, 31 if end_month in (12, 3) else 30)
+    return start, end
+
+
 def initials_from_name(name: str) -> str:
     cleaned = re.sub(r"[^A-Za-z]", "", name or "").upper()
     if not cleaned:
@@ -365,6 +425,27 @@ def initials_from_name(name: str) -> str:
     return letters
 
 
+# ---- Fiscal calendar ----
+
+class FiscalCalendar(Base):
+    """
+    Date dimension: one generated row per day with its fiscal period, so SQL
+    can group dated rows by any grain with a join on `date` (see
+    services/fiscal_calendar.py). Weeks count 7-day blocks from 1 October.
+    """
+    __tablename__ = "fiscal_calendar"
+    date: Mapped[Date] = mapped_column(Date, primary_key=True)
+    fiscal_year: Mapped[int] = mapped_column(Integer, nullable=False)
+    quarter: Mapped[int] = mapped_column(Integer, nullable=False)        # 1..4, Q1 = Oct-Dec
+    fiscal_month: Mapped[int] = mapped_column(Integer, nullable=False)   # 1..12, October = 1
+    month: Mapped[int] = mapped_column(Integer, nullable=False)          # calendar month 1..12
+    week: Mapped[int] = mapped_column(Integer, nullable=False)           # 1..53
+
+    __table_args__ = (
+        Index("ix_fiscal_calendar_period", "fiscal_year", "quarter", "fiscal_month", "week", "date"),
+    )
+
+
 # ---- Account ----
 
 class Account(Base):
@@ -391,12 +472,18 @@ class Account(Base):
 class Cashbook(Base):
     __tablename__ = "cashbook"
 
+    # partitioned by transaction_date after `flask partition_ledgers`: the
+    # database primary key is then (id, transaction_date) and the reference
+    # index is plain, its uniqueness held by the ix_cashbook_reference_guard
+    # table (services/partitions.py)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
 
     transaction_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
     quarter: Mapped[QuarterEnum] = mapped_column(
         Enum(QuarterEnum), nullable=False, index=True
     )
+    # fiscal year the quarter belongs to (Oct..Sep); set with the quarter
+    fiscal_year: Mapped[int] = mapped_column(Integer, nullable=False)
 
     hospital_id: Mapped[int | None] = mapped_column(
         ForeignKey("hospital.id"), nullable=True, index=True
@@ -461,20 +548,14 @@ class Cashbook(Base):
             "(hospital_id IS NOT NULL) OR (facility_id IS NOT NULL)",
             name="ck_org_one_present",
         ),
+        Index("ix_cashbook_period", "facility_id", "fiscal_year", "quarter", "transaction_date"),
     )
 
     @classmethod
     def _quarter_from_date(cls, dt: date) -> str:
         if dt is None:
             raise ValueError("transaction_date is required to determine quarter")
-        m = dt.month
-        if 1 <= m <= 3:
-            return "Q2"
-        if 4 <= m <= 6:
-            return "Q3"
-        if 7 <= m <= 9:
-            return "Q4"
-        return "Q1"
+        return quarter_from_date(dt).value
 
     @classmethod
     def set_quarter(cls, cb: "Cashbook") -> None:
@@ -482,12 +563,38 @@ class Cashbook(Base):
             raise ValueError("transaction_date is required to determine quarter")
 
         q_code = cls._quarter_from_date(cb.transaction_date)
+        cb.fiscal_year = fiscal_year_from_date(cb.transaction_date)
 
         try:
             cb.quarter = QuarterEnum[q_code]
         except KeyError:
             cb.quarter = QuarterEnum(q_code)
 
+    # first key of the two-int pg_advisory_xact_lock(space, account_id) used for cashbook writes
+    ACCOUNT_LOCK_SPACE = 0x43424B  # "CBK"
+
+    @classmethod
+    def lock_accounts(cls, sess: Session, *account_ids: int) -> None:
+        """
+        Serialize cashbook writes per account until the transaction ends. Call it
+        before prepare_for_insert/recalc_account_balances so the previous balance
+        is read after any concurrent write to the same account has committed.
+        Writes to other accounts are not blocked, except on SQLite, which
+        serializes all writers on one database-wide lock anyway: there it only
+        begins the transaction with BEGIN IMMEDIATE (begin_write), so routes that
+        read before locking call begin_write first.
+        """
+        dialect = sess.get_bind().dialect.name
+        if dialect == "sqlite":
+            begin_write(sess)
+            return
+        # sorted, so two writers needing the same pair of accounts cannot deadlock
+        for account_id in sorted({a for a in account_ids if a is not None}):
+            if dialect == "postgresql":
+                sess.execute(select(func.pg_advisory_xact_lock(cls.ACCOUNT_LOCK_SPACE, account_id)))
+            else:
+                sess.execute(select(Account.id).where(Account.id == account_id).with_for_update())
+
     @classmethod
     def prepare_for_insert(cls, sess: Session, cb: "Cashbook") -> None:
         if cb.quarter is None:
@@ -497,9 +604,8 @@ class Cashbook(Base):
                 cb.quarter = QuarterEnum[cb.quarter]
             except KeyError:
                 cb.quarter = QuarterEnum(cb.quarter)
-
-        if not cb.reference:
-            cb.reference = cls._generate_reference(sess, cb)
+        if cb.fiscal_year is None:
+            cb.fiscal_year = fiscal_year_from_date(cb.transaction_date)
 
         if cb.balance is None:
             last = (
@@ -531,19 +637,50 @@ class Cashbook(Base):
             running += ci - co
             r.balance = running
 
+    # numbers tried for a generated reference before the IntegrityError is raised
+    REFERENCE_ATTEMPTS = 20
+
     @classmethod
-    def _generate_reference(cls, sess: Session, cb: "Cashbook") -> str:
+    def insert(cls, sess: Session, cb: "Cashbook") -> None:
+        """
+        Add and flush a prepared entry, generating its reference if it has none.
+        Generated references are numbered per day across all accounts, and
+        writers to different accounts do not block each other, so two of them
+        can pick the same number: each try flushes in a savepoint and a clash
+        moves on to the next number.
+        """
+        if cb.reference:
+            sess.add(cb)
+            sess.flush()
+            return
+        taken = None
+        for attempt in range(cls.REFERENCE_ATTEMPTS):
+            cb.reference = cls._generate_reference(sess, cb, taken)
+            try:
+                with sess.begin_nested():
+                    sess.add(cb)
+                    sess.flush()
+                return
+            except IntegrityError:
+                if attempt == cls.REFERENCE_ATTEMPTS - 1:
+                    raise
+                taken = cb.reference
+
+    @classmethod
+    def _generate_reference(cls, sess: Session, cb: "Cashbook", taken: str | None = None) -> str:
         prefix = "CBK"
         d = cb.transaction_date.strftime("%Y%m%d")
+        # reference is unique across accounts, so number the day's entries of all of them
         count = (
             sess.query(cls)
-            .filter(
-                cls.account_id == cb.account_id,
-                cls.transaction_date == cb.transaction_date,
-            )
+            .filter(cls.transaction_date == cb.transaction_date)
             .count()
         )
-        return f"{prefix}-{d}-{count + 1:04d}"
+        n = count + 1
+        if taken:
+            # `taken` clashed with an entry this transaction may not see yet
+            n = max(n, int(taken.rsplit("-", 1)[1]) + 1)
+        return f"{prefix}-{d}-{n:04d}"
 
 
 # ---- Users & auth ----
@@ -144,6 +144,29 @@ class BudgetSchema(Schema):
             raise ValidationError("Either hospital_id or facility_id must be provided.")
 
 
+class BudgetBatchUpdateSchema(BudgetSchema):
+    """One "update" item of PATCH /budgets/batch: the budget id plus the fields to change."""
+    id = fields.Int(validate=validate.Range(min=1))
+
+    @validates_schema
+    def validate_id(self, data, **kwargs):
+        if "id" not in data:
+            raise ValidationError("Each update requires an 'id'.", "id")
+
+
+class BudgetBatchSchema(Schema):
+    """Body of PATCH /budgets/batch: {"create": [{...}], "update": [{"id": .., ...}], "delete": [id, ...]}."""
+    create = fields.List(fields.Nested(BudgetSchema), allow_none=True)
+    update = fields.List(fields.Nested(BudgetBatchUpdateSchema(partial=True)), allow_none=True)
+    delete = fields.List(fields.Int(validate=validate.Range(min=1)), allow_none=True)
+
+    @validates_schema
+    def validate_disjoint(self, data, **kwargs):
+        both = sorted({item["id"] for item in data.get("update") or []} & set(data.get("delete") or []))
+        if both:
+            raise ValidationError(f"Budgets cannot be both updated and deleted: {both}", "delete")
+
+
 # ------------------------------------------------------------
 # QUARTER (EXECUTION)
 # ------------------------------------------------------------
@@ -160,6 +183,7 @@ class QuarterSchema(Schema):
 class QuarterLineSchema(Schema):
     id = fields.Int(dump_only=True)
     quarter_id = fields.Int(required=True)
+    budget_line_id = fields.Int(allow_none=True)
 
     planned = fields.Decimal(as_string=True, allow_none=True)
     actual = fields.Decimal(as_string=True, allow_none=True)
@@ -395,6 +419,7 @@ class CashbookReadSchema(Schema):
     transaction_date = fields.Date()
 
     quarter = EnumField(QuarterEnum, by_value=True)
+    fiscal_year = fields.Integer()
 
     hospital_id = fields.Integer(allow_none=True)
     facility_id = fields.Integer(allow_none=True)
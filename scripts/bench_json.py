@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: encode a large cashbook-style payload with each JSON provider
+(Settings.JSON_PROVIDER = "flask" | "fast").
+
+    python scripts/bench_json.py [rows]
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from services import json_provider
+from services.json_provider import JSON_PROVIDERS
+
+
+def payload(n: int):
+    start = date(2024, 10, 1)
+    return [
+        {
+            "id": i,
+            "transaction_date": (start + timedelta(days=i % 365)).isoformat(),
+            "quarter": "Q1",
+            "facility_id": 1,
+            "account_id": 1,
+            "reference": f"CBK-{i:08d}",
+            "vat_requirement": "VAT_REQUIRED",
+            "description": f"Payment for row {i}",
+            "budget_line_id": 3,
+            "activity_id": 7,
+            "cash_in": None,
+            "cash_out": Decimal("125.50"),
+            "balance": Decimal("125.50") * i,
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = payload(n)
+    app = Flask(__name__)
+
+    variants = [("flask", JSON_PROVIDERS["flask"]), ("fast", JSON_PROVIDERS["fast"])]
+    if json_provider.orjson is not None:
+        variants.append(("fast (stdlib fallback)", None))
+
+    for label, cls in variants:
+        saved = json_provider.orjson
+        if cls is None:
+            json_provider.orjson = None
+            cls = JSON_PROVIDERS["fast"]
+        provider = cls(app)
+        with app.app_context():
+            best = None
+            for _ in range(5):
+                t0 = time.perf_counter()
+                body = provider.response(data).get_data()
+                dt = time.perf_counter() - t0
+                best = dt if best is None else min(best, dt)
+        json_provider.orjson = saved
+        print(f"{label:<24} {best * 1000:9.1f} ms  {len(body) / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
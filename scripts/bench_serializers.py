@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: marshmallow Schema(many=True).dump() over ORM entities vs the
+column-projected RowSerializer used by the list endpoints.
+
+    python scripts/bench_serializers.py [rows]
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from models import (Base, Country, Province, District, Facility, BudgetLine, Activity, Account, Cashbook,
+                    FacilityLevelEnum, AccountTypeEnum, VATRequirementEnum, QuarterEnum)
+from schemas import CashbookReadSchema
+from services.serializers import RowSerializer
+
+
+def seed(sess: Session, n: int):
+    c = Country(name="Rwanda", code="RW")
+    p = Province(name="P", code="P", country=c)
+    d = District(name="D", code="D", province=p)
+    f = Facility(name="F", code="F", level=FacilityLevelEnum.HEALTH_CENTRE, country=c, province=p, district=d)
+    bl = BudgetLine(code="BL", name="BL")
+    act = Activity(code="A", name="A", budget_line=bl)
+    acc = Account(name="Bank", type=AccountTypeEnum.BANK, facility=f)
+    sess.add_all([c, p, d, f, bl, act, acc])
+    sess.flush()
+    start = date(2024, 10, 1)
+    sess.add_all(
+        Cashbook(
+            transaction_date=start + timedelta(days=i % 365),
+            quarter=QuarterEnum.Q1,
+            fiscal_year=2024,
+            facility_id=f.id,
+            account_id=acc.id,
+            reference=f"CBK-{i:08d}",
+            vat_requirement=VATRequirementEnum.REQUIRED,
+            description=f"row {i}",
+            budget_line_id=bl.id,
+            activity_id=act.id,
+            cash_in=Decimal("125.50"),
+            balance=Decimal("125.50") * (i + 1),
+        )
+        for i in range(n)
+    )
+    sess.commit()
+
+
+def timed(label, fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    print(f"{label:<28} {best * 1000:9.1f} ms  ({len(out)} rows)")
+    return out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+    with Session(engine) as sess:
+        seed(sess, n)
+
+    schema = CashbookReadSchema(many=True)
+    rows = RowSerializer(CashbookReadSchema, Cashbook)
+
+    def orm_dump():
+        with Session(engine) as sess:
+            return schema.dump(sess.scalars(select(Cashbook)).all())
+
+    def fast_dump():
+        with Session(engine) as sess:
+            return rows.dump_rows(sess.execute(rows.select()))
+
+    a = timed("ORM + marshmallow dump", orm_dump)
+    b = timed("select() + RowSerializer", fast_dump)
+    assert a == b, "serializers disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+SQLite concurrency benchmark: several worker processes (like gunicorn
+workers) each run short read-then-write transactions against one database
+file, first with SQLite defaults and then with the SQLITE_* connect profile.
+
+    python scripts/bench_sqlite.py [workers] [transactions_per_worker]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from config import Settings
+from models import Base, Country, District, Facility, FacilityLevelEnum, Obligation, Province
+from services.database import make_engine
+
+
+def _settings(profile: bool):
+    return type("BenchSettings", (Settings,), {"SQLITE_PRAGMAS": profile})
+
+
+def _seed(url: str, profile: bool) -> int:
+    engine = make_engine(url, _settings(profile))
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        country = Country(name="Bench", code="BN")
+        db.add(country)
+        db.flush()
+        province = Province(name="P", code="P", country_id=country.id)
+        db.add(province)
+        db.flush()
+        district = District(name="D", code="D", province_id=province.id)
+        db.add(district)
+        db.flush()
+        fac = Facility(name="F", code="F", level=list(FacilityLevelEnum)[0],
+                       country_id=country.id, province_id=province.id, district_id=district.id)
+        db.add(fac)
+        db.commit()
+        fid = fac.id
+    engine.dispose()
+    return fid
+
+
+def _worker(args):
+    url, profile, facility_id, n = args
+    engine = make_engine(url, _settings(profile))
+    done = errors = 0
+    start = time.time()
+    for i in range(n):
+        try:
+            with Session(engine) as db:
+                total = db.scalar(select(func.coalesce(func.sum(Obligation.amount), 0))
+                                  .where(Obligation.facility_id == facility_id))
+                db.add(Obligation(facility_id=facility_id, year=2025, quarter=1,
+                                  vendor=f"v{os.getpid()}-{i}", amount=Decimal("1.00"),
+                                  description=str(total)))
+                db.commit()
+            done += 1
+        except OperationalError:
+            errors += 1
+    end = time.time()
+    engine.dispose()
+    return done, errors, start, end
+
+
+def run(profile: bool, workers: int, n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        fid = _seed(url, profile)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers) as pool:
+            results = pool.map(_worker, [(url, profile, fid, n)] * workers)
+    # wall time from the first worker starting to the last one finishing
+    elapsed = max(r[3] for r in results) - min(r[2] for r in results)
+    done = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    label = "profile (WAL, NORMAL)" if profile else "defaults"
+    print(f"{label:>22}: {done:6d} commits in {elapsed:6.2f}s = {done / elapsed:8.1f} tx/s, "
+          f"{errors} 'database is locked' errors")
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    print(f"{workers} workers x {n} read+insert transactions")
+    run(False, workers, n)
+    run(True, workers, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup benchmark: what a fresh gunicorn worker pays before serving traffic.
+
+Each run is a new interpreter that imports `app`, calls create_app() and
+serves one authenticated GET /countries, against a throwaway SQLite database
+whose schema is created beforehand (as `flask db_init` would).
+
+    python scripts/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as appmod
+t1 = time.perf_counter()
+app = appmod.create_app()
+t2 = time.perf_counter()
+from flask_jwt_extended import create_access_token
+with app.app_context():
+    token = create_access_token(identity="1", additional_claims={"access_level": "COUNTRY"})
+client = app.test_client()
+t3 = time.perf_counter()
+resp = client.get("/countries", headers={"Authorization": f"Bearer {token}"})
+t4 = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+heavy = [m for m in ("pandas", "numpy", "openpyxl", "pyarrow") if m in sys.modules]
+print(json.dumps({"import": t1 - t0, "create_app": t2 - t1, "first_request": t4 - t3, "heavy": heavy}))
+"""
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "REFDATA_VERSION_FILE": os.path.join(tmp, "refdata.version"),
+            "SECRET_KEY": "bench",
+            "JWT_SECRET_KEY": "bench",
+        }
+        subprocess.run(
+            [sys.executable, "-c", "import os; from sqlalchemy import create_engine; from models import Base; "
+             "Base.metadata.create_all(create_engine(os.environ['DATABASE_URL']))"],
+            cwd=ROOT, env=env, check=True,
+        )
+
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", CHILD], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+            ).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+
+    for key in ("import", "create_app", "first_request"):
+        values = [s[key] * 1000 for s in samples]
+        print(f"{key:>14}: median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms")
+    total = [sum(s[k] for k in ("import", "create_app", "first_request")) * 1000 for s in samples]
+    print(f"{'total':>14}: median {statistics.median(total):8.1f} ms   min {min(total):8.1f} ms")
+    print(f"heavy modules loaded: {', '.join(samples[-1]['heavy']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@ import sys, pandas as pd, re
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from dateutil import parser as dtparser
-from config import db_uri
+from config import Settings, db_uri
+from services.refcache import RefDataCache
 from models import (Base, Province, District, Hospital, Facility, BudgetLine, Budget, Activity,
                     Quarter, QuarterLine, compute_budget_year, initials_from_name)
 from datetime import datetime, date
@@ -247,6 +248,7 @@ def main(xlsx_path:str):
         import_budget_lines(session, xls, fac.id)
         import_quarter(session, fac.id, xls, year=2024, quarter=1)
         session.commit()
+        RefDataCache(Settings.REFDATA_VERSION_FILE).bump()
         print(f"Imported facility '{fac.name}' in {prov.name} / {dist.name}.")
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+"""
+Concurrent cashbook write stress test: several worker processes (like
+gunicorn workers) POST /cashbooks for a handful of shared accounts at once,
+then every account's stored balances are checked against its running sum.
+
+    python scripts/stress_cashbook.py [workers] [writes_per_worker] [accounts] [--unlocked]
+
+Runs on a throwaway SQLite file unless DATABASE_URL is set (use an empty
+scratch Postgres database; the schema is created in it). --unlocked turns
+Cashbook.lock_accounts into a no-op to show the race it prevents: writers
+that read the same previous balance and reference number, so writes fail on
+the unique reference or store balances that miss a concurrent entry.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config import Settings
+from models import (
+    Account,
+    AccountTypeEnum,
+    Activity,
+    Base,
+    BudgetLine,
+    Cashbook,
+    Country,
+    District,
+    Facility,
+    FacilityLevelEnum,
+    Province,
+)
+from services.database import make_engine
+
+
+def _seed(url: str, accounts: int) -> dict:
+    engine = make_engine(url, Settings)
+    Base.metadata.create_all(engine)
+    tag = uuid.uuid4().hex[:6]
+    with Session(engine) as db:
+        country = Country(name=f"Stress {tag}", code=f"S{tag}")
+        db.add(country)
+        db.flush()
+        province = Province(name="P", code=f"P{tag}", country_id=country.id)
+        db.add(province)
+        db.flush()
+        district = District(name="D", code=f"D{tag}", province_id=province.id)
+        db.add(district)
+        db.flush()
+        fac = Facility(name="F", code=f"F{tag}", level=list(FacilityLevelEnum)[0],
+                       country_id=country.id, province_id=province.id, district_id=district.id)
+        line = BudgetLine(code=f"BL{tag}", name="Stress")
+        db.add_all([fac, line])
+        db.flush()
+        activity = Activity(budget_line_id=line.id, code=f"A{tag}", name="Stress")
+        accs = [Account(name=f"Acc {i}", type=AccountTypeEnum.BANK, facility_id=fac.id) for i in range(accounts)]
+        db.add_all([activity, *accs])
+        db.commit()
+        seed = {"facility_id": fac.id, "budget_line_id": line.id, "activity_id": activity.id,
+                "account_ids": [a.id for a in accs]}
+    engine.dispose()
+    return seed
+
+
+def _worker(args):
+    worker, n, seed, unlocked = args
+    import app as appmod
+    from flask_jwt_extended import create_access_token
+    from models import Cashbook as ChildCashbook
+
+    if unlocked:
+        ChildCashbook.lock_accounts = classmethod(lambda cls, sess, *ids: None)
+    app = appmod.create_app()
+    with app.app_context():
+        token = create_access_token(identity=f"stress-{worker}", additional_claims={"access_level": "COUNTRY"})
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    statuses = Counter()
+    start = time.time()
+    for i in range(n):
+        # every worker cycles through all accounts, so writes to one account overlap
+        k = (worker + i) % len(seed["account_ids"])
+        day = date(2024, 10, 1) + timedelta(days=i % 5)
+        payload = {
+            "transaction_date": day.isoformat(),
+            "facility_id": seed["facility_id"],
+            "account_id": seed["account_ids"][k],
+            "vat_requirement": "VAT_REQUIRED",
+            "budget_line_id": seed["budget_line_id"],
+            "activity_id": seed["activity_id"],
+        }
+        payload["cash_in" if i % 3 else "cash_out"] = "10.00" if i % 3 else "3.00"
+        try:
+            statuses[client.post("/cashbooks", json=payload, headers=headers).status_code] += 1
+        except Exception as e:  # the test client re-raises unhandled errors
+            statuses[type(e).__name__] += 1
+    return statuses, start, time.time()
+
+
+def _check(url: str, account_ids) -> tuple[int, int]:
+    """(rows, accounts whose stored balances differ from the running sum)."""
+    engine = make_engine(url, Settings)
+    rows = bad = 0
+    with Session(engine) as db:
+        for account_id in account_ids:
+            running = Decimal("0")
+            ok = True
+            for cb in db.scalars(select(Cashbook).where(Cashbook.account_id == account_id)
+                                 .order_by(Cashbook.transaction_date.asc(), Cashbook.id.asc())):
+                rows += 1
+                running += Decimal(cb.cash_in or 0) - Decimal(cb.cash_out or 0)
+                ok = ok and Decimal(cb.balance) == running
+            bad += not ok
+    engine.dispose()
+    return rows, bad
+
+
+def main():
+    argv = [a for a in sys.argv[1:] if not a.startswith("--")]
+    unlocked = "--unlocked" in sys.argv
+    workers = int(argv[0]) if len(argv) > 0 else 4
+    n = int(argv[1]) if len(argv) > 1 else 100
+    accounts = int(argv[2]) if len(argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+        # inherited by the spawned workers, which read them when config is imported
+        os.environ.update({
+            "DATABASE_URL": url,
+            "REFDATA_VERSION_FILE": os.path.join(tmp, "refdata.version"),
+            "READ_STICKY_DIR": os.path.join(tmp, "sticky"),
+            "METRICS_DIR": os.path.join(tmp, "metrics"),
+            "SECRET_KEY": os.environ.get("SECRET_KEY") or "stress",
+            "JWT_SECRET_KEY": os.environ.get("JWT_SECRET_KEY") or "stress",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL") or "CRITICAL",
+        })
+        seed = _seed(url, accounts)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers) as pool:
+            results = pool.map(_worker, [(w, n, seed, unlocked) for w in range(workers)])
+        rows, bad = _check(url, seed["account_ids"])
+
+    elapsed = max(r[2] for r in results) - min(r[1] for r in results)
+    statuses = sum((r[0] for r in results), Counter())
+    created = statuses.get(201, 0)
+    print(f"{workers} workers x {n} POST /cashbooks over {accounts} accounts"
+          f"{' (lock_accounts disabled)' if unlocked else ''}")
+    print(f"  {created} created in {elapsed:.2f}s = {created / elapsed:.1f} writes/s; "
+          f"responses: {dict(sorted(statuses.items(), key=str))}")
+    print(f"  {rows} rows stored, {bad} of {accounts} accounts with wrong balances")
+    if bad or rows != created or created != workers * n:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+gzip/deflate negotiation for large JSON responses.
+
+compress_response() is meant for an after_request hook: it only touches
+buffered (non-streamed) 200 responses above a size threshold whose client
+advertised support in Accept-Encoding.
+"""
+import gzip
+import zlib
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/csv"}
+
+
+def compress_response(response, accept_encodings, min_size: int = 1024, level: int = 6):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    encoding = accept_encodings.best_match(["gzip", "deflate"])
+    if not encoding:
+        return response
+
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+
+    if encoding == "gzip":
+        body = gzip.compress(body, compresslevel=level, mtime=0)
+    else:
+        body = zlib.compress(body, level)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+
+    # a compressed body is a different representation: downgrade strong ETags
+    # (If-None-Match uses weak comparison, so 304 revalidation still works)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,253 @@
+"""
+Engine construction with a tunable, observable connection pool.
+
+make_engine() applies the DB_POOL_* / DB_STATEMENT_TIMEOUT_MS settings and
+returns an engine whose pool records how long callers wait for a connection,
+so worker counts can be sized against Postgres max_connections. The engine
+is disposed in forked children (gunicorn --preload) so no socket opened in the
+master is ever shared between workers.
+
+SQLite engines get a connect-time pragma profile (WAL, synchronous=NORMAL,
+cache, busy timeout, mmap, foreign keys) so several workers on one box can
+write without "database is locked" errors. SQLAlchemy, not pysqlite, emits
+their BEGIN, so begin_write() can open a transaction with BEGIN IMMEDIATE.
+
+RoutingSession adds optional read-replica routing: plain reads go to the
+read engine when the caller allows it, flushes and DML always go to the
+primary. PrimaryStickiness keeps a user on the primary for a short window
+after they write, so they read their own writes despite replica lag.
+"""
+import hashlib
+import os
+import threading
+import time
+import weakref
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that keeps checkout wait statistics."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._stats_lock = threading.Lock()
+        self._local_get = threading.local()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; carry the counters over
+        new = super().recreate()
+        new.checkouts, new.timeouts = self.checkouts, self.timeouts
+        new.wait_total, new.wait_max = self.wait_total, self.wait_max
+        return new
+
+    def _do_get(self):
+        # QueuePool._do_get() retries by recursing; only time the outer call
+        local = self._local_get
+        if getattr(local, "active", False):
+            return super()._do_get()
+        local.active = True
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            local.active = False
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                if waited > self.wait_max:
+                    self.wait_max = waited
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": self.overflow(),
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+def sqlite_pragmas(settings) -> list[str]:
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        # negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if settings.SQLITE_FOREIGN_KEYS:
+        pragmas.append("PRAGMA foreign_keys=ON")
+    return pragmas
+
+
+def _apply_sqlite_profile(engine, settings):
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                cur.execute(pragma)
+        finally:
+            cur.close()
+
+
+def _sqlite_explicit_begin(engine):
+    @event.listens_for(engine, "connect")
+    def _no_driver_begin(dbapi_conn, _record):
+        # pysqlite would otherwise BEGIN (DEFERRED) by itself before the first DML
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', 'DEFERRED')}")
+
+
+def begin_write(sess: Session) -> None:
+    """
+    Start the session's transaction as a writer. On SQLite that is BEGIN
+    IMMEDIATE: SQLite serializes all writers on one database-wide lock, and a
+    transaction that reads before it writes fails with "database is locked"
+    when another writer commits in between, so a read-then-write transaction
+    takes the lock up front instead. Call it before the first query; it is a
+    no-op once the transaction has begun, and on other databases.
+    """
+    if sess.in_transaction() or sess.get_bind().dialect.name != "sqlite":
+        return
+    sess.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+# every live engine from make_engine(); weak, so disposed and dropped engines go away
+_engines = weakref.WeakSet()
+
+
+def _dispose_after_fork():
+    # forked workers must not reuse the parent's sockets; close=False leaves
+    # the parent's connections alone and just drops them from the child's pool
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+
+# one hook for the process: at-fork hooks cannot be unregistered, so a hook per
+# engine would keep every engine (and its pool) alive for good
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+def make_engine(url: str, settings, poolclass=None):
+    """
+    Build an engine from a URL and the pool section of config.Settings.
+    `poolclass` replaces the sized TimedQueuePool, e.g. NullPool for
+    short-lived processes that should not hold idle connections.
+    """
+    sa_url = make_url(url)
+    kw = {"future": True, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if poolclass is not None:
+        kw["poolclass"] = poolclass
+    elif not _is_memory_sqlite(sa_url):
+        kw.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    if settings.DB_STATEMENT_TIMEOUT_MS and sa_url.get_backend_name() == "postgresql":
+        kw["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+
+    sqlite_profile = sa_url.get_backend_name() == "sqlite" and settings.SQLITE_PRAGMAS
+    if sqlite_profile:
+        # pysqlite waits this long on a locked database before raising
+        kw["connect_args"] = {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+
+    engine = create_engine(sa_url, **kw)
+    if sa_url.get_backend_name() == "sqlite":
+        _sqlite_explicit_begin(engine)
+    if sqlite_profile:
+        _apply_sqlite_profile(engine, settings)
+    _engines.add(engine)
+    return engine
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, TimedQueuePool):
+        return pool.stats()
+    return {"pool": type(pool).__name__, "status": pool.status()}
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from info["read_engine"] whenever info["use_replica"]()
+    returns True. Configure both through sessionmaker(info=...).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        read_engine = self.info.get("read_engine")
+        if (
+            read_engine is not None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and self.info["use_replica"]()
+        ):
+            return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+class PrimaryStickiness:
+    """
+    Per-user "recently wrote" markers shared by all workers: mark() touches a
+    file under `directory`, active() checks its mtime against the window.
+    """
+
+    def __init__(self, directory: str, seconds: float):
+        self.directory = directory
+        self.seconds = seconds
+
+    def _path(self, identity) -> str:
+        name = hashlib.sha1(str(identity).encode()).hexdigest()
+        return os.path.join(self.directory, name)
+
+    def mark(self, identity) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(identity)
+        with open(path, "ab"):
+            pass
+        os.utime(path, None)
+
+    def active(self, identity) -> bool:
+        try:
+            return os.stat(self._path(identity)).st_mtime + self.seconds > time.time()
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,127 @@
+"""
+Multi-facility workbook bundles.
+
+Each facility workbook is written by write_quarter_workbook() in a separate
+process (spawned, with its own engine, so no pooled connection is shared with
+the parent). The spawn pool is started once per worker process and reused by
+every bundle. The parent adds workbooks to a zip file as they complete; a
+synchronous request sends that file only once every workbook succeeded, so a
+failure is an error response instead of a truncated download. Large scopes run
+as background jobs in the services.jobs registry under EXPORT_DIR, so any
+worker can answer status polls.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from config import Settings
+from services.database import make_engine
+from services.jobs import FileJobRegistry
+
+
+def _build_one(db_url: str, facility_id: int, year: int, quarter: int, out_dir: str):
+    # runs in a child process: import lazily and use a private, unpooled engine
+    # (still through make_engine, so SQLite gets its busy timeout and WAL profile)
+    from services.export_xlsx import workbook_filename, write_quarter_workbook
+
+    engine = make_engine(db_url, Settings, poolclass=NullPool)
+    try:
+        with Session(engine) as db:
+            name = workbook_filename(db, facility_id, year, quarter)
+            path = os.path.join(out_dir, name)
+            with open(path, "wb") as f:
+                write_quarter_workbook(db, facility_id, year, quarter, f)
+        return name, path
+    finally:
+        engine.dispose()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _workbook_pool(max_workers: int) -> ProcessPoolExecutor:
+    """This worker process's spawn pool of workbook builders; started on first use and kept."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # a forked worker does not own its parent's pool
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=max(1, max_workers),
+                                        mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor):
+    """Drop a pool whose child died, so the next bundle starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def write_bundle_zip(out, db_url: str, facility_ids, year: int, quarter: int, max_workers: int, progress=None):
+    """Write the zip of every facility workbook to the binary file `out`; raises if any workbook fails."""
+    work_dir = tempfile.mkdtemp(prefix="bundle-")
+    executor = _workbook_pool(max_workers)
+    futures = []
+    try:
+        with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            futures = [
+                executor.submit(_build_one, db_url, fid, year, quarter, work_dir) for fid in facility_ids
+            ]
+            for done, fut in enumerate(as_completed(futures), start=1):
+                name, path = fut.result()
+                zf.write(path, arcname=name)  # xlsx is already deflated
+                os.remove(path)
+                if progress:
+                    progress(done, len(futures))
+    except BrokenProcessPool:
+        _discard_pool(executor)
+        raise
+    finally:
+        for fut in futures:
+            fut.cancel()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class BundleJobs(FileJobRegistry):
+    """Background bundle exports, one thread each in the worker that started them."""
+
+    def zip_path(self, job_id: str) -> str:
+        return self.path(job_id, ".zip")
+
+    def start(self, owner: str, db_url: str, facility_ids, year: int, quarter: int, max_workers: int) -> str:
+        # imported here so spawned workbook builders do not load Flask
+        from services.metrics import JobMetrics
+
+        job_id, base = self.new_job("running", owner=owner, total=len(facility_ids), done=0)
+
+        def run():
+            part = self.zip_path(job_id) + ".part"
+            try:
+                with JobMetrics("export_bundle") as job:
+
+                    def progress(done, total):
+                        job.item()
+                        self.write_status(job_id, status="running", **{**base, "done": done})
+
+                    with open(part, "wb") as f:
+                        write_bundle_zip(f, db_url, facility_ids, year, quarter, max_workers, progress)
+                os.replace(part, self.zip_path(job_id))
+                self.write_status(job_id, status="done", **{**base, "done": len(facility_ids)})
+            except Exception as e:
+                self.write_status(job_id, status="failed", error=str(e), **base)
+
+        threading.Thread(target=run, name=f"bundle-{job_id}", daemon=True).start()
+        return job_id
@@ -0,0 +1,128 @@
+"""
+Streaming CSV for ledger lists and reports.
+
+Rows are read with a server-side cursor (yield_per) inside the response
+generator and written through csv.writer into a small buffer that is flushed
+every FLUSH_BYTES, so memory stays flat and the header line goes out before
+the first database chunk is fetched.
+"""
+import csv
+import io
+
+from flask import Response, stream_with_context
+
+from services.fiscal_calendar import GRAINS
+from services.reporting import bank_recon_balances, iter_bank_movements
+
+CHUNK = 1000
+FLUSH_BYTES = 64 * 1024
+
+
+def wants_csv(req) -> bool:
+    """?format=csv, or an Accept header that prefers text/csv over JSON."""
+    if req.args.get("format") == "csv":
+        return True
+    return req.accept_mimetypes.best_match(["application/json", "text/csv"]) == "text/csv"
+
+
+def iter_csv(header, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def csv_response(header, rows, filename: str) -> Response:
+    return Response(
+        stream_with_context(iter_csv(header, rows)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def iter_select_rows(session_factory, stmt, converters, chunk: int = CHUNK):
+    """Run a RowSerializer select in its own session and yield converted rows."""
+    with session_factory() as db:
+        for row in db.execute(stmt.execution_options(yield_per=chunk)):
+            yield [v if c is None or v is None else c(v) for c, v in zip(converters, row)]
+
+
+def rows_csv_response(session_factory, serializer, stmt, filename: str) -> Response:
+    return csv_response(serializer.keys, iter_select_rows(session_factory, stmt, serializer.converters), filename)
+
+
+# --- reports -----------------------------------------------------------------
+
+def _summary_rows(data):
+    for r in data["lines"]:
+        yield [r["component"], r["budget_line_code"], r["description"],
+               r["planned"], r["actual"], r["variance"], r["comments"]]
+    t = data["totals"]
+    yield ["Total", None, None, t["planned"], t["actual"], t["variance"], None]
+
+
+def _statement_rows(data):
+    for key in ("revenue", "expenditure", "obligations", "net"):
+        yield [key, data[key]]
+
+
+def _hrh_rows(data):
+    for p in data["positions"]:
+        yield [p.get("position"), p.get("planned"), p.get("actual")]
+    yield ["Total", data["totals"]["planned"], data["totals"]["actual"]]
+
+
+def _reallocation_rows(data):
+    for r in data["reallocations"]:
+        yield ["reallocation", r["date"], r["from_budget_line_id"], r["to_budget_line_id"], r["amount"], r["reason"]]
+    for r in data["redirections"]:
+        yield ["redirection", r["date"], r["from_component"], r["to_component"], r["amount"], r["reason"]]
+
+
+REPORT_TABLES = {
+    "summary": (["component", "budget_line_code", "description", "planned", "actual", "variance", "comments"],
+                _summary_rows),
+    "statement": (["item", "amount"], _statement_rows),
+    "hrh": (["position", "planned", "actual"], _hrh_rows),
+    "reallocation": (["type", "date", "from", "to", "amount", "reason"], _reallocation_rows),
+}
+
+
+def report_csv_response(name: str, data: dict, year: int, quarter: int) -> Response:
+    header, rows = REPORT_TABLES[name]
+    return csv_response(header, rows(data), f"{name}_FY{year}_Q{quarter}.csv")
+
+
+def period_totals_csv_response(data: dict) -> Response:
+    keys = list(GRAINS[data["grain"]])
+    values = ["entries", "cash_in", "cash_out", "net"]
+    rows = ([p[k] for k in keys + values] for p in data["periods"])
+    year = f"FY{data['fiscal_year']}" if data["fiscal_year"] is not None else "all"
+    return csv_response(keys + values, rows, f"periods_{data['grain']}_{year}.csv")
+
+
+def _bank_recon_rows(session_factory, facility_id, year, quarter):
+    with session_factory() as db:
+        opening, closing = bank_recon_balances(db, facility_id, year, quarter)
+        yield [None, None, "Opening balance", None, None, opening]
+        for m in iter_bank_movements(db, facility_id, year, quarter, chunk=CHUNK):
+            yield [m["date"], m["ref"], m["desc"], m["in"], m["out"], m["balance"]]
+        yield [None, None, "Closing balance", None, None, closing]
+
+
+def bank_recon_csv_response(session_factory, facility_id, year: int, quarter: int) -> Response:
+    return csv_response(
+        ["date", "reference", "description", "in", "out", "balance"],
+        _bank_recon_rows(session_factory, facility_id, year, quarter),
+        f"bank-recon_FY{year}_Q{quarter}.csv",
+    )
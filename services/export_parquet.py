@@ -0,0 +1,270 @@
+"""
+Partitioned Parquet extract for national analysis.
+
+Each dataset is read with a yield_per cursor ordered by its partition keys
+and appended to one pyarrow ParquetWriter per hive-style partition directory
+(e.g. cashbook/fiscal_year=2025/quarter=1/province_id=3/part-0.parquet).
+Because rows arrive sorted by partition, only one writer is open at a time
+and memory is bounded by the chunk size. A dataset is built in a temporary
+directory and swapped in when complete, so readers never see a half-written
+extract.
+
+pyarrow is an optional dependency and is only imported when an extract runs.
+"""
+import enum
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+from sqlalchemy import Boolean, Date, DateTime, Enum, Float, Integer, Numeric, func, select
+from sqlalchemy.orm import Session
+
+from models import (
+    Activity,
+    Budget,
+    BudgetLine,
+    Cashbook,
+    Country,
+    District,
+    Facility,
+    Hospital,
+    Obligation,
+    Province,
+)
+
+CHUNK = 10_000
+MANIFEST = "_manifest.json"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise RuntimeError("pyarrow is required for analytics exports (pip install pyarrow)") from e
+    return pa, pq
+
+
+def _cashbook():
+    province = func.coalesce(Facility.province_id, Hospital.province_id)
+    stmt = (
+        select(
+            Cashbook.fiscal_year.label("fiscal_year"),
+            Cashbook.quarter.label("quarter"),
+            province.label("province_id"),
+            Cashbook.id, Cashbook.transaction_date, Cashbook.hospital_id, Cashbook.facility_id,
+            Cashbook.account_id, Cashbook.reference, Cashbook.vat_requirement, Cashbook.description,
+            Cashbook.budget_line_id, BudgetLine.code.label("budget_line_code"),
+            Cashbook.activity_id, Activity.code.label("activity_code"),
+            Cashbook.cash_in, Cashbook.cash_out, Cashbook.balance, Cashbook.created_at,
+        )
+        .outerjoin(Facility, Cashbook.facility_id == Facility.id)
+        .outerjoin(Hospital, Cashbook.hospital_id == Hospital.id)
+        .outerjoin(BudgetLine, Cashbook.budget_line_id == BudgetLine.id)
+        .outerjoin(Activity, Cashbook.activity_id == Activity.id)
+    )
+    return stmt, 3, Cashbook.id
+
+
+def _budgets():
+    province = func.coalesce(Facility.province_id, Hospital.province_id)
+    stmt = (
+        select(
+            Budget.budget_year.label("budget_year"),
+            province.label("province_id"),
+            Budget.id, Budget.hospital_id, Budget.facility_id,
+            Budget.budget_line_id, BudgetLine.code.label("budget_line_code"),
+            Budget.activity_id, Activity.code.label("activity_code"),
+            Budget.activity_description, Budget.level,
+            Budget.estimated_number_quantity, Budget.estimated_frequency_occurrence,
+            Budget.unit_price_usd, Budget.cost_per_unit_rwf, Budget.percent_effort_share,
+            Budget.component_1, Budget.component_2, Budget.component_3, Budget.component_4,
+            Budget.start_date, Budget.end_date, Budget.is_validated, Budget.created_at,
+        )
+        .outerjoin(Facility, Budget.facility_id == Facility.id)
+        .outerjoin(Hospital, Budget.hospital_id == Hospital.id)
+        .outerjoin(BudgetLine, Budget.budget_line_id == BudgetLine.id)
+        .outerjoin(Activity, Budget.activity_id == Activity.id)
+    )
+    return stmt, 2, Budget.id
+
+
+def _obligations():
+    stmt = (
+        select(
+            Obligation.year.label("fiscal_year"),
+            Obligation.quarter.label("quarter"),
+            Facility.province_id.label("province_id"),
+            Obligation.id, Obligation.facility_id, Obligation.vendor, Obligation.invoice_no,
+            Obligation.description, Obligation.amount, Obligation.status,
+        )
+        .outerjoin(Facility, Obligation.facility_id == Facility.id)
+    )
+    return stmt, 3, Obligation.id
+
+
+def _facilities():
+    stmt = (
+        select(
+            Facility.province_id.label("province_id"),
+            Facility.id, Facility.code, Facility.name, Facility.level,
+            Facility.country_id, Country.name.label("country_name"),
+            Province.name.label("province_name"),
+            Facility.district_id, District.name.label("district_name"),
+            Facility.referral_hospital_id, Hospital.name.label("referral_hospital_name"),
+        )
+        .outerjoin(Country, Facility.country_id == Country.id)
+        .outerjoin(Province, Facility.province_id == Province.id)
+        .outerjoin(District, Facility.district_id == District.id)
+        .outerjoin(Hospital, Facility.referral_hospital_id == Hospital.id)
+    )
+    return stmt, 1, Facility.id
+
+
+# name -> () -> (select, number of leading partition columns, tie-break order column)
+DATASETS = {
+    "cashbook": _cashbook,
+    "budgets": _budgets,
+    "obligation": _obligations,
+    "facility": _facilities,
+}
+
+
+def _arrow_type(pa, sa_type):
+    if isinstance(sa_type, Enum):
+        return pa.string()
+    if isinstance(sa_type, Boolean):
+        return pa.bool_()
+    if isinstance(sa_type, Integer):
+        return pa.int64()
+    if isinstance(sa_type, Float):
+        return pa.float64()
+    if isinstance(sa_type, Numeric):
+        if sa_type.precision:
+            return pa.decimal128(sa_type.precision, sa_type.scale or 0)
+        return pa.float64()
+    if isinstance(sa_type, DateTime):
+        return pa.timestamp("us", tz="UTC" if sa_type.timezone else None)
+    if isinstance(sa_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _partition_value(v):
+    if v is None:
+        return NULL_PARTITION
+    if isinstance(v, enum.Enum):
+        v = v.value
+    # "Q1".."Q4" -> 1..4 so cashbook and obligation partitions line up
+    if isinstance(v, str) and len(v) == 2 and v[0] == "Q" and v[1].isdigit():
+        return v[1]
+    return str(v).replace("/", "-")
+
+
+def _write_dataset(db: Session, pa, pq, name: str, out_dir: str, chunk: int) -> dict:
+    stmt, n_keys, tiebreak = DATASETS[name]()
+    cols = list(stmt.selected_columns)
+    key_names = [c.name for c in cols[:n_keys]]
+    data_cols = cols[n_keys:]
+    schema = pa.schema([pa.field(c.name, _arrow_type(pa, c.type)) for c in data_cols])
+    enum_idx = [i for i, c in enumerate(data_cols) if isinstance(c.type, Enum)]
+
+    stmt = stmt.order_by(*cols[:n_keys], tiebreak).execution_options(yield_per=chunk)
+
+    tmp_dir = os.path.join(out_dir, f".{name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    writer = None
+    current = None
+    buffer = []
+    stats = {"rows": 0, "files": 0}
+
+    def flush():
+        if buffer:
+            columns = list(zip(*buffer))
+            for i in enum_idx:
+                columns[i] = [v.value if isinstance(v, enum.Enum) else v for v in columns[i]]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=f.type) for col, f in zip(columns, schema)], schema=schema
+            ))
+            stats["rows"] += len(buffer)
+            buffer.clear()
+
+    try:
+        for row in db.execute(stmt):
+            key = tuple(_partition_value(v) for v in row[:n_keys])
+            if key != current:
+                flush()
+                if writer:
+                    writer.close()
+                part_dir = os.path.join(tmp_dir, *(f"{k}={v}" for k, v in zip(key_names, key)))
+                os.makedirs(part_dir, exist_ok=True)
+                writer = pq.ParquetWriter(os.path.join(part_dir, "part-0.parquet"), schema)
+                stats["files"] += 1
+                current = key
+            buffer.append(row[n_keys:])
+            if len(buffer) >= chunk:
+                flush()
+        flush()
+    except BaseException:
+        if writer:
+            writer.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    if writer:
+        writer.close()
+
+    final_dir = os.path.join(out_dir, name)
+    old_dir = f"{tmp_dir}.old"
+    if os.path.exists(final_dir):
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return {**stats, "partition_by": key_names}
+
+
+def _write_manifest(out_dir: str, manifest: dict):
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "wt") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+
+def read_manifest(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), "rt") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def export_analytics(session_factory, out_dir: str, datasets=None, chunk: int = CHUNK) -> dict:
+    """Write the selected datasets (default: all) under out_dir and return the manifest."""
+    pa, pq = _import_pyarrow()
+    names = list(datasets or DATASETS)
+    unknown = set(names) - set(DATASETS)
+    if unknown:
+        raise ValueError(f"Unknown dataset(s): {', '.join(sorted(unknown))}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {
+        "status": "running",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "datasets": (read_manifest(out_dir) or {}).get("datasets", {}),
+    }
+    _write_manifest(out_dir, manifest)
+    try:
+        with session_factory() as db:
+            for name in names:
+                manifest["datasets"][name] = _write_dataset(db, pa, pq, name, out_dir, chunk)
+                _write_manifest(out_dir, manifest)
+    except Exception as e:
+        manifest.update(status="failed", error=str(e))
+        _write_manifest(out_dir, manifest)
+        raise
+    manifest.update(status="done", finished_at=datetime.now(timezone.utc).isoformat())
+    _write_manifest(out_dir, manifest)
+    return manifest
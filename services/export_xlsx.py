@@ -0,0 +1,154 @@
+"""
+Quarterly Excel workbook export (layout of "Y1 Q1 KAGEYO Fin report.xlsx").
+
+The workbook is written with openpyxl in write_only mode: each sheet is
+spooled to disk as rows are appended and ledger sheets are read from the
+database in chunks, so memory stays flat no matter how large the cashbook is.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Account, Activity, BudgetLine, Cashbook, Facility, Obligation, QuarterEnum
+from services.reporting import (
+    bank_recon_balances,
+    build_hrh_report,
+    build_reallocation_report,
+    build_statement_report,
+    build_summary_report,
+    header,
+    iter_bank_movements,
+)
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CHUNK = 1000
+
+
+def _write_header(ws, head: dict, title: str):
+    ws.append([title])
+    ws.append(["Facility", head.get("facility")])
+    ws.append(["Province", head.get("province")])
+    ws.append(["District", head.get("district")])
+    ws.append(["Year", head.get("year"), "Quarter", head.get("quarter")])
+    ws.append(["Reporting period", head.get("reporting_period")])
+    ws.append([])
+
+
+def _summary_sheet(wb, db, facility_id, year, quarter, head):
+    data = build_summary_report(db, facility_id, year, quarter, head)
+    ws = wb.create_sheet(f"Summary report Q{quarter}")
+    _write_header(ws, data["header"], "Summary report")
+    ws.append(["Component", "Budget line", "Description", "Planned", "Actual", "Variance", "Comments"])
+    for r in data["lines"]:
+        ws.append([r["component"], r["budget_line_code"], r["description"],
+                   r["planned"], r["actual"], r["variance"], r["comments"]])
+    t = data["totals"]
+    ws.append(["Total", None, None, t["planned"], t["actual"], t["variance"]])
+
+
+def _statement_sheet(wb, db, facility_id, year, quarter, head):
+    data = build_statement_report(db, facility_id, year, quarter, head)
+    ws = wb.create_sheet("Statement of rev & Exp")
+    _write_header(ws, data["header"], "Statement of revenue & expenditure")
+    ws.append(["Revenue", data["revenue"]])
+    ws.append(["Expenditure", data["expenditure"]])
+    ws.append(["Obligations", data["obligations"]])
+    ws.append(["Net", data["net"]])
+
+
+def _bank_sheet(wb, db, facility_id, year, quarter, head):
+    ws = wb.create_sheet("Bank reconciliation")
+    _write_header(ws, head, "Bank reconciliation")
+    opening, closing = bank_recon_balances(db, facility_id, year, quarter)
+    ws.append(["Opening balance", opening])
+    ws.append(["Closing balance", closing])
+    ws.append([])
+    ws.append(["Date", "Reference", "Description", "In", "Out", "Balance"])
+    for m in iter_bank_movements(db, facility_id, year, quarter, chunk=CHUNK):
+        ws.append([m["date"], m["ref"], m["desc"], m["in"], m["out"], m["balance"]])
+
+
+def _hrh_sheet(wb, db, facility_id, year, quarter, head):
+    data = build_hrh_report(db, facility_id, year, quarter, head)
+    ws = wb.create_sheet("HRH REPORT")
+    _write_header(ws, data["header"], "HRH report")
+    ws.append(["Position", "Planned", "Actual"])
+    for p in data["positions"]:
+        ws.append([p.get("position"), p.get("planned"), p.get("actual")])
+    ws.append(["Total", data["totals"]["planned"], data["totals"]["actual"]])
+
+
+def _reallocation_sheet(wb, db, facility_id, year, quarter, head):
+    data = build_reallocation_report(db, facility_id, year, quarter, head)
+    ws = wb.create_sheet("Reallocation & redirection")
+    _write_header(ws, data["header"], "Reallocation & redirection")
+    ws.append(["Reallocations"])
+    ws.append(["Date", "From budget line", "To budget line", "Amount", "Reason"])
+    for r in data["reallocations"]:
+        ws.append([r["date"], r["from_budget_line_id"], r["to_budget_line_id"], r["amount"], r["reason"]])
+    ws.append([])
+    ws.append(["Redirections"])
+    ws.append(["Date", "From component", "To component", "Amount", "Reason"])
+    for r in data["redirections"]:
+        ws.append([r["date"], r["from_component"], r["to_component"], r["amount"], r["reason"]])
+
+
+def _cashbook_sheet(wb, db, facility_id, year, quarter, head):
+    ws = wb.create_sheet("Cashbook")
+    _write_header(ws, head, "Cashbook")
+    ws.append(["Date", "Reference", "Description", "Account", "Budget line", "Activity",
+               "VAT", "Cash in", "Cash out", "Balance"])
+    stmt = (
+        select(
+            Cashbook.transaction_date, Cashbook.reference, Cashbook.description, Account.name,
+            BudgetLine.code, Activity.code, Cashbook.vat_requirement,
+            Cashbook.cash_in, Cashbook.cash_out, Cashbook.balance,
+        )
+        .join(Account, Cashbook.account_id == Account.id)
+        .join(BudgetLine, Cashbook.budget_line_id == BudgetLine.id)
+        .join(Activity, Cashbook.activity_id == Activity.id)
+        .where(
+            Cashbook.facility_id == facility_id,
+            Cashbook.fiscal_year == year,
+            Cashbook.quarter == QuarterEnum(f"Q{quarter}"),
+        )
+        .order_by(Cashbook.transaction_date.asc(), Cashbook.id.asc())
+        .execution_options(yield_per=CHUNK)
+    )
+    for d, ref, desc, acc, bl, act, vat, cin, cout, bal in db.execute(stmt):
+        ws.append([d, ref, desc, acc, bl, act, vat.value if vat else None, cin, cout, bal])
+
+
+def _obligations_sheet(wb, db, facility_id, year, quarter, head):
+    ws = wb.create_sheet("Obligations")
+    _write_header(ws, head, "Obligations")
+    ws.append(["Vendor", "Invoice no", "Description", "Amount", "Status"])
+    stmt = (
+        select(Obligation.vendor, Obligation.invoice_no, Obligation.description, Obligation.amount, Obligation.status)
+        .where(Obligation.facility_id == facility_id, Obligation.year == year, Obligation.quarter == quarter)
+        .order_by(Obligation.id.asc())
+        .execution_options(yield_per=CHUNK)
+    )
+    for row in db.execute(stmt):
+        ws.append(list(row))
+
+
+def write_quarter_workbook(db: Session, facility_id: int, year: int, quarter: int, fileobj) -> None:
+    """Write the full quarterly workbook for one facility to a binary file object."""
+    from openpyxl import Workbook
+
+    # one header for every sheet; the report builders would otherwise each query it again
+    head = header(db, facility_id, year, quarter)
+    wb = Workbook(write_only=True)
+    _summary_sheet(wb, db, facility_id, year, quarter, head)
+    _statement_sheet(wb, db, facility_id, year, quarter, head)
+    _bank_sheet(wb, db, facility_id, year, quarter, head)
+    _hrh_sheet(wb, db, facility_id, year, quarter, head)
+    _reallocation_sheet(wb, db, facility_id, year, quarter, head)
+    _cashbook_sheet(wb, db, facility_id, year, quarter, head)
+    _obligations_sheet(wb, db, facility_id, year, quarter, head)
+    wb.save(fileobj)
+
+
+def workbook_filename(db: Session, facility_id: int, year: int, quarter: int) -> str:
+    code = db.execute(select(Facility.code).where(Facility.id == facility_id)).scalar() or str(facility_id)
+    return f"{code}_FY{year}_Q{quarter}.xlsx"
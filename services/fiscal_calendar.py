@@ -0,0 +1,129 @@
+"""
+Maintenance and query helpers for the fiscal_calendar date dimension.
+
+The table holds one row per day (date -> fiscal_year, quarter, fiscal_month,
+month, week), generated from the same rules as models.quarter_from_date.
+Reports group a dated table by any period grain with one indexed join:
+
+    cols = period_columns("month")
+    select(*cols, func.sum(Cashbook.cash_in))
+        .join(FiscalCalendar, FiscalCalendar.date == Cashbook.transaction_date)
+        .group_by(*cols)
+
+Rows dated outside the generated range would drop out of such joins, so
+the calendar is extended to cover every ledger date: ledger writes fill the
+fiscal year of a date it lacks (ensure_calendar_dates), and `flask db_init` /
+`flask fiscal_calendar` (run it from cron alongside ensure_partitions) fill
+whole ranges ahead of time.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    Cashbook,
+    CashbookEntry,
+    FiscalCalendar,
+    fiscal_year_from_date,
+    quarter_from_date,
+)
+
+CHUNK = 5000
+
+# grain -> calendar columns that identify one period of that grain
+GRAINS = {
+    "year": ("fiscal_year",),
+    "quarter": ("fiscal_year", "quarter"),
+    "month": ("fiscal_year", "quarter", "fiscal_month", "month"),
+    "week": ("fiscal_year", "week"),
+}
+
+
+def calendar_row(d: date) -> dict:
+    fy = fiscal_year_from_date(d)
+    return {
+        "date": d,
+        "fiscal_year": fy,
+        "quarter": int(quarter_from_date(d).value[1]),
+        "fiscal_month": (d.month - 10) % 12 + 1,
+        "month": d.month,
+        "week": (d - date(fy, 10, 1)).days // 7 + 1,
+    }
+
+
+def period_columns(grain: str) -> list:
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of: {', '.join(GRAINS)}")
+    return [getattr(FiscalCalendar, name) for name in GRAINS[grain]]
+
+
+def calendar_range(conn):
+    """(first, last) date present in fiscal_calendar, or (None, None) when empty."""
+    return tuple(conn.execute(select(func.min(FiscalCalendar.date), func.max(FiscalCalendar.date))).one())
+
+
+def fill_fiscal_calendar(conn, first_year: int, last_year: int) -> int:
+    """Insert the missing days of fiscal years first_year..last_year; returns the number added."""
+    start, end = date(first_year, 10, 1), date(last_year + 1, 10, 1)
+    existing = set(conn.execute(
+        select(FiscalCalendar.date).where(FiscalCalendar.date >= start, FiscalCalendar.date < end)
+    ).scalars())
+    added = 0
+    batch = []
+    d = start
+    while d < end:
+        if d not in existing:
+            batch.append(calendar_row(d))
+            if len(batch) >= CHUNK:
+                conn.execute(insert(FiscalCalendar), batch)
+                added += len(batch)
+                batch = []
+        d += timedelta(days=1)
+    if batch:
+        conn.execute(insert(FiscalCalendar), batch)
+        added += len(batch)
+    return added
+
+
+def ensure_calendar_dates(db, *dates) -> int:
+    """
+    Fill the fiscal years of `dates` missing from fiscal_calendar, inside the
+    caller's transaction; one indexed lookup when they are covered. Each year
+    is filled in a savepoint, so a concurrent write that filled it first does
+    not fail this one. Returns the number of days added.
+    """
+    dates = {d for d in dates if d is not None}
+    if not dates:
+        return 0
+    present = set(db.execute(select(FiscalCalendar.date).where(FiscalCalendar.date.in_(dates))).scalars())
+    added = 0
+    for year in sorted({fiscal_year_from_date(d) for d in dates - present}):
+        try:
+            with db.begin_nested():
+                added += fill_fiscal_calendar(db, year, year)
+        except IntegrityError:
+            pass  # filled by a concurrent write
+    return added
+
+
+def _ledger_bounds(conn):
+    lows, highs = [], []
+    for col in (Cashbook.transaction_date, CashbookEntry.txn_date):
+        low, high = conn.execute(select(func.min(col), func.max(col))).one()
+        if low is not None:
+            lows.append(low)
+            highs.append(high)
+    return (min(lows), max(highs)) if lows else (None, None)
+
+
+def ensure_fiscal_calendar(conn, years_ahead: int = 1, today: date | None = None) -> int:
+    """
+    Cover every ledger date plus the current and next `years_ahead` fiscal
+    years; returns the number of days added.
+    """
+    current = fiscal_year_from_date(today or date.today())
+    low, high = _ledger_bounds(conn)
+    first = fiscal_year_from_date(low) if low else current
+    last = max(fiscal_year_from_date(high) if high else current, current + years_ahead)
+    return fill_fiscal_calendar(conn, min(first, current), last)
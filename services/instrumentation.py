@@ -0,0 +1,144 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor events on the engines count queries, database time and driver-reported
+rows for the current request; an after_request hook reports them in a
+Server-Timing header (visible in browser dev tools):
+
+    Server-Timing: db;dur=12.4;desc="7 queries, 120 rows", app;dur=31.0
+
+Statements slower than SLOW_QUERY_MS are logged to "finreports.slow_sql" with
+the route, duration, rows and the SQL normalized (literals and IN lists
+collapsed) as structured fields, so identical shapes group together.
+
+With SQL_INSTRUMENTATION off nothing is registered, so there is no per-query
+cost at all.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import event
+
+slow_log = logging.getLogger("finreports.slow_sql")
+
+_current = contextvars.ContextVar("sql_request_stats", default=None)
+
+_WS = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    sql = _WS.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+class RequestStats:
+    __slots__ = ("route", "method", "started", "queries", "db_time", "rows", "statements", "_lock")
+
+    def __init__(self, route: str, method: str):
+        self.route = route
+        self.method = method
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        # set to a list to record every statement (request profiler)
+        self.statements = None
+        # threads a request fans out to (report bundle) share its stats
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float, rows: int, executemany: bool):
+        with self._lock:
+            self.queries += 1
+            self.db_time += elapsed
+            self.rows += rows
+            if self.statements is not None:
+                self.statements.append({
+                    "sql": normalize_sql(statement),
+                    "ms": round(elapsed * 1000, 3),
+                    "rows": rows,
+                    "executemany": executemany,
+                })
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        db = self.db_time * 1000
+        return (f'db;dur={db:.1f};desc="{self.queries} queries, {self.rows} rows", '
+                f"app;dur={max(total - db, 0.0):.1f}")
+
+
+def current_stats():
+    """Stats of the request being served on this thread, or None outside a request."""
+    return _current.get()
+
+
+def instrument_engine(engine, slow_ms: float):
+    slow_s = slow_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, elapsed, rows, executemany)
+        if elapsed >= slow_s:
+            sql = normalize_sql(statement)
+            slow_log.warning("slow query %.1f ms: %s", elapsed * 1000, sql, extra={
+                "event": "slow_query",
+                "route": stats.route if stats else None,
+                "method": stats.method if stats else None,
+                "duration_ms": round(elapsed * 1000, 3),
+                "rows": rows,
+                "executemany": executemany,
+                "sql": sql,
+            })
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        # after_cursor_execute does not fire for a failed statement
+        conn = ctx.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def init_instrumentation(app, engines, settings):
+    """Hook the engines and the request cycle; a no-op when SQL_INSTRUMENTATION is off."""
+    if not settings.SQL_INSTRUMENTATION:
+        return
+    for engine in engines:
+        if engine is not None:
+            instrument_engine(engine, settings.SLOW_QUERY_MS)
+
+    @app.before_request
+    def _start_sql_stats():
+        route = request.url_rule.rule if request.url_rule else request.path
+        g.sql_stats_token = _current.set(RequestStats(route, request.method))
+
+    @app.after_request
+    def _server_timing(response):
+        stats = _current.get()
+        if stats is not None:
+            response.headers.add("Server-Timing", stats.server_timing())
+        return response
+
+    @app.teardown_request
+    def _end_sql_stats(_exc):
+        token = g.pop("sql_stats_token", None)
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:  # torn down from another context (streamed response)
+                _current.set(None)
@@ -0,0 +1,87 @@
+"""
+File-backed registry shared by the background job kinds (report jobs, bundle
+exports).
+
+A job is a `<job_id>.json` status file in one directory, replaced atomically
+on every update, so any worker process can answer a status poll. The status
+records the pid of the worker process running the job; a job still queued or
+running when that process has exited is reported (and rewritten) as failed
+instead of staying "running" forever.
+"""
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+ACTIVE = ("queued", "running")
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError):
+        return True
+    return True
+
+
+class FileJobRegistry:
+    """Job status files under `directory`; subclasses decide how jobs run."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, job_id: str, suffix: str = ".json") -> str:
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def write_json(self, path: str, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wt") as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp, path)
+
+    def write_status(self, job_id: str, **status):
+        self.write_json(self.path(job_id), {"job_id": job_id, **status})
+
+    def new_job(self, status: str, **fields) -> tuple[str, dict]:
+        """
+        Record a job owned by this process. Returns its id and the base fields
+        (`fields` plus pid and submitted_at) to repeat in every later status.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        base = {**fields, "pid": os.getpid(), "submitted_at": now()}
+        self.write_status(job_id, status=status, **base)
+        return job_id, base
+
+    def status(self, job_id: str):
+        try:
+            with open(self.path(job_id), "rt") as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if status["status"] in ACTIVE and not _pid_alive(status.get("pid")):
+            status.update(status="failed", error="worker process exited before the job finished")
+            self.write_status(**status)
+        return status
+
+    def prune(self, keep_seconds: float):
+        """Delete job files older than keep_seconds."""
+        cutoff = time.time() - keep_seconds
+        try:
+            entries = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in entries:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,75 @@
+"""
+JSON provider for the API.
+
+FastJSONProvider encodes Decimal, date/datetime, enums and UUIDs directly in
+the encoder, using orjson when it is installed and the stdlib json module
+otherwise. Select it (or Flask's built-in provider) with Settings.JSON_PROVIDER.
+"""
+import dataclasses
+import decimal
+import enum
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, decimal.Decimal):
+        # keep exact values, same as the schemas' as_string rendering
+        return str(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return self._orjson_dumps(obj).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+
+        if orjson is not None:
+            body = self._orjson_dumps(obj, orjson.OPT_INDENT_2 if pretty else 0) + b"\n"
+        else:
+            dump_args = {"indent": 2} if pretty else {"separators": (",", ":")}
+            body = f"{super().dumps(obj, **dump_args)}\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _orjson_dumps(self, obj, option=0):
+        option |= orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+
+JSON_PROVIDERS = {
+    "fast": FastJSONProvider,
+    "flask": DefaultJSONProvider,
+}
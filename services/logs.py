@@ -0,0 +1,163 @@
+"""
+Non-blocking structured logging.
+
+Every record goes through a QueueHandler on the root logger into an
+unbounded in-memory queue; a QueueListener thread formats it and writes it
+to stderr. Request threads therefore only pay for building the record and
+never wait on stream I/O.
+
+Records are JSON objects (LOG_FORMAT=json, the default) with the time,
+level, logger, message, the current request id and any `extra=` fields;
+LOG_FORMAT=text gives a one-line human format for development. The request
+id is taken from an incoming X-Request-ID header (or generated), stamped on
+every record logged while the request runs and echoed in the response.
+
+LOG_LEVEL sets the root level; LOG_LEVELS overrides single loggers, e.g.
+"finreports.access=DEBUG,sqlalchemy.engine=INFO".
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, request
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# attributes every LogRecord has; anything else came from extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_state = {}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp the current request id on the record, in the calling thread before it is queued."""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # like QueueHandler.prepare(), but keeps extra= fields and the traceback apart
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+def parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener(handler_queue, target):
+    listener = QueueListener(handler_queue, target, respect_handler_level=True)
+    listener.start()
+    _state["listener"] = listener
+
+
+def _after_fork_in_child():
+    # the listener thread does not survive fork; give the child its own queue and thread
+    if "handler" in _state:
+        _state["handler"].queue = queue.SimpleQueue()
+        _start_listener(_state["handler"].queue, _state["target"])
+
+
+def configure_logging(settings):
+    """Install the queue handler on the root logger once per process."""
+    if "handler" in _state:
+        return
+    target = logging.StreamHandler(sys.stderr)
+    target.setFormatter(TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter())
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _state.update(handler=handler, target=target)
+    _start_listener(handler.queue, target)
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+    # flush what is queued when the process exits
+    atexit.register(lambda: _state["listener"].stop())
+
+
+def init_logging(app, settings):
+    configure_logging(settings)
+
+    @app.before_request
+    def _bind_request_id():
+        incoming = request.headers.get("X-Request-ID", "")
+        request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        g.request_id = request_id
+        g.request_id_token = request_id_var.set(request_id)
+
+    @app.after_request
+    def _echo_request_id(response):
+        if "request_id" in g:
+            response.headers["X-Request-ID"] = g.request_id
+        return response
+
+    @app.teardown_request
+    def _unbind_request_id(_exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            try:
+                request_id_var.reset(token)
+            except ValueError:  # torn down from another context (streamed response)
+                request_id_var.set(None)
@@ -0,0 +1,179 @@
+"""
+Prometheus metrics shared across gunicorn workers (prometheus_client
+multiprocess mode).
+
+Every process writes its samples to its own files under METRICS_DIR, which
+is exported as PROMETHEUS_MULTIPROC_DIR before prometheus_client is imported
+(an existing PROMETHEUS_MULTIPROC_DIR wins). GET /metrics on any worker
+merges all files: counters and histograms are summed over every process,
+including exited workers, so totals never go backwards; gauges are summed
+over live processes only, which needs gunicorn's child_exit hook
+(gunicorn.conf.py) to mark exited workers dead. Clear METRICS_DIR before the
+server starts so files from an earlier run do not leak into the totals.
+
+Latency is measured up to the point the response is handed to the server,
+i.e. time to first byte for streamed downloads.
+"""
+import hmac
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+from config import Settings
+from services.database import TimedQueuePool
+
+if Settings.METRICS:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", Settings.METRICS_DIR)
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest  # noqa: E402
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead  # noqa: E402
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUESTS = Counter(
+    "finreports_http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram(
+    "finreports_http_request_duration_seconds", "Time to produce the response.", ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "finreports_db_pool_checked_out", "Connections currently checked out.", ("engine",),
+    multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge(
+    "finreports_db_pool_size", "Configured pool size, summed over workers.", ("engine",),
+    multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge(
+    "finreports_db_pool_overflow", "Overflow connections in use.", ("engine",), multiprocess_mode="livesum")
+DB_POOL_CHECKOUTS = Counter("finreports_db_pool_checkouts_total", "Connection checkouts.", ("engine",))
+DB_POOL_TIMEOUTS = Counter(
+    "finreports_db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT.", ("engine",))
+DB_POOL_WAIT = Counter("finreports_db_pool_wait_seconds_total", "Time spent waiting for a connection.", ("engine",))
+
+REFDATA_HITS = Counter("finreports_refdata_cache_hits_total", "Reference-data cache hits.")
+REFDATA_MISSES = Counter("finreports_refdata_cache_misses_total", "Reference-data cache misses.")
+
+JOBS_STARTED = Counter("finreports_jobs_started_total", "Background/import jobs started.", ("kind",))
+JOBS_FINISHED = Counter("finreports_jobs_finished_total", "Background/import jobs finished.", ("kind", "status"))
+JOBS_RUNNING = Gauge("finreports_jobs_running", "Jobs in progress.", ("kind",), multiprocess_mode="livesum")
+JOB_ITEMS = Counter("finreports_job_items_total", "Units of work completed by jobs (rows, workbooks).", ("kind",))
+
+
+class JobMetrics:
+    """Context manager counting one job of `kind` as started, running and finished."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def __enter__(self):
+        JOBS_STARTED.labels(kind=self.kind).inc()
+        JOBS_RUNNING.labels(kind=self.kind).inc()
+        return self
+
+    def item(self, amount: float = 1):
+        JOB_ITEMS.labels(kind=self.kind).inc(amount)
+
+    def __exit__(self, exc_type, exc, tb):
+        JOBS_RUNNING.labels(kind=self.kind).dec()
+        JOBS_FINISHED.labels(kind=self.kind, status="failed" if exc_type else "done").inc()
+        return False
+
+    def iterate(self, items):
+        """Run the job over `items`, one item each; a loop left by an exception counts as failed."""
+        with self:
+            for item in items:
+                yield item
+                self.item()
+
+
+class _Totals:
+    """Turns cumulative counts an app keeps itself (pool checkouts, cache hits) into counter increments."""
+
+    def __init__(self):
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def update(self, counter, value: float):
+        # keyed by pid: a forked worker starts its own counts
+        key = (os.getpid(), id(counter))
+        with self._lock:
+            delta = value - self._last.get(key, 0)
+            self._last[key] = value
+        if delta > 0:
+            counter.inc(delta)
+
+
+def record_pool(engine, label: str, totals: _Totals):
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return
+    DB_POOL_CHECKED_OUT.labels(engine=label).set(pool.checkedout())
+    DB_POOL_SIZE.labels(engine=label).set(pool.size())
+    DB_POOL_OVERFLOW.labels(engine=label).set(max(pool.overflow(), 0))
+    totals.update(DB_POOL_CHECKOUTS.labels(engine=label), pool.checkouts)
+    totals.update(DB_POOL_TIMEOUTS.labels(engine=label), pool.timeouts)
+    totals.update(DB_POOL_WAIT.labels(engine=label), pool.wait_total)
+
+
+class _MergedRegistry:
+    """Every process's samples from MULTIPROC_DIR, plus gauges derived from them at scrape time."""
+
+    def collect(self):
+        families = list(MultiProcessCollector(None, MULTIPROC_DIR).collect())
+        yield from families
+        totals = {s.name: s.value for f in families if f.type == "counter" for s in f.samples}
+        hits = totals.get("finreports_refdata_cache_hits_total", 0.0)
+        misses = totals.get("finreports_refdata_cache_misses_total", 0.0)
+        if hits + misses:
+            yield GaugeMetricFamily("finreports_refdata_cache_hit_ratio", "Reference-data cache hits / lookups.",
+                                    value=hits / (hits + misses))
+
+
+def mark_worker_dead(pid: int):
+    """Drop an exited worker's live gauges; called from gunicorn's child_exit hook."""
+    if MULTIPROC_DIR:
+        mark_process_dead(pid, MULTIPROC_DIR)
+
+
+def init_metrics(app, settings, engines: dict, refdata=None):
+    """Request hooks plus GET /metrics; a no-op when METRICS is off."""
+    if not settings.METRICS:
+        return
+    totals = _Totals()
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _metrics_record(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        labels = {
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule else "<unmatched>",
+            "status": str(response.status_code),
+        }
+        HTTP_REQUESTS.labels(**labels).inc()
+        HTTP_LATENCY.labels(**labels).observe(time.perf_counter() - started)
+        for label, engine in engines.items():
+            if engine is not None:
+                record_pool(engine, label, totals)
+        if refdata is not None:
+            totals.update(REFDATA_HITS, refdata.hits)
+            totals.update(REFDATA_MISSES, refdata.misses)
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        if settings.METRICS_TOKEN:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+            if not hmac.compare_digest(supplied, settings.METRICS_TOKEN):
+                return {"message": "metrics token required"}, 401
+        return Response(generate_latest(_MergedRegistry()), mimetype=CONTENT_TYPE_LATEST)
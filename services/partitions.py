@@ -0,0 +1,292 @@
+"""
+Postgres range partitioning of the ledger tables by fiscal year.
+
+`cashbook` (transaction_date) and `cashbook_entry` (txn_date) can be turned
+into declaratively partitioned tables with one partition per fiscal year
+(Oct 1 .. Sep 30, as in models.quarter_from_date) plus a DEFAULT partition
+that catches anything outside the created years. Period queries then prune
+to a single partition, and an old year is detached as a plain table in one
+cheap metadata operation.
+
+The conversion is an explicit operation (`flask partition_ledgers`), never
+a side effect of a migration, so one alembic revision always means one
+schema.
+
+Postgres requires the partition key in every unique constraint, so the
+primary key becomes (id, <date>); ids still come from one sequence, so they
+stay unique. A unique index without the key (cashbook.reference) keeps its
+columns but is no longer unique; a guard table outside the partitions
+(`<index>_guard`, kept in step by a trigger) holds the unique constraint
+instead, so a reference stays unique across all fiscal years. The partition
+key column must be NOT NULL. schema_drift_filter() hides these deliberate
+differences from alembic autogenerate.
+
+Everything here is a no-op on other databases.
+"""
+import re
+
+from datetime import date
+
+from sqlalchemy import inspect, text
+
+from models import fiscal_year_from_date as fiscal_year_of
+
+# table -> partition key column
+PARTITIONED_TABLES = {
+    "cashbook": "transaction_date",
+    "cashbook_entry": "txn_date",
+}
+
+
+def partition_name(table: str, fiscal_year: int) -> str:
+    return f"{table}_fy{fiscal_year}"
+
+
+def _bounds(fiscal_year: int):
+    return date(fiscal_year, 10, 1), date(fiscal_year + 1, 10, 1)
+
+
+def _is_postgres(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    if not _is_postgres(conn):
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :t AND c.relnamespace = current_schema()::regnamespace"
+    ), {"t": table}).scalar())
+
+
+def list_partitions(conn, table: str) -> list[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :t AND p.relnamespace = current_schema()::regnamespace ORDER BY c.relname"
+    ), {"t": table}).scalars())
+
+
+def create_fiscal_partition(conn, table: str, fiscal_year: int) -> bool:
+    """
+    Create the partition for one fiscal year if it is missing. Rows that
+    already landed in the DEFAULT partition for that year are moved into it.
+    Returns True when a partition was created.
+    """
+    name = partition_name(table, fiscal_year)
+    if name in list_partitions(conn, table):
+        return False
+    key = PARTITIONED_TABLES[table]
+    start, end = _bounds(fiscal_year)
+    default = f"{table}_default"
+    params = {"start": start, "end": end}
+
+    stranded = conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {key} >= :start AND {key} < :end)"
+    ), params).scalar()
+    if stranded:
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if stranded:
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {key} >= :start AND {key} < :end RETURNING *) "
+            f"INSERT INTO {table} SELECT * FROM moved"
+        ), params)
+        conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return True
+
+
+def ensure_partitions(conn, years_ahead: int = 1, today: date | None = None) -> list[str]:
+    """Make sure the current and the next `years_ahead` fiscal years have partitions."""
+    if not _is_postgres(conn):
+        return []
+    current = fiscal_year_of(today or date.today())
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            continue
+        for fy in range(current, current + years_ahead + 1):
+            if create_fiscal_partition(conn, table, fy):
+                created.append(partition_name(table, fy))
+    return created
+
+
+def detach_partition(conn, table: str, fiscal_year: int) -> str:
+    """Detach one fiscal year; the partition stays behind as a standalone table to archive or drop."""
+    name = partition_name(table, fiscal_year)
+    if name not in list_partitions(conn, table):
+        raise ValueError(f"{name} is not a partition of {table}")
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    return name
+
+
+def _guard_name(index_name: str) -> str:
+    return f"{index_name}_guard"
+
+
+def _has_guard(conn, index_name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:g) IS NOT NULL"), {"g": _guard_name(index_name)}).scalar()
+
+
+def _create_unique_guard(conn, table: str, index_name: str, cols: list[str]) -> None:
+    """
+    Enforce UNIQUE (cols) on a partitioned table through a plain side table.
+    Rows with a NULL in cols are left out, as a unique index allows any number.
+    """
+    guard = _guard_name(index_name)
+    col_list = ", ".join(cols)
+
+    def present(rec):
+        return " AND ".join(f"{rec}.{c} IS NOT NULL" for c in cols)
+
+    def row(rec):
+        return ", ".join(f"{rec}.{c}" for c in cols)
+
+    conn.execute(text(
+        f"CREATE TABLE {guard} AS SELECT {col_list} FROM {table} "
+        f"WHERE {' AND '.join(f'{c} IS NOT NULL' for c in cols)}"
+    ))
+    conn.execute(text(f"ALTER TABLE {guard} ADD CONSTRAINT {guard}_key UNIQUE ({col_list})"))
+    # AFTER row triggers also fire for the DELETE + INSERT of a row moving between partitions
+    conn.execute(text(f"""
+        CREATE FUNCTION {guard}_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND ({row('OLD')}) IS NOT DISTINCT FROM ({row('NEW')}) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {guard} WHERE ({col_list}) = ({row('OLD')});
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND {present('NEW')} THEN
+                INSERT INTO {guard} ({col_list}) VALUES ({row('NEW')});
+            END IF;
+            RETURN NULL;
+        END $$
+    """))
+    conn.execute(text(
+        f"CREATE TRIGGER {guard}_sync AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {guard}_sync()"
+    ))
+
+
+def _drop_unique_guard(conn, index_name: str) -> None:
+    guard = _guard_name(index_name)
+    conn.execute(text(f"DROP TABLE IF EXISTS {guard}"))
+    conn.execute(text(f"DROP FUNCTION IF EXISTS {guard}_sync() CASCADE"))
+
+
+def _rebuild(conn, table: str, partitioned: bool, years_ahead: int = 1) -> list[str]:
+    """
+    Copy `table` into a new ordinary or range-partitioned table, preserving
+    columns, defaults, CHECK constraints, indexes (unique ones through a guard
+    table while partitioned), foreign keys, the id sequence and the data, then
+    swap it in. Runs in the caller's transaction.
+    """
+    key = PARTITIONED_TABLES[table]
+    if partitioned:
+        nulls = conn.execute(text(f"SELECT count(*) FROM {table} WHERE {key} IS NULL")).scalar()
+        if nulls:
+            raise ValueError(f"{table} has {nulls} row(s) with a NULL {key}; set {key} before partitioning")
+    insp = inspect(conn)
+    indexes = insp.get_indexes(table)
+    foreign_keys = insp.get_foreign_keys(table)
+    pk = insp.get_pk_constraint(table)
+    seq = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+
+    tmp = f"{table}_rebuild"
+    clause = f" PARTITION BY RANGE ({key})" if partitioned else ""
+    conn.execute(text(f"CREATE TABLE {tmp} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){clause}"))
+
+    created = []
+    if partitioned:
+        bounds = conn.execute(text(f"SELECT min({key}), max({key}) FROM {table}")).one()
+        current = fiscal_year_of(date.today())
+        first = fiscal_year_of(bounds[0]) if bounds[0] else current
+        last = max(fiscal_year_of(bounds[1]) if bounds[1] else current, current) + years_ahead
+        for fy in range(first, last + 1):
+            start, end = _bounds(fy)
+            name = partition_name(table, fy)
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {tmp} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(name)
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {tmp} DEFAULT"))
+
+    conn.execute(text(f"INSERT INTO {tmp} SELECT * FROM {table}"))
+    if seq:
+        conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY {tmp}.id"))
+    conn.execute(text(f"DROP TABLE {table}"))
+    conn.execute(text(f"ALTER TABLE {tmp} RENAME TO {table}"))
+
+    def columns(cols, unique):
+        cols = list(cols)
+        if partitioned and unique and key not in cols:
+            cols.append(key)
+        elif not partitioned and unique and key in cols and len(cols) > 1:
+            cols.remove(key)
+        return ", ".join(cols)
+
+    pk_name = pk.get("name") or f"{table}_pkey"
+    conn.execute(text(
+        f"ALTER TABLE {table} ADD CONSTRAINT {pk_name} PRIMARY KEY ({columns(pk['constrained_columns'], True)})"
+    ))
+    for ix in indexes:
+        cols, unique = list(ix["column_names"]), ix["unique"]
+        if partitioned and unique and key not in cols:
+            _create_unique_guard(conn, table, ix["name"], cols)
+            unique = False
+        elif not partitioned and _has_guard(conn, ix["name"]):
+            _drop_unique_guard(conn, ix["name"])
+            unique = True
+        conn.execute(text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX {ix['name']} ON {table} ({columns(cols, unique)})"
+        ))
+    for fk in foreign_keys:
+        conn.execute(text(
+            f"ALTER TABLE {table} ADD CONSTRAINT {fk['name']} FOREIGN KEY ({', '.join(fk['constrained_columns'])}) "
+            f"REFERENCES {fk['referred_table']} ({', '.join(fk['referred_columns'])})"
+        ))
+    return created
+
+
+def convert_to_partitioned(conn, table: str, years_ahead: int = 1) -> list[str]:
+    """Rebuild an ordinary ledger table as a fiscal-year partitioned one; returns the partitions created."""
+    if not _is_postgres(conn) or is_partitioned(conn, table):
+        return []
+    return _rebuild(conn, table, partitioned=True, years_ahead=years_ahead)
+
+
+def convert_to_plain(conn, table: str) -> bool:
+    """Inverse of convert_to_partitioned() (`flask partition_ledgers --plain`); True when the table was rebuilt."""
+    if not _is_postgres(conn) or not is_partitioned(conn, table):
+        return False
+    _rebuild(conn, table, partitioned=False)
+    return True
+
+
+def schema_drift_filter(conn):
+    """
+    alembic include_object hook that hides what partitioning changes on
+    purpose: partition and guard tables, and the indexes a guard makes unique.
+    """
+    if not _is_postgres(conn):
+        return None
+    guards = set(conn.execute(text(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND relname LIKE '%\\_guard' "
+        "AND relnamespace = current_schema()::regnamespace"
+    )).scalars())
+    # attached partitions, and detached ones kept for archiving
+    partition = re.compile(rf"^({'|'.join(PARTITIONED_TABLES)})_(fy\d+|default)$")
+
+    def include_object(obj, name, type_, reflected, compare_to):
+        if type_ == "table":
+            return name not in guards and not (reflected and partition.match(name))
+        if type_ == "index":
+            return _guard_name(name) not in guards
+        return True
+
+    return include_object
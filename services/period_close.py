@@ -0,0 +1,199 @@
+"""
+Quarter close and opening-balance lookups.
+
+Closing a quarter freezes, per facility, the opening balance, inflow, outflow
+and closing balance of each running-balance ledger in period_balance:
+
+- the facility's cashbook_entry ledger (account_id NULL), which the bank
+  reconciliation reports;
+- every cashbook account of the facility (Cashbook balances are per account).
+
+Opening balances are then a single-row lookup of the previous quarter's
+closing balance. Without a closed previous quarter they are rebuilt from the
+latest closed quarter (or the first ledger row) plus the movements since.
+The quarter's status becomes CLOSED and its ledgers stop accepting edits
+(period_is_closed); reopening drops the frozen rows and restores the
+status the quarter had before.
+"""
+from decimal import Decimal
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from models import (
+    QUARTER_CLOSED,
+    Account,
+    Cashbook,
+    CashbookEntry,
+    PeriodBalance,
+    Quarter,
+    fiscal_quarter_bounds,
+)
+
+
+def previous_period(year: int, quarter: int) -> tuple[int, int]:
+    return (year, quarter - 1) if quarter > 1 else (year - 1, 4)
+
+
+def next_period(year: int, quarter: int) -> tuple[int, int]:
+    return (year, quarter + 1) if quarter < 4 else (year + 1, 1)
+
+
+def _period_range(year_col, quarter_col, first, last):
+    """Conditions for (year, quarter) periods from `first` to `last` inclusive; None is open-ended."""
+    where = []
+    if first is not None:
+        where.append(or_(year_col > first[0], and_(year_col == first[0], quarter_col >= first[1])))
+    if last is not None:
+        where.append(or_(year_col < last[0], and_(year_col == last[0], quarter_col <= last[1])))
+    return where
+
+
+def _flows(db: Session, facility_id: int, account_id, first, last):
+    """(inflow, outflow, entries) of one ledger over periods first..last (inclusive, None = open-ended)."""
+    if account_id is None:
+        cols = (CashbookEntry.inflow, CashbookEntry.outflow, CashbookEntry.id)
+        where = [CashbookEntry.facility_id == facility_id,
+                 *_period_range(CashbookEntry.year, CashbookEntry.quarter, first, last)]
+    else:
+        cols = (Cashbook.cash_in, Cashbook.cash_out, Cashbook.id)
+        # by date, so Postgres prunes fiscal-year partitions
+        where = [Cashbook.account_id == account_id]
+        if first is not None:
+            where.append(Cashbook.transaction_date >= fiscal_quarter_bounds(*first)[0])
+        if last is not None:
+            where.append(Cashbook.transaction_date <= fiscal_quarter_bounds(*last)[1])
+    inflow, outflow, entries = db.execute(
+        select(func.coalesce(func.sum(cols[0]), 0), func.coalesce(func.sum(cols[1]), 0), func.count(cols[2]))
+        .where(*where)
+    ).one()
+    return Decimal(inflow), Decimal(outflow), entries
+
+
+def _ledger_start(db: Session, facility_id: int, account_id) -> Decimal:
+    """Balance before the ledger's first row (an imported opening balance, or 0)."""
+    if account_id is None:
+        stmt = (select(CashbookEntry.balance, CashbookEntry.inflow, CashbookEntry.outflow)
+                .where(CashbookEntry.facility_id == facility_id)
+                .order_by(CashbookEntry.year, CashbookEntry.quarter, CashbookEntry.txn_date, CashbookEntry.id))
+    else:
+        stmt = (select(Cashbook.balance, Cashbook.cash_in, Cashbook.cash_out)
+                .where(Cashbook.account_id == account_id)
+                .order_by(Cashbook.transaction_date, Cashbook.id))
+    first = db.execute(stmt.limit(1)).first()
+    if first is None or first[0] is None:
+        return Decimal("0")
+    balance, inflow, outflow = (Decimal(v or 0) for v in first)
+    return balance - inflow + outflow
+
+
+def _ledger_filter(facility_id: int, account_id):
+    if account_id is None:
+        return [PeriodBalance.facility_id == facility_id, PeriodBalance.account_id.is_(None)]
+    return [PeriodBalance.account_id == account_id]
+
+
+def frozen_balance(db: Session, facility_id: int, year: int, quarter: int, account_id=None):
+    """The PeriodBalance of a closed quarter, or None while it is open."""
+    return db.execute(
+        select(PeriodBalance)
+        .where(*_ledger_filter(facility_id, account_id), PeriodBalance.year == year, PeriodBalance.quarter == quarter)
+        .limit(1)
+    ).scalars().first()
+
+
+def opening_balance(db: Session, facility_id: int, year: int, quarter: int, account_id=None) -> Decimal:
+    """Balance at the start of the quarter; one row lookup when the previous quarter is closed."""
+    last_closed = db.execute(
+        select(PeriodBalance)
+        .where(*_ledger_filter(facility_id, account_id),
+               *_period_range(PeriodBalance.year, PeriodBalance.quarter, None, previous_period(year, quarter)))
+        .order_by(PeriodBalance.year.desc(), PeriodBalance.quarter.desc())
+        .limit(1)
+    ).scalars().first()
+    if last_closed is not None:
+        if (last_closed.year, last_closed.quarter) == previous_period(year, quarter):
+            return Decimal(last_closed.closing_balance)
+        start, first = Decimal(last_closed.closing_balance), next_period(last_closed.year, last_closed.quarter)
+    else:
+        start, first = _ledger_start(db, facility_id, account_id), None
+    inflow, outflow, _ = _flows(db, facility_id, account_id, first, previous_period(year, quarter))
+    return start + inflow - outflow
+
+
+def ledger_balances(db: Session, facility_id: int, year: int, quarter: int, account_id=None):
+    """(opening, closing) of one ledger for the quarter: frozen values once closed, computed while open."""
+    frozen = frozen_balance(db, facility_id, year, quarter, account_id)
+    if frozen is not None:
+        return Decimal(frozen.opening_balance), Decimal(frozen.closing_balance)
+    opening = opening_balance(db, facility_id, year, quarter, account_id)
+    inflow, outflow, _ = _flows(db, facility_id, account_id, (year, quarter), (year, quarter))
+    return opening, opening + inflow - outflow
+
+
+def period_is_closed(db: Session, facility_id: int, year: int, quarter: int) -> bool:
+    """
+    True when this quarter or a later one of the facility is closed (an edit
+    would change frozen balances). The facility's quarter rows are read FOR
+    SHARE, so a concurrent close waits for the calling write to commit.
+    """
+    statuses = db.execute(
+        select(Quarter.status)
+        .where(Quarter.facility_id == facility_id,
+               *_period_range(Quarter.year, Quarter.quarter, (year, quarter), None))
+        .with_for_update(read=True)
+    ).scalars().all()
+    return QUARTER_CLOSED in statuses
+
+
+def _facility_accounts(db: Session, facility_id: int, year: int, quarter: int) -> list[int]:
+    start, end = fiscal_quarter_bounds(year, quarter)
+    owned = db.scalars(select(Account.id).where(Account.facility_id == facility_id))
+    used = db.scalars(
+        select(Cashbook.account_id).distinct()
+        .where(Cashbook.facility_id == facility_id, Cashbook.transaction_date.between(start, end))
+    )
+    return sorted(set(owned) | set(used))
+
+
+def lock_close_accounts(db: Session, facility_id: int, year: int, quarter: int) -> list[int]:
+    """
+    Take the cashbook account locks a close of this quarter needs and return
+    the account ids. Cashbook writes lock their account before they read the
+    quarter rows (period_is_closed), so a close must lock the accounts before
+    it locks the quarter row FOR UPDATE; the opposite order deadlocks.
+    """
+    accounts = _facility_accounts(db, facility_id, year, quarter)
+    Cashbook.lock_accounts(db, *accounts)
+    return accounts
+
+
+def close_quarter(db: Session, quarter: Quarter, accounts: list[int]) -> list[PeriodBalance]:
+    """
+    Freeze the quarter's ledgers into period_balance and mark it CLOSED. The
+    caller commits; `accounts` come from lock_close_accounts and `quarter`
+    must have been loaded FOR UPDATE after it.
+    """
+    facility_id, year, q = quarter.facility_id, quarter.year, quarter.quarter
+    rows = []
+    for account_id in [None, *accounts]:
+        opening = opening_balance(db, facility_id, year, q, account_id)
+        inflow, outflow, entries = _flows(db, facility_id, account_id, (year, q), (year, q))
+        rows.append(PeriodBalance(
+            quarter_id=quarter.id, facility_id=facility_id, account_id=account_id, year=year, quarter=q,
+            opening_balance=opening, inflow=inflow, outflow=outflow,
+            closing_balance=opening + inflow - outflow, entries=entries,
+        ))
+    db.add_all(rows)
+    quarter.status_before_close = quarter.status
+    quarter.status = QUARTER_CLOSED
+    db.flush()
+    return rows
+
+
+def reopen_quarter(db: Session, quarter: Quarter) -> None:
+    """Drop the quarter's frozen balances and open it for edits again, with the status it had before."""
+    db.execute(delete(PeriodBalance).where(PeriodBalance.quarter_id == quarter.id))
+    quarter.status = quarter.status_before_close
+    quarter.status_before_close = None
+    db.flush()
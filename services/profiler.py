@@ -0,0 +1,179 @@
+"""
+On-demand request profiler for COUNTRY admins (?_profile=1 or X-Profile: 1).
+
+Two modes, picked with ?_profile=sample|cprofile (1 means sample):
+
+- sample: a background thread reads the request thread's stack every
+  PROFILE_SAMPLE_MS and writes collapsed stacks (profile.folded), the input
+  format of flamegraph.pl, speedscope and inferno. Overhead is low enough
+  for production.
+- cprofile: deterministic cProfile of the request thread, written as
+  profile.pstats (snakeviz, flameprof, gprof2dot). Slower, but exact call
+  counts.
+
+Both store every SQL statement with its duration (sql.json, via the
+instrumentation hooks, so SQL_INSTRUMENTATION must be on) and a
+summary.json under PROFILE_DIR/<profile id>/. Only the newest PROFILE_KEEP
+profiles are kept.
+"""
+import cProfile
+import json
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from services.instrumentation import current_stats
+
+MODES = ("sample", "cprofile")
+FILES = ("summary.json", "sql.json", "profile.folded", "profile.pstats")
+
+
+def profile_mode(value: str | None):
+    """Mode requested by a ?_profile= / X-Profile value, or None when profiling is not asked for."""
+    if not value or value in ("0", "false"):
+        return None
+    if value in ("1", "true"):
+        return "sample"
+    return value if value in MODES else None
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class RequestProfiler:
+    def __init__(self, mode: str, directory: str, sample_ms: float, keep: int):
+        self.mode = mode
+        self.directory = directory
+        self.sample_ms = sample_ms
+        self.keep = keep
+        self._sampler = None
+        self._profile = None
+        self._stats = None
+
+    def start(self):
+        self._stats = current_stats()
+        if self._stats is not None:
+            self._stats.statements = []
+        self.started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.sample_ms / 1000)
+            self._sampler.start()
+        return self
+
+    def stop(self, meta: dict) -> str:
+        """Stop profiling, write the profile files and return the profile id."""
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        duration = time.perf_counter() - self.started
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        out = os.path.join(self.directory, profile_id)
+        os.makedirs(out)
+
+        statements = self._stats.statements if self._stats is not None else None
+        if self._stats is not None:
+            self._stats.statements = None
+        summary = {
+            "profile_id": profile_id,
+            "mode": self.mode,
+            **meta,
+            "duration_ms": round(duration * 1000, 3),
+            "sql": None if statements is None else {
+                "queries": len(statements),
+                "total_ms": round(sum(s["ms"] for s in statements), 3),
+                "slowest": sorted(statements, key=lambda s: s["ms"], reverse=True)[:10],
+            },
+        }
+        if statements is not None:
+            with open(os.path.join(out, "sql.json"), "wt") as f:
+                json.dump(statements, f, indent=1)
+
+        if self._profile is not None:
+            self._profile.dump_stats(os.path.join(out, "profile.pstats"))
+            stats = pstats.Stats(self._profile)
+            top = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:25]
+            summary["top_functions"] = [
+                {"function": f"{func[2]} ({os.path.basename(func[0])}:{func[1]})",
+                 "calls": nc, "self_ms": round(tt * 1000, 3), "cumulative_ms": round(ct * 1000, 3)}
+                for func, (_cc, nc, tt, ct, _callers) in top
+            ]
+        else:
+            counts = self._sampler.counts
+            with open(os.path.join(out, "profile.folded"), "wt") as f:
+                for stack, n in counts.most_common():
+                    f.write(f"{stack} {n}\n")
+            leaves = Counter()
+            for stack, n in counts.items():
+                leaves[stack.rsplit(";", 1)[-1]] += n
+            total = sum(counts.values())
+            summary["samples"] = total
+            summary["sample_ms"] = self.sample_ms
+            summary["top_functions"] = [
+                {"function": fn, "samples": n, "share": round(n / total, 4)} for fn, n in leaves.most_common(25)
+            ]
+
+        with open(os.path.join(out, "summary.json"), "wt") as f:
+            json.dump(summary, f, indent=1)
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        entries = sorted(e for e in os.listdir(self.directory) if not e.startswith("."))
+        for old in entries[:-self.keep] if self.keep > 0 else []:
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+
+
+def list_profiles(directory: str) -> list[dict]:
+    profiles = []
+    try:
+        entries = sorted(os.listdir(directory), reverse=True)
+    except FileNotFoundError:
+        return profiles
+    for entry in entries:
+        try:
+            with open(os.path.join(directory, entry, "summary.json"), "rt") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop("top_functions", None)
+        if summary.get("sql"):
+            summary["sql"].pop("slowest", None)
+        summary["files"] = [name for name in FILES if os.path.exists(os.path.join(directory, entry, name))]
+        profiles.append(summary)
+    return profiles
@@ -0,0 +1,81 @@
+"""
+Process-local cache for rarely changing reference data (geo + budget catalogue).
+
+Entries are keyed by (table, scope, query args) and stamped with a global
+version. Any write to a reference table calls bump(); the version lives in a
+small file so that every gunicorn worker (and the CLI importers) see the bump
+with a single stat() instead of a database round trip.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class RefDataCache:
+    def __init__(self, version_path: str, max_entries: int = 512, enabled: bool = True):
+        self.version_path = version_path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def version(self) -> int:
+        try:
+            st = os.stat(self.version_path)
+        except FileNotFoundError:
+            return 0
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.version_path, "rt") as f:
+                    self._version = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                self._version += 1
+            self._stamp = stamp
+        return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            new = self.version() + 1
+            os.makedirs(os.path.dirname(self.version_path) or ".", exist_ok=True)
+            tmp = f"{self.version_path}.{os.getpid()}.tmp"
+            with open(tmp, "wt") as f:
+                f.write(str(new))
+            os.replace(tmp, self.version_path)
+            self._entries.clear()
+            return new
+
+    def get_or_build(self, key, build):
+        """
+        Return (etag, body) for key, calling build() -> bytes/str on a miss.
+        """
+        if not self.enabled:
+            return self._make(build())
+
+        version = self.version()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return hit[1], hit[2]
+
+        etag, body = self._make(build())
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (version, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    @staticmethod
+    def _make(body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        return hashlib.blake2b(body, digest_size=16).hexdigest(), body
@@ -0,0 +1,96 @@
+"""
+Background report jobs for rollups too heavy for a synchronous request.
+
+POST /reports/jobs queues a report; a small thread pool in the worker process
+builds it with the services.reporting builders on its own session and stores
+the result as a JSON snapshot under REPORT_JOB_DIR. Job state lives in the
+services.jobs registry next to it, so any worker can answer
+GET /reports/jobs/<id>, and jobs of a worker that exited before finishing
+them are reported as failed.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.jobs import FileJobRegistry, now
+from services.logs import request_id_var
+from services.metrics import JobMetrics
+from services.reporting import (
+    build_bank_recon,
+    build_hrh_report,
+    build_period_totals,
+    build_quarter_comparison,
+    build_reallocation_report,
+    build_statement_report,
+    build_statement_rollup,
+    build_summary_report,
+)
+
+log = logging.getLogger("finreports.report_jobs")
+
+# report type -> builder called with the session and the job params
+REPORTS = {
+    "summary": lambda db, p: build_summary_report(db, p["facility_id"], p["year"], p["quarter"]),
+    "statement": lambda db, p: build_statement_report(db, p["facility_id"], p["year"], p["quarter"]),
+    "bank-recon": lambda db, p: build_bank_recon(db, p["facility_id"], p["year"], p["quarter"]),
+    "hrh": lambda db, p: build_hrh_report(db, p["facility_id"], p["year"], p["quarter"]),
+    "reallocation": lambda db, p: build_reallocation_report(db, p["facility_id"], p["year"], p["quarter"]),
+    "periods": lambda db, p: build_period_totals(db, p["facility_id"], p.get("year"), p["grain"]),
+    "rollup": lambda db, p: build_statement_rollup(db, p["facility_ids"], p["year"], p["quarter"]),
+    "comparison": lambda db, p: build_quarter_comparison(db, p["facility_id"], p["periods"]),
+}
+
+
+class ReportJobs(FileJobRegistry):
+    """Report jobs, run on a per-process thread pool."""
+
+    def __init__(self, directory: str, session_factory, max_workers: int, keep_hours: float):
+        super().__init__(directory)
+        self.session_factory = session_factory
+        self.max_workers = max(1, max_workers)
+        self.keep_seconds = keep_hours * 3600
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def result_path(self, job_id: str) -> str:
+        return self.path(job_id, ".result.json")
+
+    def result(self, job_id: str):
+        with open(self.result_path(job_id), "rt") as f:
+            return json.load(f)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # threads do not survive fork, so each worker process starts its own pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="report-job")
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, owner: str, report: str, params: dict) -> str:
+        if report not in REPORTS:
+            raise ValueError(f"report must be one of: {', '.join(REPORTS)}")
+        self.prune(self.keep_seconds)
+        job_id, base = self.new_job("queued", owner=owner, report=report, params=params)
+        self._pool().submit(self._run, job_id, base, request_id_var.get())
+        return job_id
+
+    def _run(self, job_id: str, base: dict, request_id):
+        request_id_var.set(request_id)
+        started = time.perf_counter()
+        base = {**base, "started_at": now()}
+        self.write_status(job_id, status="running", **base)
+        try:
+            with JobMetrics("report_job") as job, self.session_factory() as db:
+                data = REPORTS[base["report"]](db, base["params"])
+                self.write_json(self.result_path(job_id), data)
+                job.item()
+            self.write_status(job_id, status="done", finished_at=now(),
+                              duration_ms=round((time.perf_counter() - started) * 1000, 1), **base)
+        except Exception as e:
+            log.exception("report job failed", extra={"job_id": job_id, "report": base["report"]})
+            self.write_status(job_id, status="failed", error=str(e), finished_at=now(), **base)
@@ -1,9 +1,20 @@
-from sqlalchemy.orm import Session
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, select
-from models import Facility, Quarter, QuarterLine, CashbookEntry, Obligation, BudgetLine, Reallocation, Redirection
+from models import Facility, Quarter, QuarterLine, CashbookEntry, Obligation, BudgetLine, Reallocation, Redirection, Cashbook, FiscalCalendar, fiscal_quarter_bounds
+from services.fiscal_calendar import GRAINS, period_columns
+from services.period_close import ledger_balances
 
 def header(db: Session, facility_id:int, year:int, quarter:int):
-    fac = db.get(Facility, facility_id)
+    fac = db.execute(
+        select(Facility)
+        .options(joinedload(Facility.province), joinedload(Facility.district))
+        .where(Facility.id == facility_id)
+    ).scalars().first()
     q = db.execute(select(Quarter).where(Quarter.facility_id==facility_id, Quarter.year==year, Quarter.quarter==quarter)).scalars().first()
     return {
         "facility": fac.name if fac else None,
@@ -16,8 +27,8 @@ def header(db: Session, facility_id:int, year:int, quarter:int):
 def money(x): 
     return float(x) if x is not None else 0.0
 
-def build_summary_report(db: Session, facility_id:int, year:int, quarter:int):
-    head = header(db, facility_id, year, quarter)
+def build_summary_report(db: Session, facility_id:int, year:int, quarter:int, head:dict|None=None):
+    head = head or header(db, facility_id, year, quarter)
     qlines = db.execute(select(QuarterLine, BudgetLine).join(BudgetLine, QuarterLine.budget_line_id==BudgetLine.id, isouter=True).where(QuarterLine.quarter_id.in_(
         select(Quarter.id).where(Quarter.facility_id==facility_id, Quarter.year==year, Quarter.quarter==quarter)
     ))).all()
@@ -28,7 +39,7 @@ def build_summary_report(db: Session, facility_id:int, year:int, quarter:int):
         planned = money(ql.planned); actual = money(ql.actual)
         variance = planned - actual if ql.variance is None else money(ql.variance)
         rows.append({
-            "component": bl.component if bl else None,
+            "component": bl.name if bl else None,
             "budget_line_code": bl.code if bl else None,
             "description": bl.description if bl else None,
             "planned": planned, "actual": actual, "variance": variance,
@@ -46,8 +57,8 @@ def build_summary_report(db: Session, facility_id:int, year:int, quarter:int):
         }
     }
 
-def build_statement_report(db: Session, facility_id:int, year:int, quarter:int):
-    head = header(db, facility_id, year, quarter)
+def build_statement_report(db: Session, facility_id:int, year:int, quarter:int, head:dict|None=None):
+    head = head or header(db, facility_id, year, quarter)
     inflow = db.execute(select(func.sum(CashbookEntry.inflow)).where(CashbookEntry.facility_id==facility_id, CashbookEntry.year==year, CashbookEntry.quarter==quarter)).scalar() or 0
     outflow = db.execute(select(func.sum(CashbookEntry.outflow)).where(CashbookEntry.facility_id==facility_id, CashbookEntry.year==year, CashbookEntry.quarter==quarter)).scalar() or 0
     obligations = db.execute(select(func.sum(Obligation.amount)).where(Obligation.facility_id==facility_id, Obligation.year==year, Obligation.quarter==quarter)).scalar() or 0
@@ -59,24 +70,35 @@ def build_statement_report(db: Session, facility_id:int, year:int, quarter:int):
         "net": float(inflow) - float(outflow)
     }
 
-def build_bank_recon(db: Session, facility_id:int, year:int, quarter:int):
-    head = header(db, facility_id, year, quarter)
-    # naive example: opening = first balance before quarter; closing = last balance in quarter
-    q = db.execute(select(CashbookEntry).where(CashbookEntry.facility_id==facility_id, CashbookEntry.year==year, CashbookEntry.quarter==quarter).order_by(CashbookEntry.txn_date.asc())).scalars().all()
-    opening = float(q[0].balance) if q else 0.0
-    closing = float(q[-1].balance) if q else 0.0
+def _bank_entries(facility_id:int, year:int, quarter:int):
+    return select(CashbookEntry).where(CashbookEntry.facility_id==facility_id, CashbookEntry.year==year, CashbookEntry.quarter==quarter)
+
+def bank_recon_balances(db: Session, facility_id:int, year:int, quarter:int):
+    # frozen in period_balance once the quarter is closed; otherwise the previous
+    # close (or the ledger start) plus the movements since
+    opening, closing = ledger_balances(db, facility_id, year, quarter)
+    return money(opening), money(closing)
+
+def iter_bank_movements(db: Session, facility_id:int, year:int, quarter:int, chunk:int=1000):
+    stmt = _bank_entries(facility_id, year, quarter).order_by(CashbookEntry.txn_date.asc(), CashbookEntry.id.asc())
+    for e in db.execute(stmt.execution_options(yield_per=chunk)).scalars():
+        yield {
+            "date": e.txn_date.isoformat() if e.txn_date else None, "ref": e.reference, "desc": e.description,
+            "in": float(e.inflow or 0), "out": float(e.outflow or 0), "balance": float(e.balance or 0)
+        }
+
+def build_bank_recon(db: Session, facility_id:int, year:int, quarter:int, head:dict|None=None):
+    head = head or header(db, facility_id, year, quarter)
+    opening, closing = bank_recon_balances(db, facility_id, year, quarter)
     return {
         "header": head,
         "opening_balance": opening,
         "closing_balance": closing,
-        "movements": [{
-            "date": e.txn_date.isoformat(), "ref": e.reference, "desc": e.description,
-            "in": float(e.inflow or 0), "out": float(e.outflow or 0), "balance": float(e.balance or 0)
-        } for e in q]
+        "movements": list(iter_bank_movements(db, facility_id, year, quarter))
     }
 
-def build_hrh_report(db: Session, facility_id:int, year:int, quarter:int):
-    head = header(db, facility_id, year, quarter)
+def build_hrh_report(db: Session, facility_id:int, year:int, quarter:int, head:dict|None=None):
+    head = head or header(db, facility_id, year, quarter)
     # Placeholder: actual HRH fields depend on your workbook column mapping.
     # Return a shell object so the endpoint exists.
     return {
@@ -85,8 +107,8 @@ def build_hrh_report(db: Session, facility_id:int, year:int, quarter:int):
         "totals": {"planned": 0.0, "actual": 0.0}
     }
 
-def build_reallocation_report(db: Session, facility_id:int, year:int, quarter:int):
-    head = header(db, facility_id, year, quarter)
+def build_reallocation_report(db: Session, facility_id:int, year:int, quarter:int, head:dict|None=None):
+    head = head or header(db, facility_id, year, quarter)
     reallocs = db.execute(select(Reallocation).where(Reallocation.facility_id==facility_id)).scalars().all()
     redirects = db.execute(select(Redirection).where(Redirection.facility_id==facility_id)).scalars().all()
     return {
@@ -106,3 +128,154 @@ def build_reallocation_report(db: Session, facility_id:int, year:int, quarter:in
             "reason": r.reason
         } for r in redirects]
     }
+
+def build_period_totals(db: Session, facility_id:int, year:int|None, grain:str="month"):
+    """Cashbook cash in/out per fiscal period, grouped through the fiscal_calendar join."""
+    cols = period_columns(grain)
+    stmt = (
+        select(*cols, func.count(Cashbook.id), func.coalesce(func.sum(Cashbook.cash_in), 0),
+               func.coalesce(func.sum(Cashbook.cash_out), 0))
+        .join(FiscalCalendar, FiscalCalendar.date == Cashbook.transaction_date)
+        .where(Cashbook.facility_id == facility_id)
+        .group_by(*cols)
+        .order_by(*cols)
+    )
+    if year is not None:
+        # the date range lets Postgres prune to one fiscal-year partition
+        start, _ = fiscal_quarter_bounds(year, 1)
+        _, end = fiscal_quarter_bounds(year, 4)
+        stmt = stmt.where(Cashbook.fiscal_year == year, Cashbook.transaction_date.between(start, end))
+    keys = GRAINS[grain]
+    periods = []
+    for row in db.execute(stmt):
+        period = dict(zip(keys, row[:len(keys)]))
+        count, cash_in, cash_out = row[len(keys):]
+        period.update(entries=count, cash_in=money(cash_in), cash_out=money(cash_out),
+                      net=money(cash_in) - money(cash_out))
+        periods.append(period)
+    return {
+        "facility_id": facility_id,
+        "fiscal_year": year,
+        "grain": grain,
+        "periods": periods,
+        "totals": {
+            "entries": sum(p["entries"] for p in periods),
+            "cash_in": sum(p["cash_in"] for p in periods),
+            "cash_out": sum(p["cash_out"] for p in periods),
+            "net": sum(p["net"] for p in periods),
+        },
+    }
+
+def _statement_totals(db: Session, keys, where_entry, where_obligation):
+    """{key: [inflow, outflow, obligations]} from two grouped aggregates; keys are column pairs."""
+    entry_keys, obligation_keys = keys
+    totals = {}
+    for row in db.execute(
+        select(*entry_keys, func.sum(CashbookEntry.inflow), func.sum(CashbookEntry.outflow))
+        .where(*where_entry).group_by(*entry_keys)
+    ):
+        totals.setdefault(tuple(row[:-2]), [0.0, 0.0, 0.0])[:2] = money(row[-2]), money(row[-1])
+    for row in db.execute(
+        select(*obligation_keys, func.sum(Obligation.amount)).where(*where_obligation).group_by(*obligation_keys)
+    ):
+        totals.setdefault(tuple(row[:-1]), [0.0, 0.0, 0.0])[2] = money(row[-1])
+    return totals
+
+def _statement_figures(inflow, outflow, obligations):
+    return {"revenue": inflow, "expenditure": outflow, "obligations": obligations, "net": inflow - outflow}
+
+def build_statement_rollup(db: Session, facility_ids, year:int, quarter:int):
+    """Statement figures for many facilities (district, province or national) from one grouped query per table."""
+    totals = _statement_totals(
+        db,
+        ((CashbookEntry.facility_id,), (Obligation.facility_id,)),
+        (CashbookEntry.facility_id.in_(facility_ids), CashbookEntry.year == year, CashbookEntry.quarter == quarter),
+        (Obligation.facility_id.in_(facility_ids), Obligation.year == year, Obligation.quarter == quarter),
+    )
+    facilities = db.execute(
+        select(Facility)
+        .options(joinedload(Facility.province), joinedload(Facility.district))
+        .where(Facility.id.in_(facility_ids))
+        .order_by(Facility.name.asc())
+    ).scalars().all()
+    rows = []
+    for fac in facilities:
+        rows.append({
+            "facility_id": fac.id,
+            "facility": fac.name,
+            "province": fac.province.name if fac.province else None,
+            "district": fac.district.name if fac.district else None,
+            **_statement_figures(*totals.get((fac.id,), (0.0, 0.0, 0.0))),
+        })
+    return {
+        "year": year, "quarter": quarter,
+        "facilities": rows,
+        "totals": {k: sum(r[k] for r in rows) for k in ("revenue", "expenditure", "obligations", "net")},
+    }
+
+def build_quarter_comparison(db: Session, facility_id:int, periods):
+    """Statement figures of one facility side by side for several (year, quarter) periods."""
+    periods = sorted({(int(y), int(q)) for y, q in periods})
+    years = {y for y, _ in periods}
+    totals = _statement_totals(
+        db,
+        ((CashbookEntry.year, CashbookEntry.quarter), (Obligation.year, Obligation.quarter)),
+        (CashbookEntry.facility_id == facility_id, CashbookEntry.year.in_(years)),
+        (Obligation.facility_id == facility_id, Obligation.year.in_(years)),
+    )
+    head = header(db, facility_id, *periods[-1])
+    return {
+        "header": {k: head[k] for k in ("facility", "province", "district")},
+        "periods": [
+            {"year": y, "quarter": q, **_statement_figures(*totals.get((y, q), (0.0, 0.0, 0.0)))}
+            for y, q in periods
+        ],
+    }
+
+# facility-quarter reports that /reports/bundle can combine
+REPORT_BUILDERS = {
+    "summary": build_summary_report,
+    "statement": build_statement_report,
+    "bank-recon": build_bank_recon,
+    "hrh": build_hrh_report,
+    "reallocation": build_reallocation_report,
+}
+
+_bundle_pool = {}
+_bundle_pool_lock = threading.Lock()
+
+def _bundle_executor(max_workers:int):
+    # one bounded pool per process (threads do not survive fork), shared by all requests
+    with _bundle_pool_lock:
+        if _bundle_pool.get("pid") != os.getpid():
+            _bundle_pool.update(pid=os.getpid(), executor=ThreadPoolExecutor(max_workers, thread_name_prefix="report-bundle"))
+        return _bundle_pool["executor"]
+
+def build_report_bundle(db: Session, facility_id:int, year:int, quarter:int, include, session_factory=None, max_workers:int=1):
+    """
+    Several facility-quarter reports sharing one header. With a session_factory
+    and max_workers > 1 the reports run concurrently, each on its own short-lived
+    session (a Session is not thread-safe); otherwise they run in turn on `db`.
+    Before a concurrent fan-out `db` is closed, so the caller's connection goes
+    back to the pool instead of idling in a transaction while the others wait.
+    """
+    head = header(db, facility_id, year, quarter)
+
+    def build(name, session):
+        data = REPORT_BUILDERS[name](session, facility_id, year, quarter, head=head)
+        data.pop("header", None)
+        return data
+
+    def build_own_session(name):
+        with session_factory() as session:
+            return build(name, session)
+
+    if session_factory is None or max_workers <= 1 or len(include) <= 1:
+        reports = {name: build(name, db) for name in include}
+    else:
+        db.close()
+        executor = _bundle_executor(max_workers)
+        # each task gets a copy of the caller's context, so SQL stats and the request id follow it
+        futures = {name: executor.submit(contextvars.copy_context().run, build_own_session, name) for name in include}
+        reports = {name: fut.result() for name, fut in futures.items()}
+    return {"header": head, "reports": reports}
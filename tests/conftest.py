@@ -0,0 +1,131 @@
+"""
+Shared fixtures: the API on a throwaway SQLite database (schema from
+`flask db_init`), a seeded facility with an account, and JWT headers.
+
+    python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# prometheus_client picks its multiprocess store when first imported, so before `app`
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="finreports-metrics-"))
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+import app as appmod
+from config import Settings
+from models import (
+    Account,
+    AccountTypeEnum,
+    Activity,
+    BudgetLine,
+    Country,
+    District,
+    Facility,
+    FacilityLevelEnum,
+    Hospital,
+    Province,
+)
+
+SECRET = "test-secret-key-long-enough-for-hs256-signing"
+
+
+def _instance_settings(tmp_path) -> dict:
+    return {
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "DATABASE_READ_URL": "",
+        "REFDATA_VERSION_FILE": str(tmp_path / "refdata.version"),
+        "READ_STICKY_DIR": str(tmp_path / "sticky"),
+        "PROFILE_DIR": str(tmp_path / "profiles"),
+        "REPORT_JOB_DIR": str(tmp_path / "report-jobs"),
+        "EXPORT_DIR": str(tmp_path / "exports"),
+        "ANALYTICS_DIR": str(tmp_path / "analytics"),
+    }
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """Settings pointed at tmp_path; tests may override more attributes before `app` is built."""
+    for name, value in _instance_settings(tmp_path).items():
+        monkeypatch.setattr(Settings, name, value)
+    monkeypatch.setenv("SECRET_KEY", SECRET)
+    monkeypatch.setenv("JWT_SECRET_KEY", SECRET)
+    return Settings
+
+
+def _dispose(application):
+    appmod.SessionLocal.remove()
+    sessions = application.session_factory.session_factory
+    for engine in (sessions.kw["bind"], sessions.kw["info"]["read_engine"]):
+        if engine is not None:
+            engine.dispose()
+
+
+@pytest.fixture
+def app(settings):
+    application = appmod.create_app()
+    result = application.test_cli_runner().invoke(args=["db_init"])
+    assert result.exception is None, result.output
+    yield application
+    _dispose(application)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def auth_headers(app, identity="admin", access_level="COUNTRY", **claims) -> dict:
+    with app.app_context():
+        token = create_access_token(identity=identity, additional_claims={"access_level": access_level, **claims})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin(app):
+    return auth_headers(app)
+
+
+def make_facility(db, tag: str) -> Facility:
+    country = db.query(Country).first()
+    if country is None:
+        country = Country(name="Testland", code="TL")
+        db.add(country)
+        db.flush()
+        province = Province(name="Province", code="P1", country_id=country.id)
+        db.add(province)
+        db.flush()
+        district = District(name="District", code="D1", province_id=province.id)
+        db.add(district)
+        db.flush()
+        db.add(Hospital(name="District Hospital", code="H1", level=FacilityLevelEnum.DISTRICT_HOSPITAL,
+                        province_id=province.id, district_id=district.id))
+        db.flush()
+    district, hospital = db.query(District).first(), db.query(Hospital).first()
+    fac = Facility(name=f"Facility {tag}", code=f"F-{tag}", level=FacilityLevelEnum.HEALTH_CENTRE,
+                   country_id=country.id, province_id=district.province_id, district_id=district.id,
+                   referral_hospital_id=hospital.id)
+    db.add(fac)
+    db.flush()
+    return fac
+
+
+@pytest.fixture
+def seed(app) -> dict:
+    """One facility with a bank account, a budget line and an activity."""
+    with app.session_factory() as db:
+        fac = make_facility(db, "1")
+        line = BudgetLine(code="BL-1", name="Operations")
+        db.add(line)
+        db.flush()
+        activity = Activity(budget_line_id=line.id, code="A-1", name="Supplies")
+        account = Account(name="Main account", type=AccountTypeEnum.BANK, facility_id=fac.id)
+        db.add_all([activity, account])
+        db.commit()
+        return {"facility_id": fac.id, "budget_line_id": line.id, "activity_id": activity.id,
+                "account_id": account.id}
@@ -0,0 +1,58 @@
+import pytest
+
+from models import Budget
+
+
+def _budget(seed, **fields):
+    return {
+        "facility_id": seed["facility_id"], "budget_line_id": seed["budget_line_id"],
+        "activity_id": seed["activity_id"], "start_date": "2024-10-01", "end_date": "2025-09-30",
+        "component_1": "100.00", **fields,
+    }
+
+
+def _create(client, admin, seed, n):
+    r = client.patch("/budgets/batch", headers=admin, json={"create": [_budget(seed) for _ in range(n)]})
+    assert r.status_code == 200, r.get_json()
+    return [b["id"] for b in r.get_json()["created"]]
+
+
+def test_batch_create_update_delete(client, admin, seed):
+    first, second = _create(client, admin, seed, 2)
+    r = client.patch("/budgets/batch", headers=admin, json={
+        "create": [_budget(seed, component_1="5.00")],
+        "update": [{"id": first, "facility_id": seed["facility_id"], "component_1": "250.00"}],
+        "delete": [second],
+    })
+    assert r.status_code == 200, r.get_json()
+    body = r.get_json()
+    assert [b["component_1"] for b in body["updated"]] == ["250.00"]
+    assert body["deleted"] == [second]
+    assert len(body["created"]) == 1
+
+
+@pytest.mark.parametrize("body, field", [
+    ({"delete": ["x"]}, "delete"),
+    ({"delete": [0]}, "delete"),
+    ({"delete": "1"}, "delete"),
+    ({"update": ["x"]}, "update"),
+    ({"update": [{"id": "abc"}]}, "update"),
+    ({"update": [{"component_1": "1.00", "facility_id": 1}]}, "update"),
+    ({"create": [{"facility_id": 1}]}, "create"),
+])
+def test_batch_rejects_malformed_items(client, admin, seed, body, field):
+    r = client.patch("/budgets/batch", headers=admin, json=body)
+    assert r.status_code == 400, r.get_json()
+    assert field in r.get_json()["errors"]
+
+
+def test_batch_rejects_update_and_delete_of_one_budget(app, client, admin, seed):
+    (bid,) = _create(client, admin, seed, 1)
+    r = client.patch("/budgets/batch", headers=admin, json={
+        "update": [{"id": bid, "facility_id": seed["facility_id"], "component_1": "1.00"}],
+        "delete": [bid],
+    })
+    assert r.status_code == 400
+    assert "delete" in r.get_json()["errors"]
+    with app.session_factory() as db:
+        assert db.get(Budget, bid).component_1 == 100
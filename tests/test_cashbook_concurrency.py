@@ -0,0 +1,131 @@
+"""
+Concurrent POST /cashbooks. Runs on SQLite, and also on Postgres when
+TEST_POSTGRES_URL points at a scratch database (which is wiped):
+
+    TEST_POSTGRES_URL=postgresql+psycopg://user:pw@host/scratch python -m pytest -q tests/test_cashbook_concurrency.py
+"""
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from models import Account, AccountTypeEnum, Base, Cashbook
+from services.partitions import PARTITIONED_TABLES, convert_to_plain
+
+PG_URL = os.environ.get("TEST_POSTGRES_URL")
+THREADS = 4
+WRITES = 8
+
+
+def _reset_postgres():
+    engine = create_engine(PG_URL)
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            convert_to_plain(conn, table)
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def backend(request, settings, monkeypatch):
+    """The database `app` is built on; requested before `app`."""
+    if request.param == "postgresql":
+        if not PG_URL:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+        monkeypatch.setattr(settings, "DATABASE_URL", PG_URL)
+        _reset_postgres()
+        yield request.param
+        _reset_postgres()
+    else:
+        yield request.param
+
+
+@pytest.fixture
+def accounts(app, seed) -> list[int]:
+    with app.session_factory() as db:
+        other = Account(name="Petty cash", type=AccountTypeEnum.CASH, facility_id=seed["facility_id"])
+        db.add(other)
+        db.commit()
+        return [seed["account_id"], other.id]
+
+
+def _payload(seed, account_id, i):
+    payload = {
+        # out of date order, so later posts land before earlier rows
+        "transaction_date": (date(2024, 10, 3) - timedelta(days=i % 3)).isoformat(),
+        "facility_id": seed["facility_id"],
+        "account_id": account_id,
+        "vat_requirement": "VAT_REQUIRED",
+        "budget_line_id": seed["budget_line_id"],
+        "activity_id": seed["activity_id"],
+    }
+    payload["cash_out" if i % 4 == 3 else "cash_in"] = "3.00" if i % 4 == 3 else "10.00"
+    return payload
+
+
+def _post_one(app, admin, payload):
+    return app.test_client().post("/cashbooks", json=payload, headers=admin).status_code
+
+
+def _post_all(app, admin, payloads):
+    def post(batch):
+        return [_post_one(app, admin, p) for p in batch]
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return [s for statuses in pool.map(post, payloads) for s in statuses]
+
+
+def _check_ledgers(app, account_ids, expected_rows):
+    with app.session_factory() as db:
+        rows = db.scalars(select(Cashbook).order_by(Cashbook.transaction_date, Cashbook.id)).all()
+    assert len(rows) == expected_rows
+    running = defaultdict(Decimal)
+    for cb in rows:
+        running[cb.account_id] += Decimal(cb.cash_in or 0) - Decimal(cb.cash_out or 0)
+        assert Decimal(cb.balance) == running[cb.account_id], cb.reference
+    assert set(running) == set(account_ids)
+
+    per_day = defaultdict(list)
+    for cb in rows:
+        m = re.fullmatch(r"CBK-(\d{8})-(\d{4})", cb.reference)
+        assert m, cb.reference
+        assert m[1] == cb.transaction_date.strftime("%Y%m%d")
+        per_day[m[1]].append(int(m[2]))
+    for numbers in per_day.values():
+        assert sorted(numbers) == list(range(1, len(numbers) + 1))
+
+
+def test_parallel_posts_to_one_account(backend, app, admin, seed):
+    batches = [[_payload(seed, seed["account_id"], t * WRITES + i) for i in range(WRITES)] for t in range(THREADS)]
+    assert _post_all(app, admin, batches) == [201] * THREADS * WRITES
+    _check_ledgers(app, [seed["account_id"]], THREADS * WRITES)
+
+
+def test_parallel_posts_to_different_accounts(backend, app, admin, seed, accounts):
+    # every thread alternates between the accounts, all on the same few days
+    batches = [[_payload(seed, accounts[(t + i) % 2], t * WRITES + i) for i in range(WRITES)]
+               for t in range(THREADS)]
+    assert _post_all(app, admin, batches) == [201] * THREADS * WRITES
+    _check_ledgers(app, accounts, THREADS * WRITES)
+
+
+def test_different_accounts_are_not_serialized(backend, app, admin, seed, accounts):
+    if backend == "sqlite":
+        pytest.skip("SQLite serializes all writers")
+    blocked, free = accounts
+    with ThreadPoolExecutor(2) as pool, app.session_factory() as holder:
+        Cashbook.lock_accounts(holder, blocked)
+        waiting = pool.submit(_post_one, app, admin, _payload(seed, blocked, 0))
+        # a write to the other account goes through while `blocked` is held
+        assert pool.submit(_post_one, app, admin, _payload(seed, free, 1)).result(timeout=30) == 201
+        time.sleep(0.5)
+        assert not waiting.done()
+        holder.commit()
+        assert waiting.result(timeout=30) == 201
+    _check_ledgers(app, accounts, 2)
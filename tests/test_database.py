@@ -0,0 +1,36 @@
+import gc
+import os
+import weakref
+
+import pytest
+
+from config import Settings
+from services import database
+
+
+def test_dropped_engines_are_not_kept_alive(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'a.db'}", Settings)
+    with engine.connect():
+        pass
+    assert engine in database._engines
+    ref = weakref.ref(engine)
+    engine.dispose()
+    del engine
+    gc.collect()
+    assert ref() is None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_starts_with_an_empty_pool(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'a.db'}", Settings)
+    with engine.connect():
+        pass
+    assert engine.pool.checkedin() == 1
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, str(engine.pool.checkedin()).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 8) == b"0"
+    engine.dispose()
@@ -0,0 +1,45 @@
+from models import Account, AccessLevelEnum, Budget, User
+
+
+def _cashbook(client, admin, seed):
+    r = client.post("/cashbooks", headers=admin, json={
+        "transaction_date": "2024-10-05", "facility_id": seed["facility_id"], "account_id": seed["account_id"],
+        "vat_requirement": "VAT_REQUIRED", "budget_line_id": seed["budget_line_id"],
+        "activity_id": seed["activity_id"], "cash_in": "10.00",
+    })
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()["id"]
+
+
+def test_delete_account_with_cashbook_rows_conflicts(app, client, admin, seed):
+    cb_id = _cashbook(client, admin, seed)
+
+    r = client.delete(f"/accounts/{seed['account_id']}", headers=admin)
+    assert r.status_code == 409
+    assert "referenced" in r.get_json()["message"]
+    with app.session_factory() as db:
+        assert db.get(Account, seed["account_id"]) is not None
+
+    assert client.delete(f"/cashbooks/{cb_id}", headers=admin).status_code == 200
+    assert client.delete(f"/accounts/{seed['account_id']}", headers=admin).status_code == 200
+
+
+def test_delete_user_who_validated_a_budget_conflicts(app, client, admin, seed):
+    r = client.patch("/budgets/batch", headers=admin, json={"create": [{
+        "facility_id": seed["facility_id"], "budget_line_id": seed["budget_line_id"],
+        "activity_id": seed["activity_id"], "start_date": "2024-10-01", "end_date": "2025-09-30",
+    }]})
+    budget_id = r.get_json()["created"][0]["id"]
+    with app.session_factory() as db:
+        user = User(username="validator", access_level=AccessLevelEnum.COUNTRY)
+        user.set_password("pw")
+        db.add(user)
+        db.flush()
+        db.get(Budget, budget_id).validated_by_id = user.id
+        db.commit()
+        user_id = user.id
+
+    assert client.delete(f"/admin/users/{user_id}", headers=admin).status_code == 409
+    r = client.patch("/budgets/batch", headers=admin, json={"delete": [budget_id]})
+    assert r.status_code == 200, r.get_json()
+    assert client.delete(f"/admin/users/{user_id}", headers=admin).status_code == 200
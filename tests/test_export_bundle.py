@@ -0,0 +1,100 @@
+import io
+import os
+import subprocess
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Settings
+from services import export_bundle, export_xlsx, reporting
+
+from conftest import make_facility
+
+
+def _district_with_facilities(app, n):
+    with app.session_factory() as db:
+        facilities = [make_facility(db, str(i)) for i in range(n)]
+        db.commit()
+        return facilities[0].district_id
+
+
+def test_sync_bundle_sends_every_workbook(app, client, admin):
+    district_id = _district_with_facilities(app, 2)
+    r = client.get("/reports/export-bundle", headers=admin,
+                   query_string={"district_id": district_id, "year": 2024, "quarter": 1})
+    assert r.status_code == 200, r.data[:200]
+    assert r.headers["Content-Disposition"].endswith(f"district-{district_id}_FY2024_Q1.zip")
+    assert len(zipfile.ZipFile(io.BytesIO(r.data)).namelist()) == 2
+
+
+def test_sync_bundle_failure_is_an_error_not_a_partial_zip(app, client, admin, monkeypatch):
+    district_id = _district_with_facilities(app, 3)
+    real_build = export_bundle._build_one
+    calls = []
+
+    def build_one(db_url, facility_id, year, quarter, out_dir):
+        calls.append(facility_id)
+        if len(calls) == 3:
+            raise RuntimeError("workbook writer crashed")
+        return real_build(db_url, facility_id, year, quarter, out_dir)
+
+    pool = ThreadPoolExecutor(1)
+    monkeypatch.setattr(export_bundle, "_build_one", build_one)
+    monkeypatch.setattr(export_bundle, "_workbook_pool", lambda max_workers: pool)
+    try:
+        r = client.get("/reports/export-bundle", headers=admin,
+                       query_string={"district_id": district_id, "year": 2024, "quarter": 1})
+    finally:
+        pool.shutdown()
+    assert r.status_code == 500
+    assert r.mimetype == "application/json"
+    assert "workbook writer crashed" in r.get_json()["message"]
+
+
+def test_async_bundle_job_reuses_the_workbook_pool(app, client, admin):
+    district_id = _district_with_facilities(app, 2)
+    query = {"district_id": district_id, "year": 2024, "quarter": 1}
+    assert client.get("/reports/export-bundle", headers=admin, query_string=query).status_code == 200
+    pool = export_bundle._pool
+
+    r = client.get("/reports/export-bundle", headers=admin, query_string={**query, "async": "1"})
+    assert r.status_code == 202
+    job_id = r.get_json()["job_id"]
+    for _ in range(600):
+        r = client.get(f"/reports/export-bundle/{job_id}", headers=admin)
+        if r.mimetype == "application/zip" or r.get_json()["status"] == "failed":
+            break
+        time.sleep(0.05)
+    assert r.mimetype == "application/zip", r.get_json()
+    assert len(zipfile.ZipFile(io.BytesIO(r.data)).namelist()) == 2
+    assert export_bundle._pool is pool
+
+
+def test_workbook_queries_the_header_once(app, seed, monkeypatch):
+    calls = []
+
+    def header(*args):
+        calls.append(args[1:])
+        return real_header(*args)
+
+    real_header = reporting.header
+    monkeypatch.setattr(reporting, "header", header)
+    monkeypatch.setattr(export_xlsx, "header", header)
+    with app.session_factory() as db:
+        export_xlsx.write_quarter_workbook(db, seed["facility_id"], 2024, 1, io.BytesIO())
+    assert calls == [(seed["facility_id"], 2024, 1)]
+
+
+def test_bundle_job_of_an_exited_worker_is_failed(app, client, admin):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    jobs = export_bundle.BundleJobs(Settings.EXPORT_DIR)
+    os.makedirs(jobs.directory, exist_ok=True)
+    jobs.write_status("abc", status="running", owner="admin", total=3, done=1, pid=dead.pid)
+
+    r = client.get("/reports/export-bundle/abc", headers=admin)
+    assert r.status_code == 200
+    assert r.get_json()["status"] == "failed"
+    assert "pid" not in r.get_json()
+    assert jobs.status("abc")["status"] == "failed"
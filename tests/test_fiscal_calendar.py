@@ -0,0 +1,44 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from models import FiscalCalendar
+from services.fiscal_calendar import ensure_calendar_dates
+
+
+def _cashbook(client, admin, seed, day, cash_in):
+    return client.post("/cashbooks", headers=admin, json={
+        "transaction_date": day, "facility_id": seed["facility_id"], "account_id": seed["account_id"],
+        "vat_requirement": "VAT_REQUIRED", "budget_line_id": seed["budget_line_id"],
+        "activity_id": seed["activity_id"], "cash_in": cash_in,
+    })
+
+
+def _calendar_days(app, fiscal_year):
+    with app.session_factory() as db:
+        return db.scalar(select(func.count()).where(FiscalCalendar.fiscal_year == fiscal_year))
+
+
+def test_cashbook_write_fills_missing_fiscal_year(app, client, admin, seed):
+    assert _calendar_days(app, 2040) == 0
+    assert _cashbook(client, admin, seed, "2041-02-01", "25.00").status_code == 201
+    assert _calendar_days(app, 2040) == 365
+
+    r = client.get("/reports/periods", headers=admin,
+                   query_string={"facility_id": seed["facility_id"], "fiscal_year": 2040, "grain": "quarter"})
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["totals"]["cash_in"] == 25.0
+
+
+def test_moving_an_entry_fills_its_new_fiscal_year(app, client, admin, seed):
+    cb = _cashbook(client, admin, seed, "2024-11-01", "5.00").get_json()
+    r = client.patch(f"/cashbooks/{cb['id']}", headers=admin, json={"transaction_date": "2035-03-03"})
+    assert r.status_code == 200, r.get_json()
+    assert _calendar_days(app, 2034) == 365
+
+
+def test_ensure_calendar_dates_is_a_lookup_when_covered(app):
+    with app.session_factory() as db:
+        assert ensure_calendar_dates(db, date(2050, 1, 1), None) == 365
+        assert ensure_calendar_dates(db, date(2050, 1, 1), date(2049, 12, 31)) == 0
+        db.commit()
@@ -0,0 +1,69 @@
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from config import Settings
+from services.metrics import JobMetrics
+
+
+def _samples(client, headers=None) -> dict:
+    r = client.get("/metrics", headers=headers or {})
+    assert r.status_code == 200
+    assert r.content_type.startswith("text/plain")
+    return {
+        (s.name, tuple(sorted(s.labels.items()))): s.value
+        for family in text_string_to_metric_families(r.get_data(as_text=True))
+        for s in family.samples
+    }
+
+
+def _value(samples, name, **labels):
+    return samples.get((name, tuple(sorted(labels.items()))), 0.0)
+
+
+def test_requests_are_counted(client, admin):
+    # the store is shared by every test in this process, so compare before/after
+    labels = {"method": "GET", "route": "/facilities", "status": "200"}
+    before = _samples(client)
+    for _ in range(3):
+        assert client.get("/facilities", headers=admin).status_code == 200
+    after = _samples(client)
+
+    assert _value(after, "finreports_http_requests_total", **labels) - \
+        _value(before, "finreports_http_requests_total", **labels) == 3
+    assert _value(after, "finreports_http_request_duration_seconds_count", **labels) - \
+        _value(before, "finreports_http_request_duration_seconds_count", **labels) == 3
+    assert _value(after, "finreports_db_pool_size", engine="primary") > 0
+    assert _value(after, "finreports_refdata_cache_hits_total") - \
+        _value(before, "finreports_refdata_cache_hits_total") == 2
+    assert 0 < _value(after, "finreports_refdata_cache_hit_ratio") < 1
+
+
+def test_job_metrics(client):
+    before = _samples(client)
+    with JobMetrics("test_job") as job:
+        job.item(2)
+        assert _value(_samples(client), "finreports_jobs_running", kind="test_job") == 1
+    with pytest.raises(ValueError):
+        for _ in JobMetrics("test_job").iterate(range(3)):
+            raise ValueError("bad row")
+    after = _samples(client)
+
+    def delta(name, **labels):
+        return _value(after, name, **labels) - _value(before, name, **labels)
+
+    assert delta("finreports_jobs_started_total", kind="test_job") == 2
+    assert delta("finreports_jobs_finished_total", kind="test_job", status="done") == 1
+    assert delta("finreports_jobs_finished_total", kind="test_job", status="failed") == 1
+    assert delta("finreports_job_items_total", kind="test_job") == 2
+    assert _value(after, "finreports_jobs_running", kind="test_job") == 0
+
+
+@pytest.fixture
+def metrics_token(monkeypatch, settings):
+    monkeypatch.setattr(Settings, "METRICS_TOKEN", "scrape-me")
+
+
+def test_metrics_token(metrics_token, client):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    _samples(client, {"Authorization": "Bearer scrape-me"})
@@ -0,0 +1,133 @@
+"""
+Fiscal-year partitioning of the ledgers. Needs a scratch Postgres database:
+
+    TEST_POSTGRES_URL=postgresql+psycopg://user:pw@host/scratch python -m pytest -q tests/test_partitions.py
+"""
+import os
+from datetime import date
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import (
+    Account,
+    AccountTypeEnum,
+    Activity,
+    Base,
+    BudgetLine,
+    Cashbook,
+    CashbookEntry,
+    VATRequirementEnum,
+)
+from services.partitions import (
+    PARTITIONED_TABLES,
+    convert_to_partitioned,
+    convert_to_plain,
+    is_partitioned,
+    schema_drift_filter,
+)
+
+from conftest import make_facility
+
+URL = os.environ.get("TEST_POSTGRES_URL")
+pytestmark = pytest.mark.skipif(not URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture
+def pg():
+    engine = create_engine(URL)
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            convert_to_plain(conn, table)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            convert_to_plain(conn, table)
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def _ledger(conn, *dates):
+    """One cashbook row and one cashbook_entry per date, on one account."""
+    with Session(conn) as db:
+        fac = make_facility(db, "1")
+        line = BudgetLine(code="BL-1", name="Operations")
+        db.add(line)
+        db.flush()
+        activity = Activity(budget_line_id=line.id, code="A-1", name="Supplies")
+        account = Account(name="Main account", type=AccountTypeEnum.BANK, facility_id=fac.id)
+        db.add_all([activity, account])
+        db.flush()
+        for i, d in enumerate(dates):
+            cb = Cashbook(transaction_date=d, facility_id=fac.id, account_id=account.id, reference=f"REF-{i}",
+                          vat_requirement=VATRequirementEnum.REQUIRED, budget_line_id=line.id,
+                          activity_id=activity.id, cash_in=10, balance=10 * (i + 1))
+            Cashbook.set_quarter(cb)
+            db.add(cb)
+            db.add(CashbookEntry(facility_id=fac.id, year=d.year, quarter=1, txn_date=d, inflow=10))
+        db.flush()
+        return {"account_id": account.id, "facility_id": fac.id, "budget_line_id": line.id,
+                "activity_id": activity.id}
+
+
+def _insert_reference(conn, ids, reference, day):
+    conn.execute(text(
+        "INSERT INTO cashbook (transaction_date, quarter, fiscal_year, facility_id, account_id, reference, "
+        "vat_requirement, budget_line_id, activity_id, cash_in, balance) VALUES "
+        "(:d, 'Q1', 2030, :facility_id, :account_id, :ref, 'REQUIRED', :budget_line_id, :activity_id, 1, 1)"
+    ), {**ids, "d": day, "ref": reference})
+
+
+def _drift(conn):
+    context = MigrationContext.configure(conn, opts={"include_object": schema_drift_filter(conn)})
+    return compare_metadata(context, Base.metadata)
+
+
+def test_references_stay_unique_across_fiscal_years(pg):
+    with pg.begin() as conn:
+        ids = _ledger(conn, date(2023, 11, 1), date(2024, 11, 1))
+        for table in PARTITIONED_TABLES:
+            assert convert_to_partitioned(conn, table)
+            assert is_partitioned(conn, table)
+
+    with pg.connect() as conn:
+        with pytest.raises(IntegrityError):
+            _insert_reference(conn, ids, "REF-0", date(2031, 1, 1))  # REF-0 lives in FY2023
+        conn.rollback()
+        _insert_reference(conn, ids, "REF-new", date(2031, 1, 1))
+        # moving a row to another fiscal year keeps its reference reserved
+        conn.execute(text("UPDATE cashbook SET transaction_date = '2025-12-01' WHERE reference = 'REF-new'"))
+        conn.execute(text("UPDATE cashbook SET reference = 'REF-renamed' WHERE reference = 'REF-1'"))
+        conn.commit()
+        with pytest.raises(IntegrityError):
+            _insert_reference(conn, ids, "REF-new", date(2024, 1, 1))
+        conn.rollback()
+        _insert_reference(conn, ids, "REF-1", date(2024, 1, 1))  # freed by the rename
+        conn.commit()
+        assert _drift(conn) == []
+        unfiltered = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        assert unfiltered  # the filter is what hides the partitions and guard
+
+    with pg.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            assert convert_to_plain(conn, table)
+        unique = {ix["name"]: ix for ix in inspect(conn).get_indexes("cashbook")}["ix_cashbook_reference"]
+        assert unique["unique"] and unique["column_names"] == ["reference"]
+        assert conn.execute(text("SELECT to_regclass('ix_cashbook_reference_guard')")).scalar() is None
+        assert _drift(conn) == []
+
+
+def test_partitioning_refuses_undated_entries(pg):
+    with pg.begin() as conn:
+        _ledger(conn, date(2023, 11, 1))
+        conn.execute(text("ALTER TABLE cashbook_entry ALTER COLUMN txn_date DROP NOT NULL"))
+        conn.execute(text("UPDATE cashbook_entry SET txn_date = NULL"))
+    with pg.begin() as conn:
+        with pytest.raises(ValueError, match="NULL txn_date"):
+            convert_to_partitioned(conn, "cashbook_entry")
@@ -0,0 +1,136 @@
+from models import Cashbook, PeriodBalance, Quarter
+
+from conftest import auth_headers
+
+
+def _quarter(client, headers, seed, year, quarter, status="SUBMITTED"):
+    r = client.post("/quarters", headers=headers,
+                    json={"facility_id": seed["facility_id"], "year": year, "quarter": quarter, "status": status})
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()["id"]
+
+
+def _cashbook(client, headers, seed, day, cash_in=None, cash_out=None):
+    payload = {
+        "transaction_date": day,
+        "facility_id": seed["facility_id"],
+        "account_id": seed["account_id"],
+        "vat_requirement": "VAT_REQUIRED",
+        "budget_line_id": seed["budget_line_id"],
+        "activity_id": seed["activity_id"],
+    }
+    if cash_in is not None:
+        payload["cash_in"] = cash_in
+    if cash_out is not None:
+        payload["cash_out"] = cash_out
+    return client.post("/cashbooks", json=payload, headers=headers)
+
+
+def _entry(client, headers, seed, year, quarter, day, inflow=0, outflow=0):
+    return client.post("/cashbook", headers=headers, json={
+        "facility_id": seed["facility_id"], "year": year, "quarter": quarter, "txn_date": day,
+        "inflow": inflow, "outflow": outflow,
+    })
+
+
+def test_close_freezes_balances(app, client, admin, seed):
+    q1 = _quarter(client, admin, seed, 2024, 1)
+    assert _cashbook(client, admin, seed, "2024-10-05", cash_in="100.00").status_code == 201
+    assert _cashbook(client, admin, seed, "2024-11-05", cash_out="30.00").status_code == 201
+    assert _entry(client, admin, seed, 2024, 1, "2024-10-07", inflow=50, outflow=20).status_code == 201
+
+    r = client.post(f"/quarters/{q1}/close", headers=admin)
+    assert r.status_code == 200, r.get_json()
+    body = r.get_json()
+    assert body["status"] == "CLOSED"
+    balances = {b["account_id"]: b for b in body["balances"]}
+    assert balances[None]["closing_balance"] == 30.0
+    account = balances[seed["account_id"]]
+    assert (account["opening_balance"], account["inflow"], account["outflow"]) == (0.0, 100.0, 30.0)
+    assert (account["closing_balance"], account["entries"]) == (70.0, 2)
+
+    with app.session_factory() as db:
+        assert db.query(PeriodBalance).filter_by(quarter_id=q1).count() == 2
+        assert db.get(Quarter, q1).status_before_close == "SUBMITTED"
+
+    # the next quarter opens on the frozen closing balance
+    q2 = _quarter(client, admin, seed, 2024, 2)
+    r = client.get(f"/quarters/{q2}/balances", headers=admin)
+    opening = {b["account_id"]: b["opening_balance"] for b in r.get_json()["balances"]}
+    assert opening == {None: 30.0, seed["account_id"]: 70.0}
+    recon = client.get("/reports/bank-recon", headers=admin,
+                       query_string={"facility_id": seed["facility_id"], "year": 2024, "quarter": 2}).get_json()
+    assert recon["opening_balance"] == 30.0
+
+
+def test_closed_quarter_refuses_edits(app, client, admin, seed):
+    q1 = _quarter(client, admin, seed, 2024, 1)
+    created = _cashbook(client, admin, seed, "2024-10-05", cash_in="100.00").get_json()
+    assert client.post(f"/quarters/{q1}/close", headers=admin).status_code == 200
+
+    # in the closed quarter
+    assert _cashbook(client, admin, seed, "2024-12-01", cash_in="1.00").status_code == 409
+    assert _entry(client, admin, seed, 2024, 1, "2024-12-01", inflow=1).status_code == 409
+    assert client.patch(f"/cashbooks/{created['id']}", headers=admin, json={"cash_in": "5.00"}).status_code == 409
+    assert client.delete(f"/cashbooks/{created['id']}", headers=admin).status_code == 409
+    r = client.post("/obligations", headers=admin,
+                    json={"facility_id": seed["facility_id"], "year": 2024, "quarter": 1, "amount": 10})
+    assert r.status_code == 409
+    r = client.post("/quarter-lines", headers=admin, json={"quarter_id": q1, "planned": 10})
+    assert r.status_code == 409
+
+    # before it (moving a later entry back into it is refused too)
+    assert _cashbook(client, admin, seed, "2024-07-01", cash_in="1.00").status_code == 409
+    later = _cashbook(client, admin, seed, "2025-01-10", cash_in="1.00")
+    assert later.status_code == 201
+    r = client.patch(f"/cashbooks/{later.get_json()['id']}", headers=admin, json={"transaction_date": "2024-12-31"})
+    assert r.status_code == 409
+
+    with app.session_factory() as db:
+        assert db.query(Cashbook).count() == 2
+
+
+def test_close_twice_conflicts(client, admin, seed):
+    q1 = _quarter(client, admin, seed, 2024, 1)
+    assert client.post(f"/quarters/{q1}/close", headers=admin).status_code == 200
+    assert client.post(f"/quarters/{q1}/close", headers=admin).status_code == 409
+    assert client.post("/quarters/999/close", headers=admin).status_code == 404
+
+
+def test_quarter_cannot_be_created_closed(client, admin, seed):
+    r = client.post("/quarters", headers=admin,
+                    json={"facility_id": seed["facility_id"], "year": 2024, "quarter": 1, "status": "CLOSED"})
+    assert r.status_code == 400
+
+
+def test_reopen_restores_previous_status(app, client, admin, seed):
+    q1 = _quarter(client, admin, seed, 2024, 1, status="APPROVED")
+    assert client.post(f"/quarters/{q1}/close", headers=admin).status_code == 200
+
+    r = client.post(f"/quarters/{q1}/reopen", headers=admin)
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["status"] == "APPROVED"
+    assert client.post(f"/quarters/{q1}/reopen", headers=admin).status_code == 409
+    with app.session_factory() as db:
+        assert db.query(PeriodBalance).filter_by(quarter_id=q1).count() == 0
+        assert db.get(Quarter, q1).status_before_close is None
+
+    assert _cashbook(client, admin, seed, "2024-12-01", cash_in="1.00").status_code == 201
+
+
+def test_reopen_requires_later_quarters_open(client, admin, seed):
+    q1 = _quarter(client, admin, seed, 2024, 1)
+    q2 = _quarter(client, admin, seed, 2024, 2)
+    assert client.post(f"/quarters/{q1}/close", headers=admin).status_code == 200
+    assert client.post(f"/quarters/{q2}/close", headers=admin).status_code == 200
+
+    assert client.post(f"/quarters/{q1}/reopen", headers=admin).status_code == 409
+    assert client.post(f"/quarters/{q2}/reopen", headers=admin).status_code == 200
+    assert client.post(f"/quarters/{q1}/reopen", headers=admin).status_code == 200
+
+
+def test_reopen_is_for_country_admins(app, client, admin, seed):
+    q1 = _quarter(client, admin, seed, 2024, 1)
+    assert client.post(f"/quarters/{q1}/close", headers=admin).status_code == 200
+    facility_user = auth_headers(app, identity="clerk", access_level="FACILITY", facility_id=seed["facility_id"])
+    assert client.post(f"/quarters/{q1}/reopen", headers=facility_user).status_code == 403
@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from config import Settings
+from models import Facility
+
+from conftest import make_facility
+
+
+def _queries(response) -> int:
+    """Statements the request ran, from the RequestStats counter reported in Server-Timing."""
+    return int(re.search(r'desc="(\d+) queries', response.headers["Server-Timing"]).group(1))
+
+
+def _add_facilities(app, n):
+    with app.session_factory() as db:
+        first = db.query(Facility).count()
+        for i in range(first, first + n):
+            make_facility(db, str(i))
+        db.commit()
+
+
+@pytest.fixture
+def uncached(monkeypatch, settings):
+    # the reference cache would answer repeat lists without touching the database
+    monkeypatch.setattr(Settings, "REFDATA_CACHE", False)
+    monkeypatch.setattr(Settings, "SQL_INSTRUMENTATION", True)
+
+
+def test_facility_list_statements_do_not_grow_with_facilities(uncached, app, client, admin):
+    _add_facilities(app, 3)
+    small = client.get("/facilities", headers=admin)
+    assert small.status_code == 200 and len(small.get_json()) == 3
+
+    _add_facilities(app, 27)
+    large = client.get("/facilities", headers=admin)
+    assert large.status_code == 200 and len(large.get_json()) == 30
+
+    assert 0 < _queries(small) == _queries(large)
@@ -0,0 +1,59 @@
+import pytest
+
+from config import Settings
+from models import Account, AccountTypeEnum, Base
+from services.database import make_engine
+
+from conftest import auth_headers
+
+
+@pytest.fixture
+def replica_url(tmp_path, monkeypatch, settings):
+    """A second SQLite file as DATABASE_READ_URL, holding only an account named "replica only"."""
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    monkeypatch.setattr(Settings, "DATABASE_READ_URL", url)
+    engine = make_engine(url, Settings)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Account.__table__.insert().values(name="replica only", type=AccountTypeEnum.BANK))
+    engine.dispose()
+    return url
+
+
+def _account_names(client, headers):
+    r = client.get("/accounts", headers=headers)
+    assert r.status_code == 200, r.get_json()
+    return [a["name"] for a in r.get_json()["items"]]
+
+
+def test_reads_use_replica_and_writes_use_primary(replica_url, app, client):
+    writer = auth_headers(app, identity="writer")
+    reader = auth_headers(app, identity="reader")
+    assert _account_names(client, writer) == ["replica only"]
+
+    r = client.post("/accounts", headers=writer, json={"name": "new account", "type": "BANK"})
+    assert r.status_code == 201, r.get_json()
+    with app.primary_session_factory() as db:
+        assert [a.name for a in db.query(Account)] == ["new account"]
+
+    # the writer reads their own write from the primary; other users stay on the replica
+    assert _account_names(client, writer) == ["new account"]
+    assert _account_names(client, reader) == ["replica only"]
+
+
+@pytest.fixture
+def no_sticky_window(monkeypatch, settings):
+    monkeypatch.setattr(Settings, "READ_STICKY_SECONDS", 0)
+
+
+def test_reads_return_to_replica_after_sticky_window(replica_url, no_sticky_window, app, client):
+    writer = auth_headers(app, identity="writer")
+    assert client.post("/accounts", headers=writer, json={"name": "new account", "type": "BANK"}).status_code == 201
+    assert _account_names(client, writer) == ["replica only"]
+
+
+def test_token_blocklist_is_read_from_primary(replica_url, app, client):
+    headers = auth_headers(app, identity="leaver")
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    # the revocation is only on the primary; the replica has not caught up
+    assert client.get("/accounts", headers=headers).status_code == 401
@@ -0,0 +1,58 @@
+import re
+import threading
+
+from sqlalchemy import text
+
+from services import reporting
+from services.instrumentation import RequestStats
+
+
+def test_bundle_matches_single_reports(client, admin, seed):
+    query = {"facility_id": seed["facility_id"], "year": 2024, "quarter": 1}
+    r = client.get("/reports/bundle", headers=admin, query_string={**query, "include": "summary,statement"})
+    assert r.status_code == 200, r.get_json()
+    bundle = r.get_json()
+    assert sorted(bundle["reports"]) == ["statement", "summary"]
+    summary = client.get("/reports/summary", headers=admin, query_string=query).get_json()
+    assert bundle["header"] == summary.pop("header")
+    assert bundle["reports"]["summary"] == summary
+
+
+def test_bundle_returns_request_connection_before_fan_out(app, client, admin, seed, monkeypatch):
+    engine = app.session_factory.session_factory.kw["bind"]
+    both_running = threading.Barrier(2, timeout=10)
+    checked_out = []
+
+    def probe(db, facility_id, year, quarter, head=None):
+        db.execute(text("SELECT 1"))  # hold this thread's connection
+        both_running.wait()
+        checked_out.append(engine.pool.checkedout())
+        both_running.wait()
+        return {"header": head}
+
+    monkeypatch.setitem(reporting.REPORT_BUILDERS, "summary", probe)
+    monkeypatch.setitem(reporting.REPORT_BUILDERS, "statement", probe)
+    r = client.get("/reports/bundle", headers=admin, query_string={
+        "facility_id": seed["facility_id"], "year": 2024, "quarter": 1, "include": "summary,statement",
+    })
+    assert r.status_code == 200, r.get_json()
+    # the two report threads, not a third connection idling in the request's transaction
+    assert checked_out == [2, 2]
+    queries = int(re.search(r'desc="(\d+) queries', r.headers["Server-Timing"]).group(1))
+    assert queries >= 2  # both threads' statements reach the request's stats
+
+
+def test_request_stats_are_safe_across_threads():
+    stats = RequestStats("/reports/bundle", "GET")
+    stats.statements = []
+
+    def work():
+        for _ in range(2000):
+            stats.record("SELECT 1", 0.001, 1, False)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (stats.queries, stats.rows, len(stats.statements)) == (16000, 16000, 16000)
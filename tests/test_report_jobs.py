@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import time
+
+from config import Settings
+from services.report_jobs import ReportJobs
+
+
+def _poll(client, headers, job_id):
+    for _ in range(200):
+        r = client.get(f"/reports/jobs/{job_id}", headers=headers)
+        if r.get_json()["status"] not in ("queued", "running"):
+            return r
+        time.sleep(0.05)
+    return r
+
+
+def test_report_job_runs_and_stores_its_result(client, admin, seed):
+    r = client.post("/reports/jobs", headers=admin, json={
+        "report": "summary", "facility_id": seed["facility_id"], "fiscal_year": 2024, "quarter": 1,
+    })
+    assert r.status_code == 202, r.get_json()
+    r = _poll(client, admin, r.get_json()["job_id"])
+    status = r.get_json()
+    assert status["status"] == "done", status
+    assert "pid" not in status and "owner" not in status
+    assert status["result"]["header"]["year"] == 2024
+
+
+def test_report_job_of_an_exited_worker_is_failed(app, client, admin):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    jobs = ReportJobs(Settings.REPORT_JOB_DIR, None, 1, 1)
+    job_id, base = jobs.new_job("queued", owner="admin", report="summary", params={})
+    jobs.write_status(job_id, status="running", **{**base, "pid": dead.pid})
+
+    status = client.get(f"/reports/jobs/{job_id}", headers=admin).get_json()
+    assert status["status"] == "failed"
+    assert "exited" in status["error"]